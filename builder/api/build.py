@@ -8,7 +8,8 @@ from fastapi.responses import StreamingResponse, FileResponse
 from ..models.task import BuildCommandRequest, BuildCommandResponse
 from ..services.shell_service import ShellService
 from ..services.process_manager import process_manager
-from ..config import settings
+from ..config import settings, get_xml_config
+from .xml import shared_xml_core
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -196,6 +197,9 @@ async def export_excel(request: ExportExcelRequest):
         # 项目工作目录（labor-tracking-system）
         project_dir = Path(settings.project_root)
 
+        # 启用分片存储时先把分片写回完整文件（分片无变化时跳过）
+        await shared_xml_core(get_xml_config("orm")).materialize()
+
         # 从配置获取 XML 文件路径
         xml_path = Path(settings.orm_xml_path)
         if not xml_path.exists():
@@ -312,6 +316,9 @@ async def export_excel_stream(request: ExportExcelRequest):
     # 项目工作目录
     project_dir = Path(settings.project_root)
 
+    # 启用分片存储时先把分片写回完整文件（分片无变化时跳过）
+    await shared_xml_core(get_xml_config("orm")).materialize()
+
     # 从配置获取 XML 文件路径
     xml_path = Path(settings.orm_xml_path)
     if not xml_path.exists():
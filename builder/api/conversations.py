@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File
 from fastapi.responses import StreamingResponse
-from typing import List, AsyncGenerator
+from typing import List, AsyncGenerator, Optional
 from datetime import datetime
+import logging
 import uuid
 
 from ..models.conversation import (
@@ -14,11 +15,19 @@ from ..models.conversation import (
     Message,
     MessageRole,
 )
+from ..services.context_builder import ContextBuilder
 from ..services.conversation_service import ConversationService
 from ..config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/conversations", tags=["对话管理"])
 conversation_service = ConversationService()
+context_builder = ContextBuilder(
+    budget_tokens=settings.context_token_budget,
+    max_messages=settings.max_context_messages,
+    summary_chars=settings.context_summary_chars
+)
 
 
 @router.post(
@@ -105,27 +114,13 @@ async def send_message_stream(
     )
     session.messages.append(user_message)
 
-    # 构建对话上下文
-    context_messages = []
-    recent_messages = session.messages[-settings.max_context_messages:]
-
-    for msg in recent_messages:
-        file_content = ""
-        if msg.file_references:
-            # 读取关联文件内容
-            file_contents = []
-            for file_id in msg.file_references:
-                if file_id in session.files:
-                    file_info = session.files[file_id]
-                    file_text = await conversation_service._read_file_content(file_info.file_path)
-                    if file_text:
-                        file_contents.append(f"\n[文件: {file_info.original_name}]\n{file_text}\n")
-            file_content = "\n".join(file_contents)
-
-        context_messages.append({
-            "role": msg.role.value,
-            "content": file_content + msg.content
-        })
+    # 按 token 预算构建对话上下文（较早的消息以摘要代替）
+    async def read_file(file_id: str) -> Optional[str]:
+        return await conversation_service.read_file_block(session, file_id)
+
+    context = await context_builder.build(session.messages, read_file, session.summaries)
+    context_messages = context.messages
+    logger.info(f"会话 {conversation_id} 上下文: {context.stats()}")
 
     # SSE生成器
     async def sse_generator() -> AsyncGenerator[str, None]:
@@ -135,14 +130,14 @@ async def send_message_stream(
 
         try:
             # 发送开始事件
-            yield f"event: start\ndata: {{\"message_id\": \"{message_id}\", \"thinking_mode\": {str(request.enable_thinking).lower()}}}\n\n"
+            yield f"event: start\ndata: {{\"message_id\": \"{message_id}\", \"thinking_mode\": {str(request.enable_thinking).lower()}, \"context_tokens\": {context.tokens}, \"summarized_messages\": {context.summarized}}}\n\n"
 
             # 流式生成文本
             # 调试：确认 enable_thinking 的值
             print(f"[DEBUG conversations.py] request.enable_thinking = {request.enable_thinking}", flush=True)
             print(f"[DEBUG conversations.py] request.model_dump() = {request.model_dump()}", flush=True)
 
-            for chunk, is_thinking in conversation_service.ai_service.chat_stream(
+            async for chunk, is_thinking in conversation_service.ai_service.chat_stream_async(
                 messages=context_messages,
                 temperature=0.7,
                 use_system_prompt=True,
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
 from ..models.task import TaskSubmitResponse, Task, TaskStatus, OrmGenerationResult
 from ..services.task_service import TaskService
 from ..storage.task_store import TaskStore
+from .xml import merge_xml_batch, MergeXmlBatchRequest, MergeXmlBatchResponse
 
 router = APIRouter()
 task_store = TaskStore()
@@ -14,11 +15,20 @@ task_service = TaskService(task_store)
     summary="上传配置文件",
     description="上传 JSON 格式的配置文件，异步生成 MyBatis ORM 实体"
 )
-async def upload_config(file: UploadFile = File(..., description="JSON 配置文件")):
+async def upload_config(
+    file: UploadFile = File(..., description="JSON 配置文件"),
+    no_cache: bool = Query(False, description="跳过生成缓存（不读取也不写入）"),
+    refresh_cache: bool = Query(False, description="丢弃该配置已缓存的结果并重新生成")
+):
     """
     上传 JSON 配置文件，返回任务 ID 用于后续查询
 
+    相同配置（JSON 规范化后）、提示词模板、模型和温度的生成结果会被缓存，
+    再次上传时直接复用，任务的 cached 字段为 true。
+
     - **file**: JSON 格式配置文件（.json）
+    - **no_cache**: 跳过生成缓存
+    - **refresh_cache**: 使缓存失效并重新生成
     """
     if not file.filename:
         raise HTTPException(status_code=400, detail="文件名不能为空")
@@ -29,7 +39,12 @@ async def upload_config(file: UploadFile = File(..., description="JSON 配置文
     content = await file.read()
     content_str = content.decode("utf-8")
 
-    task_id = await task_service.submit_task(file.filename, content_str)
+    task_id = await task_service.submit_task(
+        file.filename,
+        content_str,
+        use_cache=not no_cache,
+        refresh_cache=refresh_cache
+    )
 
     return TaskSubmitResponse(task_id=task_id)
 
@@ -78,3 +93,42 @@ async def get_result(task_id: str):
         )
 
     return task.result
+
+
+@router.post(
+    "/tasks/{task_id}/merge",
+    response_model=MergeXmlBatchResponse,
+    summary="合并生成结果",
+    description="把已完成任务生成的全部实体一次性合并到 ORM 文件"
+)
+async def merge_result(
+    task_id: str,
+    patch: bool = Query(False, description="增量合并（只合并实体中出现的子元素和属性）")
+):
+    """
+    合并任务生成的全部实体（仅成功时可用）
+
+    一次生成可能包含多个相关实体（整个模块），全部实体在一次批量合并中写入，
+    目标文件只解析、写入一次。
+
+    - **task_id**: 任务唯一标识符
+    - **patch**: 增量合并
+    """
+    task = await task_service.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    if task.status != TaskStatus.SUCCESS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"任务未完成，当前状态: {task.status.value}"
+        )
+
+    # 调用统一的批量合并接口
+    return await merge_xml_batch(MergeXmlBatchRequest(
+        xml_type="orm",
+        xmls=[entity.xml for entity in task.result.entities],
+        patch=patch,
+        source="ai",
+        task_id=task_id
+    ))
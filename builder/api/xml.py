@@ -2,10 +2,10 @@
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
-from xml_core import XmlCore
-from ..config import get_xml_config
+from xml_core import AsyncXmlCore, XmlFileNotFoundError, shared_document_cache, shared_xpath_cache
+from ..config import settings, get_xml_config, XmlBuildConfig, XML_BUILD_TYPES
 
 
 router = APIRouter()
@@ -15,6 +15,7 @@ class MergeXmlRequest(BaseModel):
     """XML 合并请求"""
     xml_type: str  # XML 类型（orm/config/api 等）
     xml: str  # XML 片段
+    patch: bool = False  # 增量合并：只包含变化的子元素/属性，其余保持不变
     source: str = "chat"  # 来源标识
     task_id: Optional[str] = None  # 关联任务ID
 
@@ -24,9 +25,72 @@ class MergeXmlResponse(BaseModel):
     success: bool
     xml_type: str
     identifier: str  # 元素标识（name/key/path 等）
-    action: str  # created/updated
+    action: str  # created/updated/skipped
     display_name: str  # 类型显示名称
     message: str
+    # 增量合并时各子元素的处理情况（相对路径）
+    added: List[str] = []
+    updated: List[str] = []
+    untouched: List[str] = []
+
+
+class MergeXmlBatchRequest(BaseModel):
+    """XML 批量合并请求"""
+    xml_type: str  # XML 类型（orm/config/api 等）
+    xmls: List[str]  # XML 片段列表（按顺序合并）
+    patch: bool = False  # 增量合并：只包含变化的子元素/属性，其余保持不变
+    source: str = "chat"  # 来源标识
+    task_id: Optional[str] = None  # 关联任务ID
+
+
+class MergeXmlItem(BaseModel):
+    """单个片段的合并结果"""
+    identifier: str
+    action: str  # created/updated/skipped
+    added: List[str] = []
+    updated: List[str] = []
+    untouched: List[str] = []
+
+
+class MergeXmlBatchResponse(BaseModel):
+    """XML 批量合并响应"""
+    success: bool
+    xml_type: str
+    display_name: str
+    results: List[MergeXmlItem]
+    message: str
+
+
+class XmlElementResponse(BaseModel):
+    """元素查询响应"""
+    xml_type: str
+    identifier: str
+    xml: str  # 元素当前的 XML
+
+
+def shared_xml_core(config: XmlBuildConfig) -> AsyncXmlCore:
+    """获取某个 XML 类型在进程内共享的 XmlCore（各处使用相同的构造参数）"""
+    return AsyncXmlCore.shared(
+        config.xml_path,
+        cache=shared_document_cache(),
+        use_mmap=settings.xml_use_mmap,
+        shard_dir=config.shard_dir
+    )
+
+
+def _merge_strategy(patch: bool) -> str:
+    return "patch" if patch else "replace_or_append"
+
+
+def _get_config(xml_type: str) -> XmlBuildConfig:
+    """获取 XML 类型配置，不支持的类型返回 400"""
+    config = get_xml_config(xml_type)
+    if not config:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的 XML 类型: {xml_type}，支持的类型: {list(XML_BUILD_TYPES)}"
+        )
+    return config
 
 
 @router.post("/merge", response_model=MergeXmlResponse, summary="合并 XML")
@@ -42,29 +106,30 @@ async def merge_xml(request: MergeXmlRequest):
     请求参数：
     - **xml_type**: XML 类型标识
     - **xml**: XML 片段内容
+    - **patch**: 增量合并（按子元素标识和属性逐项合并，只需发送变化的部分）
     - **source**: 来源标识（ai/chat/manual）
     - **task_id**: 关联任务ID（可选）
 
-    返回操作结果，包含元素标识和操作类型（创建/更新）
+    返回操作结果，包含元素标识和操作类型（创建/更新/跳过）
     """
     # 获取 XML 类型配置
-    config = get_xml_config(request.xml_type)
-    if not config:
-        raise HTTPException(
-            status_code=400,
-            detail=f"不支持的 XML 类型: {request.xml_type}，支持的类型: {list(get_xml_config.__self__)}"
-        )
+    config = _get_config(request.xml_type)
 
     try:
-        # 使用 xml_core 进行合并
-        core = XmlCore(xml_path=config.xml_path)
-        result = core.merge_element(
+        # 使用 xml_core 进行合并（解析和写入在线程池中执行，不阻塞事件循环）
+        core = shared_xml_core(config)
+        result = await core.merge_element(
             element_xml=request.xml,
             parent_xpath=config.parent_xpath,
-            element_matcher=config.element_matcher
+            element_matcher=config.element_matcher,
+            merge_strategy=_merge_strategy(request.patch)
         )
 
-        action_text = "创建" if result.action == "created" else "更新"
+        if result.action == "skipped":
+            message = f"{config.display_name} [{result.identifier}] 内容未变化，已跳过"
+        else:
+            action_text = "创建" if result.action == "created" else "更新"
+            message = f"{config.display_name} [{result.identifier}] 已成功{action_text}"
 
         return MergeXmlResponse(
             success=True,
@@ -72,7 +137,10 @@ async def merge_xml(request: MergeXmlRequest):
             identifier=result.identifier,
             action=result.action,
             display_name=config.display_name,
-            message=f"{config.display_name} [{result.identifier}] 已成功{action_text}"
+            message=message,
+            added=result.added,
+            updated=result.updated,
+            untouched=result.untouched
         )
 
     except ValueError as e:
@@ -83,6 +151,99 @@ async def merge_xml(request: MergeXmlRequest):
         raise HTTPException(status_code=500, detail=f"合并失败: {str(e)}")
 
 
+@router.post("/merge/batch", response_model=MergeXmlBatchResponse, summary="批量合并 XML")
+async def merge_xml_batch(request: MergeXmlBatchRequest):
+    """
+    批量 XML 合并接口
+
+    一次请求合并多个片段：目标文件只解析一次、写入一次。
+    任意片段解析失败时整批不写入。
+
+    请求参数：
+    - **xml_type**: XML 类型标识
+    - **xmls**: XML 片段列表，按顺序合并
+    - **patch**: 增量合并（按子元素标识和属性逐项合并，只需发送变化的部分）
+    - **source**: 来源标识（ai/chat/manual）
+    - **task_id**: 关联任务ID（可选）
+
+    返回每个片段的元素标识和操作类型（创建/更新/跳过）
+    """
+    config = _get_config(request.xml_type)
+
+    if not request.xmls:
+        raise HTTPException(status_code=400, detail="xmls 不能为空")
+
+    try:
+        core = shared_xml_core(config)
+        results = await core.merge_elements(
+            element_xmls=request.xmls,
+            parent_xpath=config.parent_xpath,
+            element_matcher=config.element_matcher,
+            merge_strategy=_merge_strategy(request.patch)
+        )
+
+        created = sum(1 for r in results if r.action == "created")
+        updated = sum(1 for r in results if r.action == "updated")
+        skipped = sum(1 for r in results if r.action == "skipped")
+
+        return MergeXmlBatchResponse(
+            success=True,
+            xml_type=request.xml_type,
+            display_name=config.display_name,
+            results=[
+                MergeXmlItem(
+                    identifier=r.identifier,
+                    action=r.action,
+                    added=r.added,
+                    updated=r.updated,
+                    untouched=r.untouched
+                )
+                for r in results
+            ],
+            message=(
+                f"{config.display_name}已合并 {len(results)} 个：创建 {created} 个，更新 {updated} 个，"
+                f"跳过 {skipped} 个"
+            )
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"合并失败: {str(e)}")
+
+
+@router.get("/element", response_model=XmlElementResponse, summary="查询 XML 元素")
+async def get_xml_element(xml_type: str, identifier: str):
+    """
+    查询元素的当前内容（供前端轮询）
+
+    结果缓存在进程内，只在通过合并接口写入或文件被外部修改后重新解析。
+
+    请求参数：
+    - **xml_type**: XML 类型标识
+    - **identifier**: 元素标识（name/key/path 等）
+    """
+    config = _get_config(xml_type)
+    if "'" in identifier and '"' in identifier:
+        raise HTTPException(status_code=400, detail="元素标识不能同时包含单引号和双引号")
+    quote = '"' if "'" in identifier else "'"
+    xpath = f"{config.parent_xpath}/{config.element_tag}[@{config.element_matcher}={quote}{identifier}{quote}]"
+
+    core = shared_xml_core(config)
+    try:
+        xml = await core.query_element(xpath)
+    except XmlFileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
+    if xml is None:
+        raise HTTPException(status_code=404, detail=f"{config.display_name}不存在: {identifier}")
+
+    return XmlElementResponse(xml_type=xml_type, identifier=identifier, xml=xml)
+
+
 @router.get("/types", summary="获取支持的 XML 类型")
 async def get_xml_types():
     """
@@ -90,8 +251,6 @@ async def get_xml_types():
 
     返回所有可用的 XML 类型配置
     """
-    from ..config import XML_BUILD_TYPES
-
     types = []
     for type_id, config in XML_BUILD_TYPES.items():
         types.append({
@@ -103,3 +262,25 @@ async def get_xml_types():
         })
 
     return {"types": types}
+
+
+@router.get("/cache/stats", summary="获取 XML 缓存统计")
+async def get_cache_stats():
+    """
+    获取进程内 XML 缓存的统计信息
+
+    返回文档缓存和路径表达式缓存的条目数与命中/未命中次数，
+    以及各 XML 类型目标文件的解析统计（读取字节数、解析耗时）和查询结果缓存统计
+    """
+    return {
+        "documents": shared_document_cache().stats(),
+        "xpath": shared_xpath_cache().stats(),
+        "parse": {
+            xml_type: shared_xml_core(config).core.parse_stats()
+            for xml_type, config in XML_BUILD_TYPES.items()
+        },
+        "queries": {
+            xml_type: shared_xml_core(config).core.query_stats()
+            for xml_type, config in XML_BUILD_TYPES.items()
+        },
+    }
@@ -12,6 +12,7 @@ class XmlBuildConfig(BaseModel):
     element_matcher: str  # 元素匹配属性名
     element_tag: str  # 元素标签名
     display_name: str  # 显示名称（中文）
+    shard_dir: Optional[str] = None  # 分片存储目录（为空时直接读写 xml_path）
 
 
 class Settings(BaseSettings):
@@ -21,6 +22,9 @@ class Settings(BaseSettings):
     zhipu_api_key: str
     ai_model: str = "glm-4.7"
     ai_provider: str = "zhipu"
+    ai_executor_workers: int = 16  # 大模型调用线程池大小（单个 worker 可同时进行的生成数）
+    ai_max_connections: int = 20  # 大模型 HTTP 连接池上限（keep-alive）
+    ai_timeout: float = 300.0  # 大模型请求超时时间（秒）
 
     # 服务配置
     port: int = 8000
@@ -38,13 +42,24 @@ class Settings(BaseSettings):
         "application/octet-stream",  # Windows 常见文件类型
     ]
 
+    # 生成缓存配置（相同配置重复上传时复用大模型响应）
+    generation_cache_enabled: bool = True
+    generation_cache_dir: str = "uploads/generation_cache"  # 磁盘缓存目录（多 worker 共用）
+    generation_cache_size: int = 128  # 内存缓存条目数
+
     # 对话配置
-    max_context_messages: int = 20  # 保留的上下文消息数量
+    max_context_messages: int = 20  # 原文发送的上下文消息数量上限
+    context_token_budget: int = 8000  # 对话上下文（不含系统提示词）的 token 预算
+    context_summary_chars: int = 200  # 较早消息摘要的最大字符数
+    conversation_file_cache_bytes: int = 50 * 1024 * 1024  # 每个会话的文件内容缓存上限（字节）
 
     # ORM 配置
     orm_xml_path: str = "templates/app.orm.xml"  # ORM 文件路径，默认指向模板
     orm_default_package: str = "app.module"  # 默认包名前缀
     orm_table_prefix: str = ""  # 表名前缀（如 "lt_", "mall_"）
+    xml_executor_workers: int = 4  # XML 解析/写入线程池大小
+    xml_use_mmap: bool = False  # 解析目标 XML 时是否通过 mmap 分块读取
+    orm_shard_dir: Optional[str] = None  # ORM 分片目录，设置后每个实体单独存为一个文件
 
     # 构建配置
     project_root: str = "."  # 项目根目录，默认为当前目录
@@ -70,7 +85,8 @@ XML_BUILD_TYPES: Dict[str, XmlBuildConfig] = {
         parent_xpath=".//entities",
         element_matcher="name",
         element_tag="entity",
-        display_name="实体"
+        display_name="实体",
+        shard_dir=settings.orm_shard_dir
     ),
     "config": XmlBuildConfig(
         name="配置项",
@@ -5,8 +5,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from .config import settings
+from .config import settings, XML_BUILD_TYPES
 from .api import upload, conversations, orm, xml, build
+from .services.ai_client import shared_ai_executor
+from xml_core import shared_xml_executor, shared_xpath_cache
 
 # Windows 上设置 ProactorEventLoop 以支持 subprocess
 if platform.system() == 'Windows':
@@ -32,6 +34,20 @@ async def lifespan(app: FastAPI):
     os.makedirs(settings.upload_dir, exist_ok=True)
     logger.info(f"📁 上传目录: {settings.upload_dir}")
 
+    # XML 合并在线程池中执行，避免阻塞事件循环
+    shared_xml_executor(settings.xml_executor_workers)
+    logger.info(f"🧵 XML 线程池: {settings.xml_executor_workers} 个线程")
+
+    # 大模型调用在线程池中执行，单个 worker 可同时处理多个生成请求
+    shared_ai_executor(settings.ai_executor_workers)
+    logger.info(f"🤖 AI 线程池: {settings.ai_executor_workers} 个线程，连接池上限 {settings.ai_max_connections}")
+
+    # 预编译各 XML 类型的父容器路径（进程内共享的路径表达式缓存）
+    for config in XML_BUILD_TYPES.values():
+        core = xml.shared_xml_core(config).core
+        core.precompile([config.parent_xpath])
+    logger.info(f"🧭 XPath 缓存: {shared_xpath_cache().stats()}")
+
     yield
     # 关闭时清理
     logger.info("👋 Auto-Builder Python 关闭")
@@ -1,3 +1,3 @@
-from .task import Task, TaskStatus, OrmGenerationResult, TaskSubmitResponse
+from .task import Task, TaskStatus, OrmEntityResult, OrmGenerationResult, TaskSubmitResponse
 
-__all__ = ["Task", "TaskStatus", "OrmGenerationResult", "TaskSubmitResponse"]
+__all__ = ["Task", "TaskStatus", "OrmEntityResult", "OrmGenerationResult", "TaskSubmitResponse"]
@@ -13,5 +13,5 @@ class WriteEntityResponse(BaseModel):
     """写入 Entity 响应"""
     success: bool
     entity_name: str
-    action: str  # created/updated
+    action: str  # created/updated/skipped
     message: str
@@ -1,7 +1,7 @@
 from enum import Enum
 from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 import uuid
 
 
@@ -13,13 +13,21 @@ class TaskStatus(str, Enum):
     FAILED = "failed"
 
 
-class OrmGenerationResult(BaseModel):
-    """ORM 生成结果"""
-    xml: str = Field(..., description="生成的 MyBatis XML 配置")
+class OrmEntityResult(BaseModel):
+    """单个实体的生成结果"""
+    xml: str = Field(..., description="实体 XML 片段")
     entity_name: str = Field(..., description="实体类名称")
     table_name: str = Field(..., description="数据库表名")
 
 
+class OrmGenerationResult(BaseModel):
+    """ORM 生成结果"""
+    xml: str = Field(..., description="生成的 MyBatis XML 配置（第一个实体）")
+    entity_name: str = Field(..., description="实体类名称（第一个实体）")
+    table_name: str = Field(..., description="数据库表名（第一个实体）")
+    entities: List[OrmEntityResult] = Field(default_factory=list, description="本次生成的全部实体（按输出顺序）")
+
+
 class Task(BaseModel):
     """任务模型"""
     task_id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="任务ID")
@@ -27,6 +35,7 @@ class Task(BaseModel):
     status: TaskStatus = Field(default=TaskStatus.PENDING, description="任务状态")
     error_message: Optional[str] = Field(None, description="错误信息（失败时）")
     result: Optional[OrmGenerationResult] = Field(None, description="生成结果（成功时）")
+    cached: bool = Field(default=False, description="结果是否来自生成缓存")
     created_at: datetime = Field(default_factory=datetime.utcnow, description="创建时间")
     completed_at: Optional[datetime] = Field(None, description="完成时间")
 
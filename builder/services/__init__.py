@@ -1,5 +1,6 @@
 from .ai_service import AIService
+from .ai_client import AsyncAIClient
 from .parser import OrmXmlParser
 from .task_service import TaskService
 
-__all__ = ["AIService", "OrmXmlParser", "TaskService"]
+__all__ = ["AIService", "AsyncAIClient", "OrmXmlParser", "TaskService"]
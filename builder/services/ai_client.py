@@ -0,0 +1,176 @@
+"""大模型客户端的 asyncio 封装"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Optional
+
+import httpx
+from zhipuai import ZhipuAI
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_shared_client: Optional[ZhipuAI] = None
+_shared_executor: Optional[ThreadPoolExecutor] = None
+_shared_lock = threading.Lock()
+
+# 流结束标记
+_DONE = object()
+
+
+def shared_ai_client() -> ZhipuAI:
+    """
+    获取进程级共享的 ZhipuAI 客户端
+
+    所有请求共用一个 httpx 连接池（keep-alive），连接数上限由
+    settings.ai_max_connections 决定，避免每个服务各建一套连接、重复握手。
+
+    Returns:
+        ZhipuAI 单例
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=settings.ai_max_connections,
+                        max_keepalive_connections=settings.ai_max_connections
+                    ),
+                    timeout=httpx.Timeout(settings.ai_timeout, connect=10.0)
+                )
+                _shared_client = ZhipuAI(api_key=settings.zhipu_api_key, http_client=http_client)
+    return _shared_client
+
+
+def shared_ai_executor(max_workers: Optional[int] = None) -> ThreadPoolExecutor:
+    """
+    获取进程级共享的大模型调用线程池
+
+    ZhipuAI SDK 只提供同步接口，调用在该线程池中执行；流式生成在整个生成期间
+    占用一个线程，因此线程数即单个 worker 可同时进行的生成数。
+    线程数在首次调用时确定，之后的 max_workers 参数被忽略。
+
+    Args:
+        max_workers: 最大线程数，默认 settings.ai_executor_workers
+
+    Returns:
+        ThreadPoolExecutor 单例
+    """
+    global _shared_executor
+    if _shared_executor is None:
+        with _shared_lock:
+            if _shared_executor is None:
+                _shared_executor = ThreadPoolExecutor(
+                    max_workers=max_workers or settings.ai_executor_workers,
+                    thread_name_prefix="ai_client"
+                )
+    return _shared_executor
+
+
+class AsyncAIClient:
+    """
+    ZhipuAI 的非阻塞封装 - 请求在有界线程池中执行，事件循环只等待结果
+
+    示例用法:
+        client = AsyncAIClient()
+        response = await client.create(model=..., messages=[...])
+        async for chunk in client.stream(model=..., messages=[...]):
+            ...
+    """
+
+    def __init__(self, client: Optional[Any] = None, executor: Optional[Executor] = None):
+        """
+        初始化封装
+
+        Args:
+            client: ZhipuAI 客户端（可选），默认使用进程级共享客户端
+            executor: 执行器（可选），默认使用进程级共享线程池
+        """
+        self.client = client if client is not None else shared_ai_client()
+        self.executor = executor if executor is not None else shared_ai_executor()
+
+    async def create(self, **params) -> Any:
+        """
+        非流式调用 chat.completions.create
+
+        Args:
+            **params: 请求参数（model、messages 等）
+
+        Returns:
+            SDK 返回的响应对象
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            lambda: self.client.chat.completions.create(**params)
+        )
+
+    async def stream(self, **params) -> AsyncIterator[Any]:
+        """
+        流式调用 chat.completions.create（自动设置 stream=True）
+
+        SDK 的同步流在线程池中迭代，每个分片通过 call_soon_threadsafe 交给事件循环。
+        调用方提前结束迭代（如客户端断开）时通知工作线程停止并关闭 HTTP 响应。
+
+        Args:
+            **params: 请求参数（model、messages 等）
+
+        Yields:
+            SDK 返回的流式分片
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def emit(item: Any) -> None:
+            if cancelled.is_set():
+                return
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # 事件循环已关闭
+                cancelled.set()
+
+        def produce() -> None:
+            response = None
+            try:
+                response = self.client.chat.completions.create(**{**params, "stream": True})
+                for chunk in response:
+                    if cancelled.is_set():
+                        break
+                    emit(chunk)
+            except Exception as e:
+                emit(e)
+                return
+            finally:
+                if cancelled.is_set():
+                    _close_stream(response)
+            emit(_DONE)
+
+        loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # 提前结束时工作线程在收到下一个分片后退出并关闭连接
+            cancelled.set()
+
+
+def _close_stream(response: Any) -> None:
+    """关闭流式响应（SDK 的 StreamResponse 关闭其底层 HTTP 响应，生成器直接 close）"""
+    target = getattr(response, "response", response)
+    close = getattr(target, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            logger.debug("关闭流式响应失败", exc_info=True)
@@ -1,27 +1,45 @@
-from zhipuai import ZhipuAI
 from ..config import settings
-from pathlib import Path
-from typing import List, Dict, Iterator
+from .ai_client import AsyncAIClient, shared_ai_client
+from .prompt_registry import shared_prompt_registry
+from ..storage.generation_cache import generation_key
+from typing import Any, AsyncIterator, List, Dict, Iterator
+
+
+# ORM 生成的温度参数（同时参与生成缓存的键）
+ORM_TEMPERATURE = 0.3
 
 
 class AIService:
     def __init__(self):
-        self.client = ZhipuAI(api_key=settings.zhipu_api_key)
+        # 进程内共享同一个客户端（同一个 keep-alive 连接池）
+        self.client = shared_ai_client()
+        self.aio = AsyncAIClient(self.client)
+        self.prompts = shared_prompt_registry()
 
     def generate_orm(self, config_content: str) -> str:
         """调用智谱 AI 生成 ORM"""
-        prompt = self._build_prompt(config_content)
+        response = self.client.chat.completions.create(**self._orm_params(config_content))
+        return response.choices[0].message.content
 
-        response = self.client.chat.completions.create(
-            model=settings.ai_model,
-            messages=[
-                {"role": "user", "content": prompt}
+    async def generate_orm_async(self, config_content: str) -> str:
+        """调用智谱 AI 生成 ORM（在线程池中执行，不阻塞事件循环）"""
+        response = await self.aio.create(**self._orm_params(config_content))
+        return response.choices[0].message.content
+
+    def _orm_params(self, config_content: str) -> dict:
+        """构建 ORM 生成的请求参数"""
+        return {
+            "model": settings.ai_model,
+            "messages": [
+                {"role": "user", "content": self._build_prompt(config_content)}
             ],
-            temperature=0.3,
-            max_tokens=4096,
-        )
+            "temperature": ORM_TEMPERATURE,
+            "max_tokens": 4096,
+        }
 
-        return response.choices[0].message.content
+    def orm_cache_key(self, config_content: str) -> str:
+        """ORM 生成结果的缓存键（配置内容、提示词模板、模型或温度变化时键随之变化）"""
+        return generation_key(config_content, self._load_orm_template(), settings.ai_model, ORM_TEMPERATURE)
 
     def chat(self, messages: List[Dict[str, str]], temperature: float = 0.7, use_system_prompt: bool = False) -> str:
         """通用对话接口"""
@@ -57,29 +75,20 @@ class AIService:
 
 然后给出你的最终答案。"""
 
-        # 非思考模式：加载orm.md文件并注入配置
-        prompt_path = Path(__file__).parent.parent / "prompts" / "orm.md"
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            prompt = f.read()
-
-        # 注入配置
+        # 非思考模式：orm.md 注入配置（按配置取值渲染一次后缓存，文件修改后自动重新加载）
         config_vars = {
-            "{{DEFAULT_PACKAGE}}": settings.orm_default_package,
-            "{{TABLE_PREFIX}}": settings.orm_table_prefix,
+            "DEFAULT_PACKAGE": settings.orm_default_package,
+            "TABLE_PREFIX": settings.orm_table_prefix,
         }
-
-        for var, value in config_vars.items():
-            prompt = prompt.replace(var, value)
-
-        return prompt
+        return self.prompts.render("orm.md", config_vars)
 
     def _build_prompt(self, config_content: str) -> str:
         """构建完整提示词"""
-        prompt_path = Path(__file__).parent.parent / "prompts" / "orm.md"
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            template = f.read()
+        return f"{self._load_orm_template()}\n\n输入配置:\n{config_content}"
 
-        return f"{template}\n\n输入配置:\n{config_content}"
+    def _load_orm_template(self) -> str:
+        """获取 ORM 提示词模板原文"""
+        return self.prompts.raw("orm.md")
 
     def chat_stream(
         self,
@@ -100,6 +109,52 @@ class AIService:
         Yields:
             tuple[str, bool | None]: (文本片段, 是否为思考内容)
         """
+        request_params = self._chat_stream_params(messages, temperature, use_system_prompt, enable_thinking)
+
+        try:
+            # 调用智谱AI流式接口
+            response = self.client.chat.completions.create(**request_params)
+
+            # 迭代返回增量文本
+            for chunk in response:
+                yield from self._chunk_deltas(chunk, enable_thinking)
+
+        except Exception as e:
+            # 错误处理：yield错误信息
+            yield (f"\n[错误] {str(e)}", None)
+            raise
+
+    async def chat_stream_async(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        use_system_prompt: bool = False,
+        enable_thinking: bool = False
+    ) -> AsyncIterator[tuple[str, bool | None]]:
+        """
+        异步流式对话接口 - 参数与返回值同 chat_stream
+
+        SDK 的同步流在线程池中迭代，事件循环在等待分片期间可以处理其他请求。
+        """
+        request_params = self._chat_stream_params(messages, temperature, use_system_prompt, enable_thinking)
+
+        try:
+            async for chunk in self.aio.stream(**request_params):
+                for delta in self._chunk_deltas(chunk, enable_thinking):
+                    yield delta
+
+        except Exception as e:
+            yield (f"\n[错误] {str(e)}", None)
+            raise
+
+    def _chat_stream_params(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        use_system_prompt: bool,
+        enable_thinking: bool
+    ) -> dict:
+        """构建流式对话的请求参数"""
         # 构建完整消息列表
         full_messages = []
 
@@ -127,28 +182,21 @@ class AIService:
             }
 
         # 调试日志
-        import sys
         print(f"[DEBUG] 请求参数 thinking={enable_thinking}", flush=True)
         print(f"[DEBUG] 完整参数: {request_params}", flush=True)
 
-        try:
-            # 调用智谱AI流式接口
-            response = self.client.chat.completions.create(**request_params)
-
-            # 迭代返回增量文本
-            for chunk in response:
-                if chunk.choices:
-                    delta = chunk.choices[0].delta
+        return request_params
 
-                    # 在思考模式下，检查是否有推理内容
-                    if enable_thinking and hasattr(delta, 'reasoning_content') and delta.reasoning_content:
-                        yield (delta.reasoning_content, True)
+    @staticmethod
+    def _chunk_deltas(chunk: Any, enable_thinking: bool) -> Iterator[tuple[str, bool]]:
+        """从流式分片中取出 (文本片段, 是否为思考内容)"""
+        if chunk.choices:
+            delta = chunk.choices[0].delta
 
-                    # 检查是否有普通内容（最终答案）
-                    if hasattr(delta, 'content') and delta.content:
-                        yield (delta.content, False)
+            # 在思考模式下，检查是否有推理内容
+            if enable_thinking and hasattr(delta, 'reasoning_content') and delta.reasoning_content:
+                yield (delta.reasoning_content, True)
 
-        except Exception as e:
-            # 错误处理：yield错误信息
-            yield (f"\n[错误] {str(e)}", None)
-            raise
+            # 检查是否有普通内容（最终答案）
+            if hasattr(delta, 'content') and delta.content:
+                yield (delta.content, False)
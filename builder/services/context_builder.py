@@ -0,0 +1,248 @@
+import logging
+import math
+import re
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from ..models.conversation import Message, MessageRole
+
+logger = logging.getLogger(__name__)
+
+# 每条消息的固定开销（角色、分隔符等）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# CJK 统一表意文字、假名、全角标点：每个字符约 1 个 token
+_CJK = re.compile(r"[　-ヿ㐀-䶿一-鿿豈-﫿＀-￯]")
+_CODE_BLOCK = re.compile(r"```(\w*)\n?(.*?)```", re.S)
+_ENTITY_NAME = re.compile(r"<entity\b[^>]*?\bname=\"([^\"]+)\"")
+_WHITESPACE = re.compile(r"\s+")
+
+SUMMARY_HEADER = "以下是较早对话的摘要（原文已省略）："
+
+# 摘要中的角色名
+_ROLE_LABELS = {
+    MessageRole.USER: "用户",
+    MessageRole.ASSISTANT: "助手",
+    MessageRole.SYSTEM: "系统",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的 token 数（本地近似，不调用分词器）
+
+    中日文字符按每字 1 个 token，其余字符按每 4 个字符 1 个 token。
+    对中英混合的提示词与 GLM/GPT 系列分词器的实际结果误差在 20% 以内，
+    偏向高估，用于预算控制足够。
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的 token 数
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def summarize_message(message: Message, max_chars: int) -> str:
+    """
+    生成消息的本地摘要：代码块折叠为一行说明（XML 列出实体名），空白合并，超长截断
+
+    Args:
+        message: 消息
+        max_chars: 摘要最大字符数
+
+    Returns:
+        摘要文本
+    """
+    def collapse(match: re.Match) -> str:
+        lang, body = match.group(1), match.group(2)
+        names = _ENTITY_NAME.findall(body)
+        if names:
+            return f"[XML 实体: {', '.join(names)}]"
+        return f"[{lang or '代码'}块 {len(body)} 字符]"
+
+    text = _WHITESPACE.sub(" ", _CODE_BLOCK.sub(collapse, message.content)).strip()
+    if len(text) > max_chars:
+        text = text[:max_chars].rstrip() + "…"
+    if message.file_references:
+        text += f"（附 {len(message.file_references)} 个文件）"
+    return text
+
+
+class BuiltContext:
+    """构建结果：发送给模型的消息及统计"""
+
+    __slots__ = ("messages", "tokens", "full_messages", "summarized", "dropped", "truncated_files")
+
+    def __init__(self):
+        self.messages: List[Dict[str, str]] = []
+        self.tokens = 0  # messages 的估算 token 数
+        self.full_messages = 0  # 原文发送的消息数
+        self.summarized = 0  # 以摘要形式发送的消息数
+        self.dropped = 0  # 预算不足被省略的消息数
+        self.truncated_files = 0  # 被截断的附件数
+
+    def stats(self) -> dict:
+        return {
+            "context_tokens": self.tokens,
+            "full_messages": self.full_messages,
+            "summarized_messages": self.summarized,
+            "dropped_messages": self.dropped,
+            "truncated_files": self.truncated_files,
+        }
+
+
+class ContextBuilder:
+    """
+    按 token 预算构建对话上下文
+
+    从最新一条消息开始向前填充：放得下的消息原文发送（含附件内容），
+    放不下或超过 max_messages 条之后的较早消息改用摘要；摘要按消息 ID 缓存，
+    同一条消息只生成一次。最新一条消息总是原文发送，附件过大时按剩余预算截断。
+    """
+
+    def __init__(
+        self,
+        budget_tokens: int,
+        max_messages: int = 20,
+        summary_chars: int = 200,
+        summary_budget_ratio: float = 0.25
+    ):
+        """
+        Args:
+            budget_tokens: 对话上下文（不含系统提示词）的 token 预算
+            max_messages: 原文发送的最大消息数
+            summary_chars: 单条摘要的最大字符数
+            summary_budget_ratio: 为摘要预留的预算比例（最新消息之外的原文消息不占用这部分）
+        """
+        self.budget_tokens = budget_tokens
+        self.max_messages = max_messages
+        self.summary_chars = summary_chars
+        self.summary_budget_ratio = summary_budget_ratio
+
+    async def build(
+        self,
+        messages: List[Message],
+        read_file: Callable[[str], Awaitable[Optional[str]]],
+        summaries: Optional[Dict[str, str]] = None
+    ) -> BuiltContext:
+        """
+        构建上下文
+
+        Args:
+            messages: 会话消息（按时间顺序，最后一条为本次用户消息）
+            read_file: 按文件 ID 读取附件内容的异步函数，返回 (显示名 + 内容) 或 None
+            summaries: 摘要缓存（消息 ID → 摘要），通常保存在会话上
+
+        Returns:
+            BuiltContext
+        """
+        context = BuiltContext()
+        if not messages:
+            return context
+        summaries = summaries if summaries is not None else {}
+
+        # 原文消息最多使用的预算，至少为摘要保留一部分
+        full_budget = int(self.budget_tokens * (1 - self.summary_budget_ratio))
+        remaining = self.budget_tokens
+        recent: List[Dict[str, str]] = []
+
+        index = len(messages) - 1
+        while index >= 0 and len(recent) < self.max_messages:
+            message = messages[index]
+            newest = index == len(messages) - 1
+            limit = remaining if newest else min(remaining, full_budget - (self.budget_tokens - remaining))
+            content = await self._full_content(message, read_file, limit, context, truncate=newest)
+            if content is None:
+                break
+            tokens = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+            recent.append({"role": message.role.value, "content": content})
+            remaining -= tokens
+            index -= 1
+
+        context.full_messages = len(recent)
+
+        # 更早的消息按新到旧加入摘要，直到预算用完
+        summary_lines: List[str] = []
+        header_tokens = estimate_tokens(SUMMARY_HEADER) + MESSAGE_OVERHEAD_TOKENS
+        budget_left = remaining - header_tokens
+        while index >= 0:
+            message = messages[index]
+            summary = summaries.get(message.id)
+            if summary is None:
+                summary = summaries[message.id] = summarize_message(message, self.summary_chars)
+            line = f"- {_ROLE_LABELS.get(message.role, message.role.value)}: {summary}"
+            tokens = estimate_tokens(line) + 1
+            if tokens > budget_left:
+                break
+            summary_lines.append(line)
+            budget_left -= tokens
+            index -= 1
+
+        context.summarized = len(summary_lines)
+        context.dropped = index + 1
+
+        if summary_lines:
+            summary_lines.reverse()
+            context.messages.append({
+                "role": MessageRole.SYSTEM.value,
+                "content": SUMMARY_HEADER + "\n" + "\n".join(summary_lines)
+            })
+        recent.reverse()
+        context.messages.extend(recent)
+        context.tokens = sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in context.messages)
+        logger.debug(f"构建对话上下文: {context.stats()}")
+        return context
+
+    async def _full_content(
+        self,
+        message: Message,
+        read_file: Callable[[str], Awaitable[Optional[str]]],
+        limit: int,
+        context: BuiltContext,
+        truncate: bool
+    ) -> Optional[str]:
+        """
+        消息原文（附件内容在前）；超出 limit 时返回 None，truncate=True 时改为截断附件
+
+        先按正文判断，放不下时不再读取附件；附件逐个读取，累计超出 limit 时停止读取。
+        """
+        body_tokens = estimate_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+        if body_tokens > limit and not truncate:
+            return None
+
+        files = []
+        file_tokens = []
+        total = body_tokens
+        for file_id in message.file_references:
+            file_text = await read_file(file_id)
+            if not file_text:
+                continue
+            tokens = estimate_tokens(file_text)
+            total += tokens
+            if total > limit and not truncate:
+                return None
+            files.append(file_text)
+            file_tokens.append(tokens)
+
+        if total <= limit:
+            return "\n".join(files) + message.content
+
+        # 最新消息：按剩余预算依次截断附件
+        available = max(limit - body_tokens, 0)
+        kept = []
+        for text, tokens in zip(files, file_tokens):
+            if tokens <= available:
+                kept.append(text)
+                available -= tokens
+                continue
+            # token 数与字符数近似成正比，按比例截取
+            chars = int(len(text) * available / tokens) if tokens else 0
+            kept.append(text[:chars] + f"\n…（附件已截断，原文 {len(text)} 字符）\n")
+            context.truncated_files += 1
+            available = 0
+        return "\n".join(kept) + message.content
+
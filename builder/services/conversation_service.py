@@ -1,8 +1,12 @@
+import asyncio
 import logging
+import os
+import sys
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from fastapi import UploadFile, HTTPException
 
 from ..models.conversation import (
@@ -18,6 +22,106 @@ from .ai_service import AIService
 logger = logging.getLogger(__name__)
 
 
+class _CachedFile:
+    """已读取的会话文件：stat 指纹和预先格式化的上下文块（文本从块中切出，不另存一份）"""
+
+    __slots__ = ("identity", "block", "offset", "size")
+
+    def __init__(self, identity: Tuple[int, int], name: str, text: str):
+        self.identity = identity
+        header = f"\n[文件: {name}]\n"
+        self.block = f"{header}{text}\n"
+        self.offset = len(header)
+        # 实际占用的内存（字符串对象大小），用于缓存上限计算
+        self.size = sys.getsizeof(self.block)
+
+    @property
+    def text(self) -> str:
+        """解码后的文件内容"""
+        return self.block[self.offset:-1]
+
+
+class SessionFileCache:
+    """
+    会话文件内容缓存
+
+    按文件 ID 缓存文件内容，以 (mtime_ns, size) 作为指纹，文件变化时重新读取；
+    读取在线程中进行，不阻塞事件循环。缓存总大小（按字符串实际占用的内存计）超过
+    max_bytes 时按最近最少使用淘汰，单个超过上限的文件不缓存。
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _CachedFile]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, file_info: FileInfo) -> Optional[_CachedFile]:
+        """
+        获取文件内容，缓存有效时不读取磁盘
+
+        Args:
+            file_info: 会话文件信息
+
+        Returns:
+            缓存条目，文件不存在或读取失败时返回 None
+        """
+        try:
+            st = os.stat(file_info.file_path)
+        except OSError:
+            logger.warning(f"文件不存在: {file_info.file_path}")
+            self.discard(file_info.id)
+            return None
+        identity = (st.st_mtime_ns, st.st_size)
+
+        entry = self._entries.get(file_info.id)
+        if entry is not None and entry.identity == identity:
+            self._entries.move_to_end(file_info.id)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        text = await asyncio.to_thread(_read_text, file_info.file_path)
+        if text is None:
+            self.discard(file_info.id)
+            return None
+
+        entry = _CachedFile(identity, file_info.original_name, text)
+        self.discard(file_info.id)
+        if entry.size <= self.max_bytes:
+            self._entries[file_info.id] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+        return entry
+
+    def discard(self, file_id: str) -> None:
+        """移除一个条目"""
+        entry = self._entries.pop(file_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def _read_text(file_path: str) -> Optional[str]:
+    """同步读取文本文件（在线程中调用）"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except Exception as e:
+        logger.error(f"读取文件失败: {file_path}, 错误: {e}")
+        return None
+
+
 class Session:
     """会话状态（内存存储）"""
     def __init__(self, session_id: str, title: str):
@@ -25,6 +129,8 @@ class Session:
         self.title = title
         self.messages: List[Message] = []
         self.files: Dict[str, FileInfo] = {}
+        self.file_cache = SessionFileCache(settings.conversation_file_cache_bytes)
+        self.summaries: Dict[str, str] = {}  # 消息 ID → 上下文摘要缓存
         self.created_at = datetime.utcnow()
         self.updated_at = datetime.utcnow()
 
@@ -191,18 +297,21 @@ class ConversationService:
         # 从内存中删除会话
         return store.delete(conversation_id)
 
-    async def _read_file_content(self, file_path: str) -> Optional[str]:
-        """读取文件内容"""
-        try:
-            path = Path(file_path)
-            if not path.exists():
-                logger.warning(f"文件不存在: {file_path}")
-                return None
+    async def read_file_block(self, session: Session, file_id: str) -> Optional[str]:
+        """
+        获取会话文件的上下文块（"[文件: 原名]" + 内容），优先使用会话的文件缓存
 
-            # 根据文件扩展名决定读取方式
-            with open(path, 'r', encoding='utf-8') as f:
-                return f.read()
+        Args:
+            session: 会话
+            file_id: 文件ID
 
-        except Exception as e:
-            logger.error(f"读取文件失败: {file_path}, 错误: {e}")
+        Returns:
+            格式化后的文件内容，文件不属于该会话或读取失败时返回 None
+        """
+        file_info = session.files.get(file_id)
+        if file_info is None:
+            return None
+        entry = await session.file_cache.get(file_info)
+        if entry is None or len(entry.block) == entry.offset + 1:
             return None
+        return entry.block
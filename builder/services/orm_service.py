@@ -4,24 +4,27 @@
 """
 
 from pydantic import BaseModel
-from xml_core import XmlCore
+from xml_core import XmlCore, shared_document_cache
 from ..config import settings
 
 
 class WriteEntityResult(BaseModel):
     """写入结果"""
     entity_name: str
-    action: str  # created/updated
+    action: str  # created/updated/skipped
 
 
 class OrmXmlService:
     """ORM XML 文件操作服务"""
 
     def __init__(self):
-        # 使用 xml_core 包
-        self.core = XmlCore.for_orm(
-            xml_path=settings.orm_xml_path,
-            encoding="utf-8"
+        # 使用 xml_core 包（与 XML 合并接口共用同一文件的实例）
+        self.core = XmlCore.shared(
+            settings.orm_xml_path,
+            encoding="utf-8",
+            cache=shared_document_cache(),
+            use_mmap=settings.xml_use_mmap,
+            shard_dir=settings.orm_shard_dir
         )
 
     def write_entity(self, entity_xml: str) -> WriteEntityResult:
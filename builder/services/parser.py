@@ -1,4 +1,4 @@
-from ..models.task import OrmGenerationResult
+from ..models.task import OrmEntityResult, OrmGenerationResult
 from xml_core.parser import XmlParser
 from xml_core.formatter import XmlFormatter
 from xml_core.exceptions import XmlParseError
@@ -10,25 +10,25 @@ class OrmXmlParser:
         self.formatter = XmlFormatter()
 
     def parse(self, ai_response: str) -> OrmGenerationResult:
-        """解析 AI 返回的 XML"""
+        """解析 AI 返回的 XML（一次响应可包含多个 entity）"""
         try:
-            # 使用 xml_core 解析并查找 entity 标签
-            # parse_fragment 会自动处理代码块标记和命名空间
-            entity_element = self.parser.parse_fragment(
-                ai_response,
-                target_tag="entity"
-            )
-
-            entity_name = entity_element.get("name", "app.module.Entity")
-            table_name = entity_element.get("tableName", "entity_table")
-
-            # 格式化为字符串
-            xml_content = self.formatter.format_element(entity_element)
+            # 使用 xml_core 解析并查找全部 entity 标签
+            # parse_fragments 会自动处理代码块标记和命名空间，片段只解析一次
+            entities = []
+            for entity_element in self.parser.parse_fragments(ai_response, target_tag="entity"):
+                entities.append(OrmEntityResult(
+                    # 格式化为字符串
+                    xml=self.formatter.format_element(entity_element),
+                    entity_name=entity_element.get("name", "app.module.Entity"),
+                    table_name=entity_element.get("tableName", "entity_table"),
+                ))
 
+            first = entities[0]
             return OrmGenerationResult(
-                xml=xml_content,
-                entity_name=entity_name,
-                table_name=table_name,
+                xml=first.xml,
+                entity_name=first.entity_name,
+                table_name=first.table_name,
+                entities=entities,
             )
 
         except XmlParseError as e:
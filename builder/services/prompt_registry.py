@@ -0,0 +1,139 @@
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
+
+# 模板中的变量占位符，如 {{DEFAULT_PACKAGE}}
+_PLACEHOLDER = re.compile(r"\{\{([A-Z0-9_]+)\}\}")
+
+
+class _Template:
+    """已加载的模板：原文、文件身份和按变量缓存的渲染结果"""
+
+    __slots__ = ("identity", "text", "rendered", "checked_at")
+
+    def __init__(self, identity: Tuple[int, int], text: str, checked_at: float):
+        self.identity = identity
+        self.text = text
+        self.rendered: Dict[Tuple[Tuple[str, str], ...], str] = {}
+        self.checked_at = checked_at
+
+
+class PromptRegistry:
+    """
+    提示词模板注册表
+
+    模板（prompts 目录下的任意文件，包括 references/ 子目录）在首次使用时读取，
+    按变量取值渲染一次后缓存；文件的 mtime/size 变化时重新读取。为避免每次请求
+    都访问磁盘，同一文件最多每 check_interval 秒 stat 一次。
+    """
+
+    def __init__(self, prompts_dir: Path = PROMPTS_DIR, check_interval: float = 1.0):
+        """
+        初始化注册表
+
+        Args:
+            prompts_dir: 模板根目录
+            check_interval: 检查文件是否变化的最小间隔（秒），0 表示每次都检查
+        """
+        self.prompts_dir = Path(prompts_dir)
+        self._root = self.prompts_dir.resolve()
+        self.check_interval = check_interval
+        self._templates: Dict[str, _Template] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def raw(self, name: str) -> str:
+        """
+        获取模板原文
+
+        Args:
+            name: 相对于模板根目录的路径（如 "orm.md"、"references/orm.xdef"）
+
+        Returns:
+            模板原文
+
+        Raises:
+            FileNotFoundError: 模板不存在
+        """
+        return self._template(name).text
+
+    def render(self, name: str, variables: Optional[Mapping[str, str]] = None) -> str:
+        """
+        获取渲染后的模板（{{NAME}} 替换为 variables 中的值，未提供的占位符保持原样）
+
+        同一模板、同一组变量取值只渲染一次；变量取值变化（如配置修改）时重新渲染。
+
+        Args:
+            name: 相对于模板根目录的路径
+            variables: 变量取值
+
+        Returns:
+            渲染结果
+        """
+        template = self._template(name)
+        key = tuple(sorted(variables.items())) if variables else ()
+        rendered = template.rendered.get(key)
+        if rendered is None:
+            values = dict(key)
+            rendered = _PLACEHOLDER.sub(lambda m: values.get(m.group(1), m.group(0)), template.text)
+            template.rendered[key] = rendered
+        return rendered
+
+    def names(self) -> List[str]:
+        """列出模板根目录下的全部模板（相对路径，按名称排序）"""
+        return sorted(
+            path.relative_to(self.prompts_dir).as_posix()
+            for path in self.prompts_dir.rglob("*")
+            if path.is_file()
+        )
+
+    def clear(self) -> None:
+        """丢弃全部已加载的模板"""
+        with self._lock:
+            self._templates.clear()
+
+    def _template(self, name: str) -> _Template:
+        # 检查间隔内直接返回，不访问磁盘（已缓存的名称在首次加载时校验过路径）
+        now = time.monotonic()
+        template = self._templates.get(name)
+        if template is not None and now - template.checked_at < self.check_interval:
+            return template
+
+        path = (self._root / name).resolve()
+        if self._root not in path.parents:
+            raise FileNotFoundError(f"提示词模板不存在: {name}")
+
+        st = path.stat()
+        identity = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            template = self._templates.get(name)
+            if template is not None and template.identity == identity:
+                template.checked_at = now
+                return template
+
+            text = path.read_text(encoding="utf-8")
+            template = self._templates[name] = _Template(identity, text, now)
+            self.loads += 1
+            logger.info(f"加载提示词模板: {name} ({len(text)} 字符)")
+            return template
+
+
+_shared_registry: Optional[PromptRegistry] = None
+_shared_lock = threading.Lock()
+
+
+def shared_prompt_registry() -> PromptRegistry:
+    """获取进程级共享的提示词模板注册表"""
+    global _shared_registry
+    if _shared_registry is None:
+        with _shared_lock:
+            if _shared_registry is None:
+                _shared_registry = PromptRegistry()
+    return _shared_registry
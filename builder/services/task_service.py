@@ -1,27 +1,47 @@
 import asyncio
 import logging
 from datetime import datetime
+from typing import Optional
 from ..models.task import Task, TaskStatus, OrmGenerationResult
 from .ai_service import AIService
 from .parser import OrmXmlParser
 from ..storage.task_store import TaskStore
+from ..storage.generation_cache import GenerationCache
+from ..config import settings
 
 logger = logging.getLogger(__name__)
 
 
 class TaskService:
-    def __init__(self, store: TaskStore):
+    def __init__(self, store: TaskStore, cache: Optional[GenerationCache] = None):
         self.store = store
         self.ai_service = AIService()
         self.parser = OrmXmlParser()
+        if cache is None and settings.generation_cache_enabled:
+            cache = GenerationCache(settings.generation_cache_dir, max_entries=settings.generation_cache_size)
+        self.cache = cache
 
-    async def submit_task(self, file_name: str, content: str) -> str:
-        """提交任务并立即返回 task_id"""
+    async def submit_task(
+        self,
+        file_name: str,
+        content: str,
+        use_cache: bool = True,
+        refresh_cache: bool = False
+    ) -> str:
+        """
+        提交任务并立即返回 task_id
+
+        Args:
+            file_name: 上传的文件名
+            content: 配置内容
+            use_cache: 是否使用生成缓存（False 时既不读取也不写入）
+            refresh_cache: 是否丢弃已缓存的结果并重新生成（新结果写回缓存）
+        """
         task = Task(file_name=file_name)
         self.store.save(task)
 
         # 后台异步处理
-        asyncio.create_task(self._process_task(task.task_id, content))
+        asyncio.create_task(self._process_task(task.task_id, content, use_cache, refresh_cache))
 
         logger.info(f"任务已提交: {task.task_id}, 文件: {file_name}")
         return task.task_id
@@ -30,7 +50,13 @@ class TaskService:
         """查询任务状态"""
         return self.store.get(task_id)
 
-    async def _process_task(self, task_id: str, content: str):
+    async def _process_task(
+        self,
+        task_id: str,
+        content: str,
+        use_cache: bool = True,
+        refresh_cache: bool = False
+    ):
         """后台处理任务（核心解耦逻辑）"""
         task = self.store.get(task_id)
         if not task:
@@ -42,12 +68,30 @@ class TaskService:
             self.store.save(task)
             logger.info(f"开始处理任务: {task_id}")
 
-            # 调用 AI 生成
-            ai_response = self.ai_service.generate_orm(content)
-            logger.info(f"AI 响应完成: {task_id}, 响应长度: {len(ai_response)}")
+            cache = self.cache if use_cache else None
+            cache_key = self.ai_service.orm_cache_key(content) if cache is not None else None
+            ai_response = None
+            if cache is not None:
+                if refresh_cache:
+                    await asyncio.to_thread(cache.invalidate, cache_key)
+                else:
+                    ai_response = await asyncio.to_thread(cache.get, cache_key)
+            task.cached = ai_response is not None
+
+            if ai_response is None:
+                # 调用 AI 生成（在线程池中等待响应，不阻塞事件循环）
+                ai_response = await self.ai_service.generate_orm_async(content)
+                logger.info(f"AI 响应完成: {task_id}, 响应长度: {len(ai_response)}")
+            else:
+                logger.info(f"命中生成缓存: {task_id}, 键: {cache_key[:12]}")
 
-            # 解析 XML
+            # 解析 XML（一次响应中的全部实体）
             result = self.parser.parse(ai_response)
+            logger.info(f"解析出 {len(result.entities)} 个实体: {task_id}")
+
+            # 只缓存能成功解析的响应
+            if cache is not None and not task.cached:
+                await asyncio.to_thread(cache.put, cache_key, ai_response, settings.ai_model)
 
             # 更新结果
             task.status = TaskStatus.SUCCESS
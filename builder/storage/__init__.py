@@ -1,3 +1,4 @@
 from .task_store import TaskStore
+from .generation_cache import GenerationCache
 
-__all__ = ["TaskStore"]
+__all__ = ["TaskStore", "GenerationCache"]
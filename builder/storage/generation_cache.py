@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_config(content: str) -> str:
+    """
+    规范化配置内容：JSON 按键排序、去掉多余空白；非 JSON 内容只统一换行和首尾空白
+
+    Args:
+        content: 上传的配置内容
+
+    Returns:
+        规范化后的文本
+    """
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return content.replace("\r\n", "\n").strip()
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def generation_key(config_content: str, prompt: str, model: str, temperature: float) -> str:
+    """
+    计算生成缓存的键：sha256(规范化配置, 提示词模板哈希, 模型, 温度)
+
+    Args:
+        config_content: 配置内容
+        prompt: 提示词模板原文
+        model: 模型名称
+        temperature: 温度参数
+
+    Returns:
+        十六进制摘要
+    """
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    parts = [normalize_config(config_content), prompt_hash, model, repr(float(temperature))]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    大模型生成结果缓存（内存 LRU + 本地磁盘两级）
+
+    磁盘条目按键存为 `<cache_dir>/<前两位>/<键>.json`，通过临时文件 + os.replace
+    原子写入，服务重启后仍然有效，同一台机器上的多个 worker 共用。
+    内存条目记录对应磁盘文件的 (mtime_ns, size, inode)，读取时 stat 一次校验，
+    其他 worker 删除或重写条目后本 worker 不会返回旧结果。
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int = 128):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        # 键 -> (磁盘文件身份, 响应)；磁盘写入失败时身份为 None
+        self._entries: "OrderedDict[str, Tuple[Optional[Tuple[int, int, int]], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存的响应，依次查找内存和磁盘，未命中返回 None"""
+        identity = _identity(self._path(key))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == identity:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+
+        record = self._read(key)
+        with self._lock:
+            if record is None:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, *record)
+        return record[1]
+
+    def put(self, key: str, response: str, model: Optional[str] = None) -> None:
+        """写入磁盘和内存（磁盘写入失败只记录警告，条目只保存在内存中）"""
+        path = self._path(key)
+        record = {
+            "key": key,
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "response": response,
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp_", suffix=".json")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(record, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"生成缓存写入磁盘失败: {path}, 错误: {e}")
+
+        with self._lock:
+            self._remember(key, _identity(path), response)
+
+    def invalidate(self, key: str) -> bool:
+        """删除一个条目（内存和磁盘），返回是否存在"""
+        with self._lock:
+            existed = self._entries.pop(key, None) is not None
+        try:
+            self._path(key).unlink()
+            existed = True
+        except FileNotFoundError:
+            pass
+        return existed
+
+    def clear(self) -> None:
+        """清空内存层（磁盘条目保留）"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._entries),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+    def _remember(self, key: str, identity: Optional[Tuple[int, int, int]], response: str) -> None:
+        self._entries[key] = (identity, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _read(self, key: str) -> Optional[Tuple[Tuple[int, int, int], str]]:
+        """读取磁盘条目，返回 (文件身份, 响应)"""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                st = os.fstat(f.fileno())
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"生成缓存条目损坏，已忽略: {key}, 错误: {e}")
+            return None
+        if record.get("key") != key or not isinstance(record.get("response"), str):
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino), record["response"]
+
+
+def _identity(path: Path) -> Optional[Tuple[int, int, int]]:
+    """磁盘文件的 (mtime_ns, size, inode)，不存在时返回 None（os.replace 写入的文件 inode 总是新的）"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from builder.services.ai_client import AsyncAIClient
+from builder.services.ai_service import AIService
+
+
+def _chunk(content):
+    delta = SimpleNamespace(content=content, reasoning_content=None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class FakeCompletions:
+    """Blocking stand-in for ZhipuAI chat.completions"""
+
+    def __init__(self, delay=0.05, chunks=("a", "b", "c"), fail_after=None):
+        self.delay = delay
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.closed = threading.Event()
+
+    def create(self, stream=False, **params):
+        if not stream:
+            time.sleep(self.delay)
+            message = SimpleNamespace(content="".join(self.chunks))
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        return self._stream()
+
+    def _stream(self):
+        try:
+            for i, content in enumerate(self.chunks):
+                if self.fail_after is not None and i == self.fail_after:
+                    raise RuntimeError("upstream failed")
+                time.sleep(self.delay)
+                yield _chunk(content)
+        finally:
+            self.closed.set()
+
+
+def _client(completions, workers=8):
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return AsyncAIClient(fake, executor=ThreadPoolExecutor(max_workers=workers))
+
+
+class TestAsyncAIClient:
+    @pytest.mark.asyncio
+    async def test_concurrent_streams_do_not_block_loop(self):
+        """Four 0.3s streams finish together and the loop keeps ticking"""
+        client = _client(FakeCompletions(delay=0.1))
+
+        async def consume():
+            return [c.choices[0].delta.content async for c in client.stream(model="m", messages=[])]
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        results = await asyncio.gather(*(consume() for _ in range(4)))
+        elapsed = time.perf_counter() - start
+        tick_task.cancel()
+
+        assert results == [["a", "b", "c"]] * 4
+        assert elapsed < 0.9
+        assert ticks > 10
+
+    @pytest.mark.asyncio
+    async def test_create_runs_in_executor(self):
+        """Non-streaming calls are awaited off the event loop"""
+        client = _client(FakeCompletions(delay=0.1))
+
+        responses = await asyncio.gather(*(client.create(model="m", messages=[]) for _ in range(4)))
+
+        assert [r.choices[0].message.content for r in responses] == ["abc"] * 4
+
+    @pytest.mark.asyncio
+    async def test_stream_error_propagates(self):
+        """Errors raised by the SDK iterator surface in the async iterator"""
+        client = _client(FakeCompletions(delay=0, fail_after=1))
+        received = []
+
+        with pytest.raises(RuntimeError, match="upstream failed"):
+            async for chunk in client.stream(model="m", messages=[]):
+                received.append(chunk.choices[0].delta.content)
+
+        assert received == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_early_exit_stops_worker(self):
+        """Leaving the loop early stops the worker thread and releases the stream"""
+        completions = FakeCompletions(delay=0.05, chunks=tuple("abcdefghij"))
+        client = _client(completions)
+
+        async for _ in client.stream(model="m", messages=[]):
+            break
+
+        assert await asyncio.to_thread(completions.closed.wait, 1.0)
+
+    @pytest.mark.asyncio
+    async def test_ai_service_chat_stream_async(self):
+        """AIService.chat_stream_async yields (text, is_thinking) tuples"""
+        service = AIService.__new__(AIService)
+        service.aio = _client(FakeCompletions(delay=0))
+
+        deltas = [d async for d in service.chat_stream_async([{"role": "user", "content": "hi"}])]
+
+        assert deltas == [("a", False), ("b", False), ("c", False)]
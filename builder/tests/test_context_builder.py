@@ -0,0 +1,124 @@
+import pytest
+from builder.models.conversation import Message, MessageRole
+from builder.services.context_builder import (
+    SUMMARY_HEADER,
+    ContextBuilder,
+    estimate_tokens,
+    summarize_message,
+)
+
+
+def _conversation(turns: int, size: int = 400):
+    messages = []
+    for i in range(turns):
+        messages.append(Message(role=MessageRole.USER, content=f"question {i} " + "q" * size))
+        messages.append(Message(role=MessageRole.ASSISTANT, content=f"answer {i} " + "a" * size))
+    return messages
+
+
+async def _no_files(file_id):
+    return None
+
+
+class TestEstimateTokens:
+    def test_ascii_and_cjk(self):
+        """ASCII counts ~4 characters per token, CJK one token per character"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("a" * 40) == 10
+        assert estimate_tokens("生成实体") == 4
+        assert estimate_tokens("生成 entity") == 2 + 2
+
+
+class TestSummarizeMessage:
+    def test_collapses_xml_and_truncates(self):
+        """Code blocks collapse to entity names; long text is cut at max_chars"""
+        message = Message(
+            role=MessageRole.ASSISTANT,
+            content='结果如下\n```xml\n<entity name="app.User"/>\n<entity name="app.Role"/>\n```\n' + "说明" * 100,
+        )
+
+        summary = summarize_message(message, max_chars=40)
+
+        assert summary.startswith("结果如下 [XML 实体: app.User, app.Role]")
+        assert summary.endswith("…")
+        assert len(summary) == 41
+
+
+class TestContextBuilder:
+    @pytest.mark.asyncio
+    async def test_small_history_sent_verbatim(self):
+        """A history within budget is sent in full, in order, with its token count"""
+        messages = _conversation(2, size=20)
+        context = await ContextBuilder(budget_tokens=1000).build(messages, _no_files)
+
+        assert [m["content"] for m in context.messages] == [m.content for m in messages]
+        assert context.full_messages == 4
+        assert context.summarized == 0
+        assert context.tokens == sum(estimate_tokens(m.content) + 4 for m in messages)
+
+    @pytest.mark.asyncio
+    async def test_budget_summarizes_older_turns(self):
+        """Older turns that do not fit become one summary message; the total stays within budget"""
+        messages = _conversation(20)
+        summaries = {}
+        builder = ContextBuilder(budget_tokens=1000, summary_chars=30)
+
+        context = await builder.build(messages, _no_files, summaries)
+
+        assert context.tokens <= 1000
+        assert context.messages[0]["role"] == "system"
+        assert context.messages[0]["content"].startswith(SUMMARY_HEADER)
+        assert context.messages[-1]["content"] == messages[-1].content
+        assert context.full_messages + context.summarized + context.dropped == len(messages)
+        assert context.summarized > 0
+        assert len(summaries) >= context.summarized
+
+        # Cached summaries are reused rather than regenerated
+        cached = dict(summaries)
+        await builder.build(messages, _no_files, summaries)
+        assert all(summaries[key] is value for key, value in cached.items())
+
+    @pytest.mark.asyncio
+    async def test_max_messages_caps_verbatim_turns(self):
+        """No more than max_messages are sent verbatim even if the budget allows more"""
+        messages = _conversation(5, size=10)
+        context = await ContextBuilder(budget_tokens=10000, max_messages=3).build(messages, _no_files)
+
+        assert context.full_messages == 3
+        assert context.summarized == 7
+
+    @pytest.mark.asyncio
+    async def test_newest_message_files_truncated(self):
+        """An oversized attachment on the newest message is truncated to fit the budget"""
+        files = {"f1": "\n[文件: big.json]\n" + "x" * 20000 + "\n"}
+
+        async def read_file(file_id):
+            return files.get(file_id)
+
+        messages = [Message(role=MessageRole.USER, content="生成实体", file_references=["f1", "missing"])]
+        context = await ContextBuilder(budget_tokens=500).build(messages, read_file)
+
+        assert context.truncated_files == 1
+        assert context.full_messages == 1
+        assert context.tokens <= 520
+        assert context.messages[0]["content"].startswith("\n[文件: big.json]\n")
+        assert context.messages[0]["content"].endswith("生成实体")
+
+    @pytest.mark.asyncio
+    async def test_summarized_message_files_not_read(self):
+        """Attachments are only loaded for messages sent verbatim, never for summarized ones"""
+        reads = []
+
+        async def read_file(file_id):
+            reads.append(file_id)
+            return "\n[文件: a.json]\n" + "x" * 400 + "\n"
+
+        messages = [
+            Message(role=MessageRole.USER, content="old " + "q" * 4000, file_references=["old"]),
+            Message(role=MessageRole.ASSISTANT, content="answer"),
+            Message(role=MessageRole.USER, content="生成实体", file_references=["new"]),
+        ]
+        context = await ContextBuilder(budget_tokens=1000).build(messages, read_file)
+
+        assert context.summarized == 1
+        assert reads == ["new"]
@@ -0,0 +1,143 @@
+import asyncio
+import shutil
+import tempfile
+
+import pytest
+from builder.models.task import TaskStatus
+from builder.services.task_service import TaskService
+from builder.storage.generation_cache import GenerationCache, generation_key
+from builder.storage.task_store import TaskStore
+
+
+ENTITY_RESPONSE = """```xml
+<entity name="com.example.User" tableName="sys_user">
+    <columns><column name="id"/></columns>
+</entity>
+```"""
+
+
+@pytest.fixture
+def cache_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path)
+
+
+class TestGenerationKey:
+    def test_json_formatting_ignored(self):
+        """Key ordering and whitespace in JSON configs do not change the key"""
+        a = generation_key('{"b": 1, "a": [1, 2]}', "prompt", "glm", 0.3)
+        b = generation_key('{\n  "a": [1,2],\n  "b": 1\n}', "prompt", "glm", 0.3)
+
+        assert a == b
+
+    def test_inputs_change_key(self):
+        """Config, prompt, model and temperature all participate in the key"""
+        base = generation_key('{"a": 1}', "prompt", "glm", 0.3)
+
+        assert base != generation_key('{"a": 2}', "prompt", "glm", 0.3)
+        assert base != generation_key('{"a": 1}', "prompt v2", "glm", 0.3)
+        assert base != generation_key('{"a": 1}', "prompt", "glm-5", 0.3)
+        assert base != generation_key('{"a": 1}', "prompt", "glm", 0.7)
+
+
+class TestGenerationCache:
+    def test_disk_tier_survives_new_instance(self, cache_dir):
+        """A fresh instance (restart / other worker) reads entries from disk"""
+        GenerationCache(cache_dir).put("ab" * 32, "response")
+
+        other = GenerationCache(cache_dir)
+        assert other.get("ab" * 32) == "response"
+        assert other.get("ab" * 32) == "response"
+        assert other.stats() == {"memory_entries": 1, "memory_hits": 1, "disk_hits": 1, "misses": 0}
+
+    def test_memory_lru_eviction(self, cache_dir):
+        """The memory tier keeps at most max_entries entries"""
+        cache = GenerationCache(cache_dir, max_entries=2)
+        for key in ("k1", "k2", "k3"):
+            cache.put(key, key)
+
+        assert cache.stats()["memory_entries"] == 2
+        assert cache.get("k1") == "k1"
+        assert cache.stats()["disk_hits"] == 1
+
+    def test_invalidate(self, cache_dir):
+        """invalidate removes the entry from both tiers"""
+        cache = GenerationCache(cache_dir)
+        cache.put("key1", "response")
+
+        assert cache.invalidate("key1") is True
+        assert cache.get("key1") is None
+        assert GenerationCache(cache_dir).get("key1") is None
+
+    def test_refresh_visible_to_other_worker(self, cache_dir):
+        """Another worker's memory tier notices when an entry is invalidated or rewritten on disk"""
+        worker_a = GenerationCache(cache_dir)
+        worker_b = GenerationCache(cache_dir)
+        worker_a.put("key1", "old")
+        assert worker_b.get("key1") == "old"
+
+        worker_a.invalidate("key1")
+        assert worker_b.get("key1") is None
+
+        worker_a.put("key1", "new")
+        assert worker_b.get("key1") == "new"
+        assert worker_b.get("key1") == "new"
+        assert worker_b.stats()["memory_hits"] == 1
+
+
+class CountingAIService:
+    """Stand-in for AIService that counts generations"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def orm_cache_key(self, content):
+        return generation_key(content, "prompt", "glm", 0.3)
+
+    async def generate_orm_async(self, content):
+        self.calls += 1
+        return ENTITY_RESPONSE
+
+
+async def _run(service, content, **options):
+    task_id = await service.submit_task("a.json", content, **options)
+    for _ in range(100):
+        task = await service.get_task(task_id)
+        if task.status in (TaskStatus.SUCCESS, TaskStatus.FAILED):
+            return task
+        await asyncio.sleep(0.01)
+    raise AssertionError("task did not finish")
+
+
+class TestTaskServiceCache:
+    @pytest.fixture
+    def service(self, cache_dir):
+        service = TaskService(TaskStore(), cache=GenerationCache(cache_dir))
+        service.ai_service = CountingAIService()
+        return service
+
+    @pytest.mark.asyncio
+    async def test_repeat_upload_hits_cache(self, service):
+        """Uploading the same config twice calls the model once"""
+        first = await _run(service, '{"table": "sys_user"}')
+        second = await _run(service, '{ "table" : "sys_user" }')
+
+        assert service.ai_service.calls == 1
+        assert first.cached is False
+        assert second.cached is True
+        assert second.result.entity_name == "com.example.User"
+
+    @pytest.mark.asyncio
+    async def test_bypass_and_refresh(self, service):
+        """no-cache skips the cache; refresh regenerates and stores again"""
+        await _run(service, '{"t": 1}')
+
+        bypassed = await _run(service, '{"t": 1}', use_cache=False)
+        refreshed = await _run(service, '{"t": 1}', refresh_cache=True)
+        cached = await _run(service, '{"t": 1}')
+
+        assert service.ai_service.calls == 3
+        assert not bypassed.cached
+        assert not refreshed.cached
+        assert cached.cached
@@ -77,3 +77,23 @@ class TestOrmXmlParser:
         with pytest.raises(ValueError) as exc:
             parser.parse(xml)
         assert "XML 解析失败" in str(exc.value)
+
+    def test_parse_multiple_entities(self):
+        """Test parsing every entity from one AI response"""
+        parser = OrmXmlParser()
+        xml = """```xml
+        <entity name="com.example.Order" tableName="order">
+            <column name="id" />
+        </entity>
+        <entity name="com.example.OrderItem" tableName="order_item">
+            <column name="orderId" />
+        </entity>
+        ```"""
+
+        result = parser.parse(xml)
+
+        assert [e.entity_name for e in result.entities] == ["com.example.Order", "com.example.OrderItem"]
+        assert [e.table_name for e in result.entities] == ["order", "order_item"]
+        assert result.entity_name == "com.example.Order"
+        assert result.xml == result.entities[0].xml
+        assert 'name="com.example.OrderItem"' in result.entities[1].xml
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+from builder.services.prompt_registry import PROMPTS_DIR, PromptRegistry
+
+
+@pytest.fixture
+def prompts_dir():
+    path = Path(tempfile.mkdtemp())
+    (path / "references").mkdir()
+    (path / "orm.md").write_text("package {{DEFAULT_PACKAGE}}, prefix {{TABLE_PREFIX}}, keep {{OTHER}}", encoding="utf-8")
+    (path / "references" / "orm.xdef").write_text("<orm/>", encoding="utf-8")
+    yield path
+    shutil.rmtree(path)
+
+
+def _touch(path: Path, text: str):
+    """Rewrite a file and move its mtime forward so the change is visible"""
+    path.write_text(text, encoding="utf-8")
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000_000))
+
+
+class TestPromptRegistry:
+    def test_render_once_per_variables(self, prompts_dir):
+        """Templates are read once and rendered once per set of variable values"""
+        registry = PromptRegistry(prompts_dir, check_interval=0)
+        variables = {"DEFAULT_PACKAGE": "app.module", "TABLE_PREFIX": "lt_"}
+
+        first = registry.render("orm.md", variables)
+        second = registry.render("orm.md", dict(variables))
+
+        assert first == "package app.module, prefix lt_, keep {{OTHER}}"
+        assert second is first
+        assert registry.loads == 1
+        assert registry.render("orm.md", {**variables, "TABLE_PREFIX": "mall_"}).endswith("prefix mall_, keep {{OTHER}}")
+        assert registry.loads == 1
+
+    def test_reload_on_change(self, prompts_dir):
+        """A changed mtime reloads the template"""
+        registry = PromptRegistry(prompts_dir, check_interval=0)
+        assert registry.raw("references/orm.xdef") == "<orm/>"
+
+        _touch(prompts_dir / "references" / "orm.xdef", "<orm version='2'/>")
+
+        assert registry.raw("references/orm.xdef") == "<orm version='2'/>"
+        assert registry.loads == 2
+
+    def test_check_interval_skips_stat(self, prompts_dir):
+        """Within check_interval the cached template is returned without touching disk"""
+        registry = PromptRegistry(prompts_dir, check_interval=60)
+        registry.raw("orm.md")
+
+        _touch(prompts_dir / "orm.md", "changed")
+
+        assert registry.raw("orm.md").startswith("package")
+
+    def test_cached_lookup_does_no_path_io(self, prompts_dir, monkeypatch):
+        """Within check_interval neither stat nor path resolution touches the filesystem"""
+        registry = PromptRegistry(prompts_dir, check_interval=60)
+        registry.raw("orm.md")
+
+        def fail(*args, **kwargs):
+            raise AssertionError("filesystem accessed")
+
+        monkeypatch.setattr(Path, "resolve", fail)
+        monkeypatch.setattr(Path, "stat", fail)
+
+        assert registry.raw("orm.md").startswith("package")
+
+    def test_new_variants_and_listing(self, prompts_dir):
+        """New files are picked up without a restart; paths outside the directory are rejected"""
+        registry = PromptRegistry(prompts_dir)
+        (prompts_dir / "references" / "api.md").write_text("api", encoding="utf-8")
+
+        assert registry.names() == ["orm.md", "references/api.md", "references/orm.xdef"]
+        assert registry.raw("references/api.md") == "api"
+        with pytest.raises(FileNotFoundError):
+            registry.raw("../outside.md")
+
+    def test_bundled_orm_prompt(self):
+        """The bundled orm.md renders its configuration placeholders"""
+        rendered = PromptRegistry(PROMPTS_DIR).render("orm.md", {"DEFAULT_PACKAGE": "x.y", "TABLE_PREFIX": "t_"})
+
+        assert "{{DEFAULT_PACKAGE}}" not in rendered
+        assert "x.y.LtProduct" in rendered
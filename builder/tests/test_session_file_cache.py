@@ -0,0 +1,89 @@
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from builder.models.conversation import FileInfo
+from builder.services.conversation_service import SessionFileCache
+
+
+@pytest.fixture
+def upload_dir():
+    path = Path(tempfile.mkdtemp())
+    yield path
+    shutil.rmtree(path)
+
+
+def _file(directory: Path, name: str, text: str) -> FileInfo:
+    path = directory / name
+    path.write_text(text, encoding="utf-8")
+    return FileInfo(original_name=name, stored_name=name, file_path=str(path), file_size=path.stat().st_size)
+
+
+class TestSessionFileCache:
+    @pytest.mark.asyncio
+    async def test_hit_returns_formatted_block(self, upload_dir):
+        """The second read of an unchanged file is served from memory with a preformatted block"""
+        info = _file(upload_dir, "config.json", '{"tables": []}')
+        cache = SessionFileCache(max_bytes=1024)
+
+        first = await cache.get(info)
+        second = await cache.get(info)
+
+        assert second is first
+        assert first.text == '{"tables": []}'
+        assert first.block == '\n[文件: config.json]\n{"tables": []}\n'
+        # The cap is charged for the block actually held; the text is a slice of it
+        assert cache.stats() == {"entries": 1, "bytes": sys.getsizeof(first.block), "hits": 1, "misses": 1}
+
+    @pytest.mark.asyncio
+    async def test_changed_file_reloaded(self, upload_dir):
+        """A new stat fingerprint forces a re-read"""
+        info = _file(upload_dir, "a.txt", "old")
+        cache = SessionFileCache(max_bytes=1024)
+        await cache.get(info)
+
+        Path(info.file_path).write_text("new content", encoding="utf-8")
+        st = os.stat(info.file_path)
+        os.utime(info.file_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000_000))
+
+        entry = await cache.get(info)
+        assert entry.text == "new content"
+        assert cache.stats()["bytes"] == sys.getsizeof(entry.block)
+
+    @pytest.mark.asyncio
+    async def test_memory_cap_evicts_least_recent(self, upload_dir):
+        """Entries beyond max_bytes are evicted oldest first; oversized files are not kept"""
+        a = _file(upload_dir, "a.txt", "a" * 40)
+        b = _file(upload_dir, "b.txt", "b" * 40)
+        c = _file(upload_dir, "c.txt", "c" * 40)
+        big = _file(upload_dir, "big.txt", "x" * 1000)
+        entry_size = sys.getsizeof("\n[文件: a.txt]\n" + "a" * 40 + "\n")
+        cache = SessionFileCache(max_bytes=entry_size * 2 + 10)
+
+        await cache.get(a)
+        await cache.get(b)
+        await cache.get(a)
+        await cache.get(c)
+
+        assert cache.stats()["entries"] == 2
+        assert cache.stats()["bytes"] == entry_size * 2
+        assert (await cache.get(big)).text == "x" * 1000
+        assert cache.stats()["entries"] == 2
+        hits = cache.stats()["hits"]
+        await cache.get(a)
+        assert cache.stats()["hits"] == hits + 1
+
+    @pytest.mark.asyncio
+    async def test_missing_file(self, upload_dir):
+        """A deleted file returns None and drops its entry"""
+        info = _file(upload_dir, "gone.txt", "data")
+        cache = SessionFileCache(max_bytes=1024)
+        await cache.get(info)
+
+        os.unlink(info.file_path)
+
+        assert await cache.get(info) is None
+        assert cache.stats()["entries"] == 0
@@ -0,0 +1,80 @@
+import asyncio
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+from builder.api import upload
+from builder.config import XML_BUILD_TYPES
+from builder.models.task import TaskStatus
+from builder.services.task_service import TaskService
+from builder.storage.generation_cache import GenerationCache, generation_key
+from builder.storage.task_store import TaskStore
+from xml_core import XmlCore
+
+
+TEMPLATE = Path(__file__).resolve().parents[1] / "templates" / "app.orm.xml"
+
+MODULE_RESPONSE = """```xml
+<entity name="com.example.Order" tableName="t_order">
+    <columns><column name="id"/></columns>
+</entity>
+<entity name="com.example.OrderItem" tableName="t_order_item">
+    <columns><column name="id"/><column name="orderId"/></columns>
+</entity>
+```"""
+
+
+class ModuleAIService:
+    """Stand-in for AIService that returns two entities in one response"""
+
+    def orm_cache_key(self, content):
+        return generation_key(content, "prompt", "glm", 0.3)
+
+    async def generate_orm_async(self, content):
+        return MODULE_RESPONSE
+
+
+@pytest.fixture
+def workspace(monkeypatch):
+    path = Path(tempfile.mkdtemp())
+    orm_file = path / "app.orm.xml"
+    shutil.copy(TEMPLATE, orm_file)
+    config = XML_BUILD_TYPES["orm"]
+    monkeypatch.setitem(XML_BUILD_TYPES, "orm", config.model_copy(update={"xml_path": str(orm_file)}))
+
+    service = TaskService(TaskStore(), cache=GenerationCache(str(path / "cache")))
+    service.ai_service = ModuleAIService()
+    monkeypatch.setattr(upload, "task_service", service)
+
+    yield orm_file, service
+    XmlCore.clear_shared()
+    shutil.rmtree(path)
+
+
+async def _run(service, content):
+    task_id = await service.submit_task("module.json", content)
+    for _ in range(100):
+        task = await service.get_task(task_id)
+        if task.status in (TaskStatus.SUCCESS, TaskStatus.FAILED):
+            return task
+        await asyncio.sleep(0.01)
+    raise AssertionError("task did not finish")
+
+
+class TestTaskMerge:
+    @pytest.mark.asyncio
+    async def test_merges_every_entity(self, workspace):
+        """Every entity of a multi-entity response is merged, not only the first"""
+        orm_file, service = workspace
+        task = await _run(service, '{"module": "order"}')
+
+        assert [e.entity_name for e in task.result.entities] == ["com.example.Order", "com.example.OrderItem"]
+
+        response = await upload.merge_result(task.task_id, patch=False)
+
+        assert [r.identifier for r in response.results] == ["com.example.Order", "com.example.OrderItem"]
+        assert [r.action for r in response.results] == ["created", "created"]
+        text = orm_file.read_text(encoding="utf-8")
+        assert 'name="com.example.Order"' in text
+        assert 'name="com.example.OrderItem"' in text
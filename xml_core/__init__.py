@@ -4,8 +4,17 @@
 """
 
 from .core import XmlCore
+from .aio import AsyncXmlCore, shared_xml_executor
 from .merger import XmlMerger, MergeResult
+from .patch import PatchReport, patch_element
+from .cache import DocumentCache, FileIdentity, shared_document_cache
+from .lock import FileLock
 from .parser import XmlParser
+from .pool import get_parser
+from .xpath import XPathCache, CompiledPath, shared_xpath_cache
+from .query import QueryCache
+from .shards import ShardedXmlStore
+from .stream import XmlStreamReader
 from .formatter import XmlFormatter
 from .namespace import NamespaceHandler
 from .settings import XmlCoreSettings, MergeOptions
@@ -13,7 +22,9 @@ from .exceptions import (
     XmlCoreError,
     XmlParseError,
     XmlMergeError,
+    XmlDuplicateIdentifierError,
     XmlFileNotFoundError,
+    XmlLockError,
     XmlValidationError
 )
 
@@ -21,16 +32,33 @@ from .exceptions import (
 __version__ = "0.1.0"
 __all__ = [
     "XmlCore",
+    "AsyncXmlCore",
+    "shared_xml_executor",
     "XmlMerger",
     "XmlParser",
+    "get_parser",
+    "XPathCache",
+    "CompiledPath",
+    "shared_xpath_cache",
+    "QueryCache",
+    "ShardedXmlStore",
+    "XmlStreamReader",
     "XmlFormatter",
     "NamespaceHandler",
     "MergeResult",
+    "PatchReport",
+    "patch_element",
+    "DocumentCache",
+    "FileIdentity",
+    "shared_document_cache",
+    "FileLock",
     "XmlCoreSettings",
     "MergeOptions",
     "XmlCoreError",
     "XmlParseError",
     "XmlMergeError",
+    "XmlDuplicateIdentifierError",
     "XmlFileNotFoundError",
+    "XmlLockError",
     "XmlValidationError",
 ]
\ No newline at end of file
@@ -0,0 +1,228 @@
+"""XmlCore 的 asyncio 封装"""
+
+import asyncio
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from .core import XmlCore
+from .merger import MergeResult
+
+
+T = TypeVar("T")
+
+DEFAULT_MAX_WORKERS = 4
+
+_shared_executor: Optional[ThreadPoolExecutor] = None
+_shared_executor_lock = threading.Lock()
+
+# 每个事件循环各自的文件写锁（asyncio.Lock 只能在创建它的事件循环中使用）
+_file_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Lock]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def shared_xml_executor(max_workers: int = DEFAULT_MAX_WORKERS) -> ThreadPoolExecutor:
+    """
+    获取进程级共享的 XML 线程池
+
+    线程数在首次调用时确定，之后的 max_workers 参数被忽略。
+
+    Args:
+        max_workers: 最大线程数
+
+    Returns:
+        ThreadPoolExecutor 单例
+    """
+    global _shared_executor
+    if _shared_executor is None:
+        with _shared_executor_lock:
+            if _shared_executor is None:
+                _shared_executor = ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix="xml_core"
+                )
+    return _shared_executor
+
+
+def _file_lock(path: str) -> asyncio.Lock:
+    """获取当前事件循环中某个文件的写锁"""
+    loop = asyncio.get_running_loop()
+    locks = _file_locks.get(loop)
+    if locks is None:
+        locks = _file_locks[loop] = {}
+    lock = locks.get(path)
+    if lock is None:
+        lock = locks[path] = asyncio.Lock()
+    return lock
+
+
+class AsyncXmlCore:
+    """
+    XmlCore 的非阻塞封装 - 供 FastAPI 等 asyncio 代码使用
+
+    解析、序列化和磁盘读写都在有界线程池中执行，事件循环只负责等待结果。
+    同一文件的写操作在事件循环内按调用顺序串行执行（asyncio.Lock 先到先得），
+    不占用线程池中的线程排队。
+
+    示例用法:
+        core = AsyncXmlCore.shared("app.orm.xml", cache=shared_document_cache())
+        result = await core.merge_entity(entity_xml)
+    """
+
+    def __init__(self, core: XmlCore, executor: Optional[Executor] = None):
+        """
+        初始化封装
+
+        Args:
+            core: 同步的 XmlCore 实例
+            executor: 执行器（可选），默认使用进程级共享线程池
+        """
+        self.core = core
+        self.executor = executor if executor is not None else shared_xml_executor()
+        self._path = os.path.abspath(str(core.settings.xml_path))
+
+    @classmethod
+    def shared(
+        cls,
+        xml_path: str,
+        encoding: str = "utf-8",
+        namespaces: Optional[list[str]] = None,
+        executor: Optional[Executor] = None,
+        **options
+    ) -> "AsyncXmlCore":
+        """
+        基于 XmlCore.shared 创建封装（同一文件共用同一个 XmlCore 实例）
+
+        Args:
+            xml_path: XML 文件路径
+            encoding: 文件编码
+            namespaces: 支持的命名空间前缀列表
+            executor: 执行器（可选）
+            **options: 其余 XmlCore 构造参数
+
+        Returns:
+            AsyncXmlCore 实例
+        """
+        core = XmlCore.shared(xml_path, encoding=encoding, namespaces=namespaces, **options)
+        return cls(core, executor=executor)
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """
+        在线程池中执行任意函数（不加文件写锁）
+
+        只适用于不读取共享缓存树的操作（如 iter_elements 流式读取），或自身持有
+        XmlCore 树锁的操作；读取缓存树的操作应通过 _write 与合并串行执行。
+
+        Args:
+            fn: 函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            函数返回值
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    async def _write(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """持有文件写锁，在线程池中执行写操作"""
+        async with _file_lock(self._path):
+            return await self.run(fn, *args, **kwargs)
+
+    async def merge_element(
+        self,
+        element_xml: str,
+        parent_xpath: str,
+        element_matcher: Optional[str] = None,
+        merge_strategy: str = "replace_or_append",
+        strip_ns_on_children: bool = True
+    ) -> MergeResult:
+        """
+        合并 XML 元素到文件（参数见 XmlCore.merge_element）
+
+        Returns:
+            MergeResult: 合并结果
+        """
+        return await self._write(
+            self.core.merge_element,
+            element_xml,
+            parent_xpath,
+            element_matcher=element_matcher,
+            merge_strategy=merge_strategy,
+            strip_ns_on_children=strip_ns_on_children
+        )
+
+    async def merge_elements(
+        self,
+        element_xmls: List[str],
+        parent_xpath: str,
+        element_matcher: Optional[str] = None,
+        merge_strategy: str = "replace_or_append",
+        strip_ns_on_children: bool = True
+    ) -> List[MergeResult]:
+        """
+        批量合并 XML 元素到文件（参数见 XmlCore.merge_elements）
+
+        Returns:
+            List[MergeResult]: 与输入顺序一致的合并结果
+        """
+        return await self._write(
+            self.core.merge_elements,
+            element_xmls,
+            parent_xpath,
+            element_matcher=element_matcher,
+            merge_strategy=merge_strategy,
+            strip_ns_on_children=strip_ns_on_children
+        )
+
+    async def query_element(self, xpath: str, namespace_map: Optional[dict] = None) -> Optional[str]:
+        """
+        查找元素并返回其序列化结果（参数见 XmlCore.query_element）
+
+        缓存命中时直接返回，不占用线程池（启用分片存储时需要先检查分片是否变化，不走此捷径）。
+        未命中时与同一文件的写操作一样持有文件写锁：查找要遍历共享的缓存树，
+        在事件循环中排在进行中的合并之后，而不是占着线程池线程等待树锁。
+
+        Returns:
+            元素的 XML 字符串，未找到返回 None
+        """
+        if self.core.shards is None:
+            cached = self.core.query_cache.peek(xpath, namespace_map)
+            if cached is not None:
+                return cached[0]
+        return await self._write(self.core.query_element, xpath, namespace_map)
+
+    async def materialize(self, force: bool = False) -> bool:
+        """
+        启用分片存储时重新生成完整文件（参数见 XmlCore.materialize）
+
+        Returns:
+            是否写入了目标文件
+        """
+        return await self._write(self.core.materialize, force)
+
+    async def merge_entity(self, entity_xml: str, entities_xpath: str = ".//entities") -> MergeResult:
+        """
+        合并 ORM 实体（参数见 XmlCore.merge_entity）
+
+        Returns:
+            MergeResult: 合并结果
+        """
+        return await self._write(self.core.merge_entity, entity_xml, entities_xpath)
+
+    async def merge_entities(
+        self,
+        entity_xmls: List[str],
+        entities_xpath: str = ".//entities"
+    ) -> List[MergeResult]:
+        """
+        批量合并 ORM 实体（参数见 XmlCore.merge_entities）
+
+        Returns:
+            List[MergeResult]: 与输入顺序一致的合并结果
+        """
+        return await self._write(self.core.merge_entities, entity_xmls, entities_xpath)
@@ -0,0 +1 @@
+"""xml_core 性能基准"""
@@ -0,0 +1,75 @@
+"""
+合成 ORM 语料：按 builder/templates/app.orm.xml 的结构生成指定数量的实体
+"""
+
+from pathlib import Path
+
+
+ROOT_OPEN = (
+    '<orm xmlns:ext="ext" xmlns:i18n-en="i18n-en" xmlns:ui="ui" '
+    'xmlns:x="/nop/schema/xdsl.xdef" x:schema="/nop/schema/orm/orm.xdef" '
+    'x:extends="_app.orm.xml">\n'
+)
+
+# (name, code, stdSqlType, stdDataType, 额外属性)
+COLUMNS = [
+    ("id", "ID", "INTEGER", "int", 'tagSet="seq" ui:show="R" primary="true" mandatory="true"'),
+    ("productName", "PRODUCT_NAME", "VARCHAR", "string", 'precision="255" mandatory="true" tagSet="disp"'),
+    ("productQuantity", "PRODUCT_QUANTITY", "INTEGER", "int", ''),
+    ("productSource", "PRODUCT_SOURCE", "VARCHAR", "string", 'precision="255" ext:dict="product_source"'),
+    ("productPrice", "PRODUCT_PRICE", "DECIMAL", "decimal", 'precision="18" scale="2"'),
+    ("addTime", "ADD_TIME", "DATETIME", "datetime", 'domain="createTime" ui:show="X"'),
+    ("updateTime", "UPDATE_TIME", "DATETIME", "datetime", 'domain="updateTime" ui:show="X"'),
+    ("deleted", "DELETED", "BOOLEAN", "boolean", 'domain="delFlag" ui:show="X"'),
+]
+
+
+def entity_xml(name: str, indent: str = "    ") -> str:
+    """
+    生成一个实体片段（8 个字段，使用 ext/ui/i18n-en 前缀）
+
+    Args:
+        name: 实体短名（如 `E42`）
+        indent: 实体的缩进
+
+    Returns:
+        实体 XML 字符串
+    """
+    class_name = f"bench.dao.entity.{name}"
+    lines = [
+        f'{indent}<entity className="{class_name}" name="{class_name}" tableName="bench_{name.lower()}" '
+        f'displayName="实体{name}" registerShortName="true" createTimeProp="addTime" '
+        f'updateTimeProp="updateTime" deleteFlagProp="deleted" useLogicalDelete="true" '
+        f'i18n-en:displayName="Entity {name}">',
+        f'{indent}  <columns>',
+    ]
+    for prop_id, (col, code, sql_type, data_type, extra) in enumerate(COLUMNS, start=1):
+        extra = f" {extra}" if extra else ""
+        lines.append(
+            f'{indent}    <column name="{col}" code="{code}" propId="{prop_id}" stdSqlType="{sql_type}" '
+            f'stdDataType="{data_type}"{extra} displayName="{col}" i18n-en:displayName="{col}"/>'
+        )
+    lines.append(f'{indent}  </columns>')
+    lines.append(f'{indent}  <comment>实体{name}</comment>')
+    lines.append(f'{indent}</entity>')
+    return "\n".join(lines)
+
+
+def write_corpus(path: Path, entities: int) -> Path:
+    """
+    写出包含指定数量实体的 ORM 文件
+
+    Args:
+        path: 目标文件路径
+        entities: 实体数量
+
+    Returns:
+        目标文件路径
+    """
+    parts = ["<?xml version='1.0' encoding='utf-8'?>\n", ROOT_OPEN, "  <entities>\n"]
+    for i in range(entities):
+        parts.append(entity_xml(f"E{i}"))
+        parts.append("\n")
+    parts.append("  </entities>\n</orm>\n")
+    path.write_text("".join(parts), encoding="utf-8")
+    return path
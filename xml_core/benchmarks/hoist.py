@@ -0,0 +1,76 @@
+"""
+命名空间提升基准：全树遍历 vs 只检查新插入的子树
+
+运行方式:
+    python -m xml_core.benchmarks.hoist
+    python -m xml_core.benchmarks.hoist --sizes 1000 10000 50000 --repeat 20
+"""
+
+import argparse
+import time
+from typing import List
+
+from lxml import etree
+
+from xml_core.formatter import XmlFormatter
+
+
+NS_X = "/nop/schema/xdsl.xdef"
+
+
+def build_tree(entities: int) -> etree._ElementTree:
+    """构造包含指定数量实体的 ORM 解析树"""
+    root = etree.Element("orm", nsmap={"x": NS_X})
+    root.set(f"{{{NS_X}}}schema", "/nop/schema/orm/orm.xdef")
+    container = etree.SubElement(root, "entities")
+    for i in range(entities):
+        entity = etree.SubElement(container, "entity", name=f"E{i}", tableName=f"t_e{i}")
+        columns = etree.SubElement(entity, "columns")
+        for name in ("id", "name", "created_at"):
+            etree.SubElement(columns, "column", name=name, code=name.upper())
+    return etree.ElementTree(root)
+
+
+def make_fragment(i: int) -> etree._Element:
+    """构造一个待插入的实体（只使用根节点已声明的前缀，即常见情况）"""
+    entity = etree.Element("entity", nsmap={"x": NS_X}, name=f"N{i}")
+    entity.set(f"{{{NS_X}}}abstract", "false")
+    columns = etree.SubElement(entity, "columns")
+    etree.SubElement(columns, "column", name="id", code="ID")
+    return entity
+
+
+def measure(entities: int, repeat: int) -> dict:
+    """插入 repeat 个实体，分别统计全树提升与增量提升的平均耗时（毫秒）"""
+    formatter = XmlFormatter()
+    results = {}
+    for mode in ("full", "incremental"):
+        tree = build_tree(entities)
+        container = tree.getroot()[0]
+        formatter._hoist_namespaces(tree)
+
+        elapsed = 0.0
+        for i in range(repeat):
+            fragment = make_fragment(i)
+            container.append(fragment)
+            start = time.perf_counter()
+            formatter._hoist_namespaces(tree, [fragment] if mode == "incremental" else None)
+            elapsed += time.perf_counter() - start
+        results[mode] = elapsed / repeat * 1000
+    return results
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="命名空间提升基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    print(f"{'entities':>10} {'full(ms)':>10} {'incremental(ms)':>16}")
+    for size in args.sizes:
+        result = measure(size, args.repeat)
+        print(f"{size:>10} {result['full']:>10.3f} {result['incremental']:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+xml_core 基准套件：在合成 ORM 语料上统计主要操作的耗时分布与峰值内存
+
+运行方式:
+    python -m xml_core.benchmarks.suite
+    python -m xml_core.benchmarks.suite --sizes 10 1000 --repeat 20 --output bench.json
+    python -m xml_core.benchmarks.suite --output new.json --compare old.json
+
+结果 JSON 结构:
+    {
+        "meta": {"commit": ..., "python": ..., "lxml": ..., "repeat": ..., ...},
+        "results": {
+            "<实体数>": {
+                "peak_rss_kb": ...,
+                "operations": {"parse_file": {"p50_ms": ..., "p95_ms": ..., ...}, ...}
+            }
+        }
+    }
+
+peak_rss_kb 是进程到该规模为止的峰值常驻内存（规模按从小到大执行）。
+"""
+
+import argparse
+import copy
+import gc
+import json
+import math
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from lxml import etree
+
+from xml_core.benchmarks.corpus import entity_xml, write_corpus
+from xml_core.core import XmlCore
+from xml_core.formatter import XmlFormatter
+from xml_core.parser import XmlParser
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+DEFAULT_SIZES = [10, 1000, 10000, 50000]
+
+OPERATIONS = [
+    "parse_file",
+    "parse_fragment",
+    "merge_create",
+    "merge_update",
+    "merge_skip",
+    "hoist_namespaces",
+    "format_element",
+    "write_tree",
+]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    最近秩百分位数
+
+    Args:
+        samples: 样本
+        pct: 百分位（0-100）
+
+    Returns:
+        对应的样本值
+    """
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> dict:
+    """
+    汇总耗时样本（秒）为毫秒统计
+
+    Args:
+        samples: 每次调用的耗时（秒）
+
+    Returns:
+        包含 n/p50/p95/mean/min/max 的字典
+    """
+    ms = [s * 1000 for s in samples]
+    return {
+        "n": len(ms),
+        "p50_ms": round(percentile(ms, 50), 4),
+        "p95_ms": round(percentile(ms, 95), 4),
+        "mean_ms": round(sum(ms) / len(ms), 4),
+        "min_ms": round(min(ms), 4),
+        "max_ms": round(max(ms), 4),
+    }
+
+
+def peak_rss_kb() -> Optional[int]:
+    """
+    当前进程的峰值常驻内存（KB），不支持的平台返回 None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 返回字节，Linux 返回 KB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def timed(repeat: int, fn: Callable[[int], None], setup: Optional[Callable[[int], None]] = None) -> List[float]:
+    """
+    重复执行 fn 并记录每次耗时（setup 不计时）
+
+    没有 setup 时先以序号 repeat 预热调用一次，不计入样本。
+
+    Args:
+        repeat: 次数
+        fn: 被测函数，参数为序号
+        setup: 每次执行前的准备函数
+
+    Returns:
+        每次的耗时（秒）
+    """
+    if setup is None:
+        fn(repeat)
+    # 回收之前留下的垃圾，避免回收停顿计入样本
+    gc.collect()
+    samples = []
+    for i in range(repeat):
+        if setup is not None:
+            setup(i)
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_size(entities: int, repeat: int, work_dir: Path) -> dict:
+    """
+    在指定规模的语料上执行全部操作
+
+    Args:
+        entities: 实体数量
+        repeat: 每个操作的重复次数
+        work_dir: 临时目录
+
+    Returns:
+        {"peak_rss_kb": ..., "operations": {操作名: 统计}}
+    """
+    corpus = write_corpus(work_dir / f"orm_{entities}.xml", entities)
+    parser = XmlParser()
+    formatter = XmlFormatter()
+    fragment = f"```xml\n{entity_xml('Fragment', indent='')}\n```"
+    samples: Dict[str, List[float]] = {}
+
+    samples["parse_file"] = timed(repeat, lambda i: parser.parse_file(str(corpus)))
+    samples["parse_fragment"] = timed(repeat, lambda i: parser.parse_fragment(fragment, target_tag="entity"))
+
+    # 合并：每次都完整走 解析 - 合并 - 写回（不启用文档缓存）
+    target = work_dir / f"merge_{entities}.orm.xml"
+    shutil.copy(corpus, target)
+    core = XmlCore(str(target))
+    samples["merge_create"] = timed(
+        repeat, lambda i: core.merge_entity(entity_xml(f"New{i}", indent=""))
+    )
+    # 每次的内容都不同，否则第二次起内容指纹相同会直接跳过写入
+    update_xml = entity_xml(f"E{entities // 2}", indent="").replace('displayName="实体', 'displayName="更新')
+    samples["merge_update"] = timed(
+        repeat, lambda i: core.merge_entity(update_xml.replace('displayName="更新', f'displayName="更新{i}'))
+    )
+    # 内容与现有实体相同：只解析和比较指纹，不写文件
+    samples["merge_skip"] = timed(repeat, lambda i: core.merge_entity(update_xml))
+
+    # 树上的操作：每次插入一个新实体后做一次全树命名空间提升
+    tree = parser.parse_file(str(corpus))
+    container = tree.getroot().find("entities")
+    new_entities = [
+        parser.parse_fragment(entity_xml(f"Hoist{i}", indent=""), target_tag="entity")
+        for i in range(repeat)
+    ]
+    samples["hoist_namespaces"] = timed(
+        repeat,
+        lambda i: formatter._hoist_namespaces(tree),
+        setup=lambda i: container.append(copy.deepcopy(new_entities[i]))
+    )
+
+    element = container[len(container) // 2]
+    samples["format_element"] = timed(repeat, lambda i: formatter.format_element(element))
+
+    out = work_dir / f"write_{entities}.orm.xml"
+    samples["write_tree"] = timed(repeat, lambda i: formatter.write_tree(tree, str(out)))
+
+    return {
+        "peak_rss_kb": peak_rss_kb(),
+        "operations": {name: summarize(samples[name]) for name in OPERATIONS},
+    }
+
+
+def git_commit() -> Optional[str]:
+    """当前提交的短哈希（不在 git 仓库中时返回 None）"""
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def run(sizes: List[int], repeat: int) -> dict:
+    """
+    执行基准套件
+
+    Args:
+        sizes: 语料规模（实体数）
+        repeat: 每个操作的重复次数
+
+    Returns:
+        结果字典（结构见模块说明）
+    """
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "lxml": ".".join(str(v) for v in etree.LXML_VERSION),
+            "libxml2": ".".join(str(v) for v in etree.LIBXML_VERSION),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": {},
+    }
+    work_dir = Path(tempfile.mkdtemp(prefix="xml_core_bench_"))
+    try:
+        for size in sorted(sizes):
+            report["results"][str(size)] = bench_size(size, repeat, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+def print_report(report: dict, baseline: Optional[dict] = None) -> None:
+    """
+    打印结果表（传入 baseline 时附带 p50 相对变化）
+
+    Args:
+        report: run() 的结果
+        baseline: 之前保存的结果
+    """
+    header = f"{'entities':>9} {'operation':<17} {'p50(ms)':>10} {'p95(ms)':>10}"
+    if baseline is not None:
+        header += f" {'base p50':>10} {'change':>8}"
+    print(header)
+
+    for size, result in report["results"].items():
+        base_ops = ((baseline or {}).get("results", {}).get(size) or {}).get("operations", {})
+        for name, stats in result["operations"].items():
+            line = f"{size:>9} {name:<17} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f}"
+            if baseline is not None:
+                base = base_ops.get(name)
+                if base and base["p50_ms"]:
+                    change = (stats["p50_ms"] / base["p50_ms"] - 1) * 100
+                    line += f" {base['p50_ms']:>10.3f} {change:>+7.1f}%"
+                else:
+                    line += f" {'-':>10} {'-':>8}"
+            print(line)
+        print(f"{size:>9} {'peak_rss_kb':<17} {result['peak_rss_kb']}")
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="xml_core 基准套件")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", type=Path, default=Path("xml_core_bench.json"))
+    parser.add_argument("--compare", type=Path, help="与之前保存的结果对比")
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None
+    report = run(args.sizes, args.repeat)
+    args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print_report(report, baseline)
+    print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""XML 文档缓存"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Union
+from lxml import etree
+
+
+PathLike = Union[str, os.PathLike]
+
+
+class FileIdentity(NamedTuple):
+    """文件身份（路径 + mtime/size/inode），用于判断缓存是否仍然有效"""
+    mtime_ns: int
+    size: int
+    inode: int
+    device: int
+
+    @classmethod
+    def from_stat(cls, st: os.stat_result) -> "FileIdentity":
+        return cls(st.st_mtime_ns, st.st_size, st.st_ino, st.st_dev)
+
+    @classmethod
+    def of(cls, path: PathLike) -> Optional["FileIdentity"]:
+        """
+        读取文件身份
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            FileIdentity，文件不存在返回 None
+        """
+        try:
+            return cls.from_stat(os.stat(path))
+        except OSError:
+            return None
+
+
+class _CacheEntry:
+    """缓存条目"""
+
+    __slots__ = ("tree", "identity", "state")
+
+    def __init__(self, tree: etree._ElementTree, identity: FileIdentity):
+        self.tree = tree
+        self.identity = identity
+        # 依附于该解析树的派生数据（如标识索引），随条目一起失效
+        self.state: dict = {}
+
+    @property
+    def cost(self) -> int:
+        # 以文件字节数近似估算解析树的内存占用
+        return self.identity.size
+
+
+class DocumentCache:
+    """
+    已解析 XML 文档的 LRU 缓存
+
+    以文件绝对路径为键，保存解析后的 ElementTree 以及解析时的文件身份。
+    每次读取前通过一次 stat 校验 mtime/size/inode，文件被外部修改后自动失效。
+    同时按条目数和近似字节数淘汰最久未使用的文档。
+
+    注意：缓存返回的是同一个树对象，调用方修改后需要写回文件并重新 put，
+    或者调用 invalidate 丢弃该条目。
+    """
+
+    def __init__(self, max_entries: int = 16, max_bytes: int = 256 * 1024 * 1024):
+        """
+        初始化文档缓存
+
+        Args:
+            max_entries: 最多缓存的文档数
+            max_bytes: 缓存文档的近似总字节数上限
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(path: PathLike) -> str:
+        return os.path.abspath(os.fspath(path))
+
+    def get(self, path: PathLike) -> Optional[etree._ElementTree]:
+        """
+        获取缓存的文档（会先 stat 校验文件身份）
+
+        Args:
+            path: XML 文件路径
+
+        Returns:
+            缓存的 ElementTree，未命中或已失效返回 None
+        """
+        key = self._key(path)
+        identity = FileIdentity.of(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.identity != identity:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.tree
+
+    def put(
+        self,
+        path: PathLike,
+        tree: etree._ElementTree,
+        identity: Optional[FileIdentity] = None,
+        keep_state: bool = False
+    ) -> None:
+        """
+        放入缓存
+
+        Args:
+            path: XML 文件路径
+            tree: 解析后的 ElementTree
+            identity: 与 tree 对应的文件身份；不传则立即 stat 获取
+                     （解析场景应在解析前 stat，避免解析期间文件被修改）
+            keep_state: 是否沿用旧条目的派生数据（写回同一棵树时使用）
+        """
+        key = self._key(path)
+        if identity is None:
+            identity = FileIdentity.of(key)
+        if identity is None:
+            self.invalidate(key)
+            return
+
+        entry = _CacheEntry(tree, identity)
+        with self._lock:
+            old = self._entries.get(key)
+            if keep_state and old is not None:
+                entry.state = old.state
+            self._remove(key)
+            if entry.cost > self.max_bytes:
+                # 单个文档超过上限，不缓存
+                return
+            self._entries[key] = entry
+            self._total_bytes += entry.cost
+            self._evict()
+
+    def state(self, path: PathLike) -> dict:
+        """
+        获取依附于缓存文档的派生数据字典
+
+        应在 get 命中之后调用；条目不存在时返回一个不会被保存的空字典。
+
+        Args:
+            path: XML 文件路径
+
+        Returns:
+            派生数据字典
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+            return entry.state if entry is not None else {}
+
+    def invalidate(self, path: PathLike) -> None:
+        """丢弃指定文件的缓存"""
+        with self._lock:
+            self._remove(self._key(path))
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """
+        获取缓存统计
+
+        Returns:
+            包含条目数、字节数、命中/未命中/淘汰次数的字典
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: PathLike) -> bool:
+        return self._key(path) in self._entries
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.cost
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or self._total_bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.cost
+            self.evictions += 1
+
+
+_shared_cache: Optional[DocumentCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_document_cache() -> DocumentCache:
+    """
+    获取进程级共享的文档缓存
+
+    Returns:
+        DocumentCache 单例
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = DocumentCache()
+    return _shared_cache
@@ -1,15 +1,27 @@
 """XML 核心类"""
 
+import os
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from .merger import XmlMerger, MergeResult
+from .cache import DocumentCache
 from .parser import XmlParser
+from .xpath import XPathCache
+from .query import QueryCache
+from .shards import ShardedXmlStore
+from .stream import XmlStreamReader
 from .formatter import XmlFormatter
 from .namespace import NamespaceHandler
 from .settings import XmlCoreSettings, MergeOptions
 
 
+# 进程级的 XmlCore 实例注册表：键为 (绝对路径, 编码, 命名空间前缀)
+_shared_cores: Dict[Tuple[str, str, Optional[Tuple[str, ...]]], Tuple["XmlCore", dict]] = {}
+_shared_cores_lock = threading.Lock()
+
+
 class XmlCore:
     """
     XML 核心类 - 统一的 XML 处理入口
@@ -26,6 +38,9 @@ class XmlCore:
         # ORM 场景
         core = XmlCore.for_orm("app.orm.xml")
         result = core.merge_entity(entity_xml)
+
+        # 启用文档缓存（多次合并复用同一份解析树）
+        core = XmlCore("app.orm.xml", cache=shared_document_cache())
     """
 
     def __init__(
@@ -34,7 +49,18 @@ class XmlCore:
         encoding: str = "utf-8",
         pretty_print: bool = True,
         xml_declaration: bool = True,
-        namespaces: Optional[list[str]] = None
+        namespaces: Optional[list[str]] = None,
+        cache: Optional[DocumentCache] = None,
+        atomic_write: bool = True,
+        fsync: bool = False,
+        file_lock: bool = True,
+        lock_timeout: Optional[float] = None,
+        group_commit: bool = False,
+        incremental_write: bool = False,
+        xpath_cache: Optional[XPathCache] = None,
+        use_mmap: bool = False,
+        shard_dir: Optional[str] = None,
+        query_cache_size: int = 256
     ):
         """
         初始化 XmlCore
@@ -45,27 +71,71 @@ class XmlCore:
             pretty_print: 是否美化输出
             xml_declaration: 是否包含 XML 声明
             namespaces: 支持的命名空间前缀列表
+            cache: 文档缓存（可选），不传则每次操作都重新解析文件
+            atomic_write: 是否原子写入（临时文件 + os.replace）
+            fsync: 原子写入时是否 fsync 落盘
+            file_lock: 合并期间是否持有跨进程文件锁（多 worker 部署时防止更新丢失）
+            lock_timeout: 获取文件锁的超时时间（秒），None 表示一直等待
+            group_commit: 是否启用组提交（并发合并合并为一次解析/写入）
+            incremental_write: 是否启用增量写入（单个实体的更新/追加只拼接该实体的字节，
+                              建议与 cache 一起使用以复用字节偏移索引）
+            xpath_cache: 路径表达式缓存，默认使用进程级共享缓存
+            use_mmap: 解析目标文件时是否通过 mmap 分块喂给 lxml（启用 cache 时只在缓存未命中时解析）
+            shard_dir: 分片目录（可选）。设置后合并只写入各元素自己的分片文件，
+                      xml_path 只在调用 materialize() 时重新生成
+            query_cache_size: query_element 结果缓存的条目数，0 表示不缓存
         """
         self.settings = XmlCoreSettings(
             xml_path=Path(xml_path),
             encoding=encoding,
             pretty_print=pretty_print,
             xml_declaration=xml_declaration,
+            atomic_write=atomic_write,
+            fsync=fsync,
+            file_lock=file_lock,
+            lock_timeout=lock_timeout,
+            group_commit=group_commit,
+            incremental_write=incremental_write,
+            use_mmap=use_mmap,
             namespaces=namespaces or ['biz', 'ext', 'orm', 'i18n-en', 'ui', 'x', 'xpl', 'xs']
         )
 
-        self.merger = XmlMerger(
-            xml_path=str(self.settings.xml_path),
-            encoding=encoding,
-            namespaces=self.settings.namespaces
-        )
-        self.parser = XmlParser(encoding=encoding, namespaces=self.settings.namespaces)
         self.formatter = XmlFormatter(
             encoding=encoding,
             pretty_print=pretty_print,
-            xml_declaration=xml_declaration
+            xml_declaration=xml_declaration,
+            atomic_write=atomic_write,
+            fsync=fsync
+        )
+        self.parser = XmlParser(
+            encoding=encoding,
+            namespaces=self.settings.namespaces,
+            xpath_cache=xpath_cache,
+            use_mmap=use_mmap
         )
-        self.ns_handler = NamespaceHandler(prefixes=self.settings.namespaces)
+        self.merger = XmlMerger(
+            xml_path=str(self.settings.xml_path),
+            encoding=encoding,
+            namespaces=self.settings.namespaces,
+            cache=cache,
+            formatter=self.formatter,
+            file_lock=file_lock,
+            lock_timeout=lock_timeout,
+            group_commit=group_commit,
+            incremental_write=incremental_write,
+            parser=self.parser
+        )
+        self.xpath_cache = self.parser.xpath_cache
+        self.shards = ShardedXmlStore(
+            shard_dir,
+            str(self.settings.xml_path),
+            parser=self.parser,
+            formatter=self.formatter,
+            lock_timeout=lock_timeout
+        ) if shard_dir else None
+        self.query_cache = QueryCache(self.settings.xml_path, max_entries=query_cache_size)
+        self.stream_reader = XmlStreamReader()
+        self.ns_handler = self.parser.ns_handler
 
     def merge_element(
         self,
@@ -94,7 +164,50 @@ class XmlCore:
             merge_strategy=merge_strategy,
             strip_ns_on_children=strip_ns_on_children
         )
-        return self.merger.merge_element(element_xml, options)
+        return self._merge([element_xml], options)[0]
+
+    def merge_elements(
+        self,
+        element_xmls: List[str],
+        parent_xpath: str,
+        element_matcher: Optional[str] = None,
+        merge_strategy: str = "replace_or_append",
+        strip_ns_on_children: bool = True
+    ) -> List[MergeResult]:
+        """
+        批量合并多个 XML 元素到文件（只解析、写入一次）
+
+        Args:
+            element_xmls: 元素 XML 片段列表
+            parent_xpath: 父容器 XPath
+            element_matcher: 元素匹配属性名（如 'name', 'id', 'key'）
+            merge_strategy: 合并策略
+            strip_ns_on_children: 是否移除子元素的命名空间声明
+
+        Returns:
+            List[MergeResult]: 与输入顺序一致的合并结果
+        """
+        options = MergeOptions(
+            parent_xpath=parent_xpath,
+            element_matcher=element_matcher,
+            merge_strategy=merge_strategy,
+            strip_ns_on_children=strip_ns_on_children
+        )
+        return self._merge(element_xmls, options)
+
+    def _merge(self, element_xmls: List[str], options: MergeOptions) -> List[MergeResult]:
+        """执行合并，目标文件可能被修改时使查询缓存失效"""
+        try:
+            if self.shards is not None:
+                results = self.shards.merge_batch(element_xmls, options)
+            else:
+                results = self.merger.merge_batch(element_xmls, options)
+        except Exception:
+            self.query_cache.invalidate()
+            raise
+        if any(r.action != "skipped" for r in results):
+            self.query_cache.invalidate()
+        return results
 
     def merge_entity(
         self,
@@ -117,12 +230,34 @@ class XmlCore:
             element_matcher="name"
         )
 
+    def merge_entities(
+        self,
+        entity_xmls: List[str],
+        entities_xpath: str = ".//entities"
+    ) -> List[MergeResult]:
+        """
+        批量合并 ORM 实体（便捷方法）
+
+        Args:
+            entity_xmls: 实体 XML 片段列表
+            entities_xpath: entities 容器 XPath
+
+        Returns:
+            List[MergeResult]: 合并结果
+        """
+        return self.merge_elements(
+            element_xmls=entity_xmls,
+            parent_xpath=entities_xpath,
+            element_matcher="name"
+        )
+
     @classmethod
     def for_orm(
         cls,
         xml_path: str,
         encoding: str = "utf-8",
-        namespaces: Optional[list[str]] = None
+        namespaces: Optional[list[str]] = None,
+        cache: Optional[DocumentCache] = None
     ) -> "XmlCore":
         """
         创建用于 ORM XML 的 XmlCore 实例（工厂方法）
@@ -131,11 +266,65 @@ class XmlCore:
             xml_path: ORM XML 文件路径
             encoding: 文件编码
             namespaces: 支持的命名空间前缀列表
+            cache: 文档缓存（可选）
+
+        Returns:
+            XmlCore 实例
+        """
+        return cls(xml_path=xml_path, encoding=encoding, namespaces=namespaces, cache=cache)
+
+    @classmethod
+    def shared(
+        cls,
+        xml_path: str,
+        encoding: str = "utf-8",
+        namespaces: Optional[list[str]] = None,
+        **options
+    ) -> "XmlCore":
+        """
+        获取进程内按文件复用的 XmlCore 实例
+
+        同一文件的请求共用一组解析器、格式化器和合并器，避免每次请求重新构建。
+        实例在首次调用时用传入的选项创建；之后获取同一文件时选项必须相同，
+        否则调用方会拿到与预期配置不同的实例。
+
+        Args:
+            xml_path: XML 文件路径
+            encoding: 文件编码
+            namespaces: 支持的命名空间前缀列表
+            **options: 其余构造参数（cache、group_commit 等）
 
         Returns:
             XmlCore 实例
+
+        Raises:
+            ValueError: 同一文件的已有实例以不同的选项创建
         """
-        return cls(xml_path=xml_path, encoding=encoding, namespaces=namespaces)
+        key = (
+            os.path.abspath(xml_path),
+            encoding,
+            tuple(namespaces) if namespaces is not None else None
+        )
+        with _shared_cores_lock:
+            entry = _shared_cores.get(key)
+            if entry is None:
+                core = cls(xml_path=xml_path, encoding=encoding, namespaces=namespaces, **options)
+                _shared_cores[key] = (core, options)
+                return core
+
+        core, created_options = entry
+        if options != created_options:
+            raise ValueError(
+                f"XmlCore.shared({xml_path}) 的选项与已有实例不同: "
+                f"已有 {created_options}，本次 {options}"
+            )
+        return core
+
+    @staticmethod
+    def clear_shared() -> None:
+        """清空共享实例注册表（主要用于测试）"""
+        with _shared_cores_lock:
+            _shared_cores.clear()
 
     def find_element(
         self,
@@ -145,6 +334,10 @@ class XmlCore:
         """
         查找元素
 
+        启用缓存时返回的是缓存树中的元素，请勿直接修改；其他线程可能同时合并时，
+        继续读取该元素需持有 self.merger.tree_lock（或改用 query_element）。
+        启用分片存储时先物化（分片没有变化时跳过），返回的是物化后文件中的元素。
+
         Args:
             xpath: XPath 表达式
             namespace_map: 命名空间映射
@@ -152,8 +345,176 @@ class XmlCore:
         Returns:
             找到的元素，未找到返回 None
         """
+        self.materialize()
         return self.merger.find_element(xpath, namespace_map)
 
+    def query_element(
+        self,
+        xpath: str,
+        namespace_map: Optional[dict] = None
+    ) -> Optional[str]:
+        """
+        查找元素并返回其序列化结果（带查询缓存）
+
+        结果按 (xpath, namespace_map) 缓存；通过本实例合并/替换后，或文件被外部
+        修改（mtime/size/inode 变化）后自动失效。适合前端轮询实体当前状态。
+        启用分片存储时先物化，分片的变化（包括其他进程的合并）同样使缓存失效。
+
+        Args:
+            xpath: XPath 表达式
+            namespace_map: 命名空间映射
+
+        Returns:
+            元素的 XML 字符串，未找到返回 None
+        """
+        def compute() -> Optional[str]:
+            # 查找和序列化期间持有树锁，避免其他线程的合并同时修改共享的缓存树
+            with self.merger.tree_lock:
+                element = self.merger.find_element(xpath, namespace_map)
+                return self.formatter.format_element(element) if element is not None else None
+
+        self.materialize()
+        return self.query_cache.get_or_compute(xpath, namespace_map, compute)
+
+    def replace_element(
+        self,
+        xpath: str,
+        new_element,
+        namespace_map: Optional[dict] = None
+    ) -> bool:
+        """
+        替换元素并写回文件
+
+        启用分片存储且分片目录已建立时，只重写目标所在的分片（xml_path 在
+        materialize() 时更新），目标必须位于分片的父容器内。
+
+        Args:
+            xpath: 目标元素 XPath
+            new_element: 新元素（Element 对象）
+            namespace_map: 命名空间映射
+
+        Returns:
+            是否成功替换
+        """
+        try:
+            if self.shards is not None and self.shards.initialized:
+                return self.shards.replace_element(xpath, new_element, namespace_map)
+            return self.merger.replace_element(xpath, new_element, namespace_map)
+        finally:
+            self.query_cache.invalidate()
+
+    def precompile(self, xpaths: List[str], namespace_map: Optional[dict] = None) -> None:
+        """
+        预编译路径表达式（如服务启动时编译各类型的 parent_xpath）
+
+        Args:
+            xpaths: 路径表达式列表
+            namespace_map: 命名空间映射，默认与 find_element 使用的映射一致
+        """
+        ns_map = namespace_map or NamespaceHandler.get_default_namespace_map()
+        for xpath in xpaths:
+            self.xpath_cache.compile(xpath, ns_map)
+
+    def materialize(self, force: bool = False) -> bool:
+        """
+        启用分片存储时，把分片流式写回 xml_path（分片没有变化时跳过）
+
+        Args:
+            force: 是否强制重新生成
+
+        Returns:
+            是否写入了目标文件；未启用分片存储时返回 False
+        """
+        if self.shards is None:
+            return False
+        written = self.shards.materialize(force=force)
+        if written:
+            self.query_cache.invalidate()
+        return written
+
+    def parse_stats(self) -> dict:
+        """
+        获取目标文件的解析统计
+
+        Returns:
+            包含解析次数、读取字节数、累计解析耗时和最近一次解析的字典
+        """
+        return self.parser.stats.snapshot()
+
+    def xpath_stats(self) -> dict:
+        """
+        获取路径表达式缓存统计
+
+        Returns:
+            包含条目数、命中/未命中次数的字典
+        """
+        return self.xpath_cache.stats()
+
+    def query_stats(self) -> dict:
+        """
+        获取查询结果缓存统计
+
+        Returns:
+            包含条目数、命中/未命中次数和命中率的字典
+        """
+        return self.query_cache.stats()
+
+    def iter_elements(
+        self,
+        parent_xpath: str,
+        tag: str,
+        namespace_map: Optional[dict] = None
+    ) -> Iterator:
+        """
+        流式遍历父容器下的元素（不构建完整的树，内存占用与文件大小无关）
+
+        产出的元素只在下一次迭代前有效，需要保留时请自行 deepcopy。
+
+        Args:
+            parent_xpath: 父容器路径（简单相对路径，如 `.//entities`）
+            tag: 元素标签名
+            namespace_map: 命名空间映射
+
+        Yields:
+            匹配的元素
+        """
+        return self.stream_reader.iter_elements(
+            str(self.settings.xml_path),
+            parent_xpath,
+            tag,
+            namespace_map
+        )
+
+    def find_by_identifier(
+        self,
+        parent_xpath: str,
+        tag: str,
+        identifier: str,
+        element_matcher: str = "name",
+        namespace_map: Optional[dict] = None
+    ):
+        """
+        流式查找指定标识的元素，找到后立即停止读取
+
+        Args:
+            parent_xpath: 父容器路径
+            tag: 元素标签名
+            identifier: 标识值
+            element_matcher: 匹配属性名
+            namespace_map: 命名空间映射
+
+        Returns:
+            找到的元素，未找到返回 None
+        """
+        return self.stream_reader.find_by_identifier(
+            str(self.settings.xml_path),
+            parent_xpath,
+            tag,
+            identifier,
+            element_matcher,
+            namespace_map
+        )
+
     def parse_file(self):
         """
         解析 XML 文件
@@ -174,3 +535,15 @@ class XmlCore:
             格式化后的 XML 字符串
         """
         return self.formatter.format_element(element)
+
+    def format_element_bytes(self, element) -> bytes:
+        """
+        格式化元素为编码后的字节
+
+        Args:
+            element: Element 对象
+
+        Returns:
+            格式化后的 XML 字节串（使用配置的编码）
+        """
+        return self.formatter.format_element_bytes(element)
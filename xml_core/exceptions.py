@@ -16,11 +16,21 @@ class XmlMergeError(XmlCoreError):
     pass
 
 
+class XmlDuplicateIdentifierError(XmlMergeError):
+    """元素标识重复错误"""
+    pass
+
+
 class XmlFileNotFoundError(XmlCoreError):
     """XML 文件不存在错误"""
     pass
 
 
+class XmlLockError(XmlCoreError):
+    """文件锁获取失败"""
+    pass
+
+
 class XmlValidationError(XmlCoreError):
     """XML 验证错误"""
     pass
@@ -0,0 +1,26 @@
+"""元素内容的规范化指纹"""
+
+import copy
+import hashlib
+from lxml import etree
+
+
+def canonical_fingerprint(element: etree._Element) -> str:
+    """
+    计算元素的规范化指纹（C14N 2.0 + SHA-256）
+
+    属性顺序、命名空间声明的位置、空白文本（缩进）以及元素自身的 tail
+    都不影响结果；标签、属性、文本内容和注释相同的元素指纹相同。
+
+    目标文件常用 `xmlns:ext="ext"` 这类相对 URI，libxml2 的 C14N 1.x 会拒绝，
+    因此使用 lxml 的 C14N 2.0 序列化。元素先复制一份，使祖先上声明的命名空间
+    在序列化时处于作用域内（只输出实际使用的声明）。
+
+    Args:
+        element: Element 对象
+
+    Returns:
+        十六进制摘要
+    """
+    data = etree.tostring(copy.deepcopy(element), method="c14n2", strip_text=True)
+    return hashlib.sha256(data).hexdigest()
@@ -1,8 +1,29 @@
 """XML 格式化器"""
 
-from typing import Optional
+import os
+import re
+import shutil
+import stat
+import tempfile
+from typing import BinaryIO, Callable, Iterable, List, Optional, Tuple
 from lxml import etree
 
+from .pool import get_parser
+
+
+def _current_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# 进程 umask，用于计算原子写入新建文件的权限（导入时读取一次，避免运行期修改 umask）
+_UMASK = _current_umask()
+
+# 开始标签中紧跟标签名的命名空间声明（lxml 序列化子元素时会补上祖先的声明）
+_LEADING_NS_DECLS = re.compile(rb'^(<[^\s/>]+)(?:\s+xmlns(?::[^\s=]+)?="[^"]*")+')
+_NS_DECL = re.compile(rb'\s+xmlns(?::([^\s=]+))?="[^"]*"')
+
 
 class XmlFormatter:
     """XML 格式化器"""
@@ -11,7 +32,9 @@ class XmlFormatter:
         self,
         encoding: str = "utf-8",
         pretty_print: bool = True,
-        xml_declaration: bool = True
+        xml_declaration: bool = True,
+        atomic_write: bool = True,
+        fsync: bool = False
     ):
         """
         初始化格式化器
@@ -20,10 +43,14 @@ class XmlFormatter:
             encoding: 文件编码
             pretty_print: 是否美化输出
             xml_declaration: 是否包含 XML 声明
+            atomic_write: 是否原子写入（临时文件 + os.replace）
+            fsync: 原子写入时是否 fsync 落盘
         """
         self.encoding = encoding
         self.pretty_print = pretty_print
         self.xml_declaration = xml_declaration
+        self.atomic_write = atomic_write
+        self.fsync = fsync
 
     def serialize(
         self,
@@ -40,70 +67,92 @@ class XmlFormatter:
         Returns:
             XML 字符串
         """
+        return self.serialize_bytes(tree, strip_child_ns).decode(self.encoding)
+
+    def serialize_bytes(
+        self,
+        tree: etree._ElementTree,
+        strip_child_ns: bool = True,
+        inserted: Optional[List[etree._Element]] = None
+    ) -> bytes:
+        """
+        序列化 XML 树为编码后的字节
+
+        Args:
+            tree: ElementTree 对象
+            strip_child_ns: 是否通过提升命名空间来移除子元素的冗余声明
+            inserted: 上次提升之后新插入的元素（见 _hoist_namespaces）
+
+        Returns:
+            XML 字节串（使用 self.encoding 编码）
+        """
         # 如果需要移除子元素命名空间，进行命名空间提升
         if strip_child_ns:
-            tree = self._hoist_namespaces(tree)
+            tree = self._hoist_namespaces(tree, inserted)
 
-        xml_content = etree.tostring(
+        return etree.tostring(
             tree,
             encoding=self.encoding,
             pretty_print=self.pretty_print,
             xml_declaration=self.xml_declaration
         )
 
-        xml_str = xml_content.decode(self.encoding)
-
-        return xml_str
-
-    def _hoist_namespaces(self, tree: etree._ElementTree) -> etree._ElementTree:
+    def _hoist_namespaces(
+        self,
+        tree: etree._ElementTree,
+        inserted: Optional[List[etree._Element]] = None
+    ) -> etree._ElementTree:
         """
-        提升命名空间：将所有子节点使用的命名空间移动到根节点
+        提升命名空间：将子节点使用的命名空间声明到根节点
         这样 lxml 在序列化时就会自动移除子节点中冗余的 xmlns 声明
 
+        传入 inserted 时只检查这些新插入的子树（调用方需保证树的其余部分已经提升过），
+        没有出现新前缀时不再遍历整棵树。
+
         Args:
             tree: 原始 ElementTree
+            inserted: 上次提升之后新插入的元素，None 表示检查全树
 
         Returns:
-            处理后的新 ElementTree
+            处理后的 ElementTree（根元素保持不变）
         """
         root = tree.getroot()
+        root_ns = root.nsmap
 
-        # 1. 收集全树所有的命名空间
-        all_ns = dict(root.nsmap)
-        for elem in root.iter():
+        if inserted is None:
+            elements = root.iter()
+        else:
+            elements = (e for element in inserted for e in element.iter(etree.Element))
+
+        # 1. 收集根节点尚未声明的前缀
+        new_ns = {}
+        for elem in elements:
             for prefix, uri in elem.nsmap.items():
-                # 跳过默认命名空间（None）如果它会导致冲突，或者是 xml 命名空间
-                if prefix and prefix not in all_ns and prefix != 'xml':
-                    all_ns[prefix] = uri
+                # 跳过默认命名空间（None）、与根节点冲突的前缀以及 xml 命名空间
+                if prefix and prefix not in root_ns and prefix not in new_ns and prefix != 'xml':
+                    new_ns[prefix] = uri
 
-        # 如果根节点的 nsmap 已经包含了所有，且只需要简单的 cleanup
-        if all_ns == root.nsmap:
+        if new_ns:
+            # 2. 在根节点上声明新前缀，子节点的定义会被识别为冗余并移除
+            etree.cleanup_namespaces(root, top_nsmap=new_ns)
+        elif inserted is None:
             etree.cleanup_namespaces(root)
-            return tree
-
-        # 2. 创建一个新的根节点，带上全量的 nsmap
-        # 注意：使用 etree.Element 时，nsmap 参数一旦设置就不可变
-        new_root = etree.Element(root.tag, attrib=root.attrib, nsmap=all_ns)
+        else:
+            # 新子树移入文档时与根节点相同的声明已被 lxml 去掉，只需清理子树内未使用的声明
+            for element in inserted:
+                etree.cleanup_namespaces(element)
 
-        # 3. 搬运内容
-        new_root.text = root.text
-        new_root.tail = root.tail
-        for child in root:
-            new_root.append(child)
-
-        # 4. 清理多余的命名空间声明
-        # 此时因为根节点有了定义，子节点的定义会被识别为冗余并移除
-        etree.cleanup_namespaces(new_root)
-
-        return etree.ElementTree(new_root)
+        return tree
 
     def write_tree(
         self,
         tree: etree._ElementTree,
         file_path: str,
         strip_child_ns: bool = True,
-        auto_add_namespaces: bool = True
-    ) -> None:
+        auto_add_namespaces: bool = True,
+        atomic: Optional[bool] = None,
+        inserted: Optional[List[etree._Element]] = None
+    ) -> etree._ElementTree:
         """
         写入 XML 树到文件
 
@@ -112,12 +161,192 @@ class XmlFormatter:
             file_path: 文件路径
             strip_child_ns: 是否移除子元素的命名空间声明
             auto_add_namespaces: 是否自动添加命名空间声明（保留参数以兼容接口，实际由 _hoist_namespaces 处理）
+            atomic: 是否原子写入，None 表示使用 self.atomic_write
+            inserted: 上次提升之后新插入的元素，传入时只对这些子树做命名空间提升
+
+        Returns:
+            实际写入的 ElementTree
+        """
+        data = self.serialize_bytes(tree, strip_child_ns=strip_child_ns, inserted=inserted)
+        self.write_bytes(data, file_path, atomic=atomic)
+
+        return tree
+
+    def write_bytes(
+        self,
+        data: bytes,
+        file_path: str,
+        atomic: Optional[bool] = None
+    ) -> None:
+        """
+        写入已编码的内容到文件
+
+        原子模式下先在同目录写临时文件（一次写入、可选 fsync），再用 os.replace
+        替换目标文件，进程被中断时目标文件要么是旧内容，要么是完整的新内容。
+
+        Args:
+            data: 文件内容
+            file_path: 文件路径
+            atomic: 是否原子写入，None 表示使用 self.atomic_write
+        """
+        if atomic is None:
+            atomic = self.atomic_write
+
+        if not atomic:
+            with open(file_path, "wb") as f:
+                f.write(data)
+            return
+
+        self._replace_atomically(file_path, lambda f: f.write(data))
+
+    def write_chunks(
+        self,
+        chunks: Iterable[bytes],
+        file_path: str,
+        atomic: Optional[bool] = None
+    ) -> None:
+        """
+        按块写入文件（内容由迭代器逐块产生，不需要先拼成一个完整的 bytes）
+
+        Args:
+            chunks: 内容块迭代器
+            file_path: 文件路径
+            atomic: 是否原子写入，None 表示使用 self.atomic_write
+        """
+        if atomic is None:
+            atomic = self.atomic_write
+
+        if not atomic:
+            with open(file_path, "wb") as f:
+                f.writelines(chunks)
+            return
+
+        self._replace_atomically(file_path, lambda f: f.writelines(chunks))
+
+    def serialize_child_bytes(self, element: etree._Element) -> bytes:
         """
-        # 序列化树 (serialize 内部已经处理了命名空间提升)
-        xml_str = self.serialize(tree, strip_child_ns=strip_child_ns)
+        按元素在文档中的位置序列化单个子节点（用于增量写入）
 
-        with open(file_path, "wb") as f:
-            f.write(xml_str.encode(self.encoding))
+        输出包含 tail，且不重复祖先已经声明的命名空间，
+        与整树序列化时该元素所占的字节一致。调用方需保证元素自身没有额外的命名空间声明。
+
+        Args:
+            element: 文档中的元素（或注释、处理指令）
+
+        Returns:
+            编码后的字节
+        """
+        data = etree.tostring(
+            element,
+            encoding=self.encoding,
+            xml_declaration=False,
+            with_tail=True
+        )
+        return _LEADING_NS_DECLS.sub(rb"\1", data, count=1)
+
+    def splice_file(
+        self,
+        file_path: str,
+        edits: List[Tuple[int, int, bytes]],
+        atomic: Optional[bool] = None
+    ) -> None:
+        """
+        按字节区间修改文件：用新内容替换若干 [start, end) 区间
+
+        只读取第一个修改位置之后的内容。非原子模式原地改写该部分并截断；
+        原子模式把之前的部分按块复制到临时文件后再 os.replace。
+
+        Args:
+            file_path: 文件路径
+            edits: 按 start 升序排列、互不重叠的 (start, end, data) 列表
+            atomic: 是否原子写入，None 表示使用 self.atomic_write
+        """
+        if not edits:
+            return
+        if atomic is None:
+            atomic = self.atomic_write
+
+        first = edits[0][0]
+        with open(file_path, "rb") as source:
+            source.seek(first)
+            rest = source.read()
+
+        parts = []
+        position = first
+        for start, end, data in edits:
+            parts.append(rest[position - first:start - first])
+            parts.append(data)
+            position = end
+        parts.append(rest[position - first:])
+        new_rest = b"".join(parts)
+
+        if not atomic:
+            with open(file_path, "r+b") as f:
+                f.seek(first)
+                f.write(new_rest)
+                f.truncate()
+            return
+
+        def write(f: BinaryIO) -> None:
+            with open(file_path, "rb") as source:
+                remaining = first
+                while remaining > 0:
+                    chunk = source.read(min(remaining, shutil.COPY_BUFSIZE))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            f.write(new_rest)
+
+        self._replace_atomically(file_path, write)
+
+    def _replace_atomically(self, file_path: str, write: Callable[[BinaryIO], None]) -> None:
+        directory = os.path.dirname(os.path.abspath(file_path))
+        fd, temp_path = tempfile.mkstemp(
+            dir=directory,
+            prefix=f".{os.path.basename(file_path)}.",
+            suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            # mkstemp 创建的文件权限为 0600，沿用原文件权限（新文件按 umask 计算）
+            os.chmod(temp_path, self._target_mode(file_path))
+            os.replace(temp_path, file_path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+        if self.fsync:
+            self._fsync_directory(directory)
+
+    @staticmethod
+    def _target_mode(file_path: str) -> int:
+        try:
+            return stat.S_IMODE(os.stat(file_path).st_mode)
+        except FileNotFoundError:
+            return 0o666 & ~_UMASK
+
+    @staticmethod
+    def _fsync_directory(directory: str) -> None:
+        # 目录项落盘，保证 rename 本身在崩溃后可见（Windows 不支持打开目录）
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
 
     def format_element(
         self,
@@ -134,22 +363,70 @@ class XmlFormatter:
         Returns:
             XML 字符串
         """
-        # 为了复用 _hoist_namespaces 逻辑，我们需要临时把 element 包装成 tree
-        # 但如果不希望改变原 element 的结构（比如它没有 parent），我们得复制一份
-        if strip_child_ns:
-            # 深拷贝元素以避免修改原对象
-            element_copy =  etree.fromstring(etree.tostring(element))
-            tree = etree.ElementTree(element_copy)
-            tree = self._hoist_namespaces(tree)
-            element = tree.getroot()
+        return self.format_element_bytes(element, strip_child_ns).decode(self.encoding)
+
+    def format_element_bytes(
+        self,
+        element: etree._Element,
+        strip_child_ns: bool = True
+    ) -> bytes:
+        """
+        格式化单个元素为编码后的字节（写文件或 HTTP 响应时可省去 decode）
+
+        常见情况下只序列化一次：后代元素没有自己的命名空间声明时，lxml 输出的
+        声明已全部位于元素开始标签上，只需去掉其中未被使用的祖先声明；
+        输出的其余部分出现 xmlns 时才复制一份做命名空间提升。
+
+        Args:
+            element: Element 对象
+            strip_child_ns: 是否移除子元素的命名空间声明
+
+        Returns:
+            XML 字节串（使用 self.encoding 编码）
+        """
+        if not strip_child_ns:
+            return etree.tostring(
+                element,
+                encoding=self.encoding,
+                pretty_print=self.pretty_print
+            )
 
-        xml_content = etree.tostring(
+        data = etree.tostring(
             element,
             encoding=self.encoding,
-            pretty_print=self.pretty_print
+            pretty_print=self.pretty_print,
+            with_tail=False
         )
 
-        return xml_content.decode(self.encoding)
+        match = _LEADING_NS_DECLS.match(data)
+        body_start = match.end() if match else 0
+        if data.find(b"xmlns", body_start) != -1:
+            # 后代元素自带命名空间声明：复制后提升，避免修改原对象
+            element_copy = etree.fromstring(etree.tostring(element, with_tail=False))
+            tree = self._hoist_namespaces(etree.ElementTree(element_copy))
+            return etree.tostring(
+                tree.getroot(),
+                encoding=self.encoding,
+                pretty_print=self.pretty_print
+            )
+
+        if match is None:
+            return data
+        return self._drop_unused_ns_decls(data, match)
+
+    @staticmethod
+    def _drop_unused_ns_decls(data: bytes, match: re.Match) -> bytes:
+        """去掉开始标签上在标签名、属性名中都没有出现的前缀声明（默认命名空间保留）"""
+        body = data[match.end():]
+
+        def keep(decl: re.Match) -> bytes:
+            prefix = decl.group(1)
+            if prefix is None or re.search(rb"[<\s/]" + re.escape(prefix) + rb":", body):
+                return decl.group(0)
+            return b""
+
+        decls = _NS_DECL.sub(keep, data[match.end(1):match.end()])
+        return data[:match.end(1)] + decls + body
 
     def prettify(self, xml: str) -> str:
         """
@@ -162,7 +439,7 @@ class XmlFormatter:
             美化后的 XML 字符串
         """
         try:
-            parser = etree.XMLParser(remove_blank_text=True)
+            parser = get_parser(remove_blank_text=True)
             root = etree.fromstring(xml.encode(self.encoding), parser)
             return etree.tostring(
                 root,
@@ -0,0 +1,161 @@
+"""元素标识索引"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+from lxml import etree
+
+
+logger = logging.getLogger(__name__)
+
+# 未指定匹配属性时，按顺序自动检测的标识属性
+DEFAULT_IDENTIFIER_ATTRS = ('id', 'name', 'key')
+
+
+class IdentifierIndex:
+    """
+    父容器内的元素标识索引（标签 + 匹配属性 → 元素）
+
+    构建时扫描一次父容器的直接子元素，之后的查找为 O(1)；
+    合并时通过 add/replace 增量维护，不再重复扫描。
+    """
+
+    def __init__(self, parent: etree._Element, tag: str, attr: str):
+        """
+        构建索引
+
+        Args:
+            parent: 父容器元素
+            tag: 子元素标签名
+            attr: 匹配属性名
+        """
+        self.parent = parent
+        self.tag = tag
+        self.attr = attr
+        self._elements: Dict[str, List[etree._Element]] = {}
+
+        for child in parent.iterchildren(tag):
+            self._add(child)
+
+        duplicates = self.duplicates
+        if duplicates:
+            logger.warning(
+                f"容器 <{parent.tag}> 中存在重复的 {tag}@{attr}: {sorted(duplicates)}"
+            )
+
+    def get(self, identifier: str) -> List[etree._Element]:
+        """
+        查找指定标识的元素
+
+        Args:
+            identifier: 标识值
+
+        Returns:
+            匹配的元素列表（按文档顺序），未找到返回空列表
+        """
+        return self._elements.get(identifier, [])
+
+    @property
+    def duplicates(self) -> Dict[str, int]:
+        """重复的标识及其出现次数"""
+        return {key: len(items) for key, items in self._elements.items() if len(items) > 1}
+
+    def add(self, element: etree._Element) -> None:
+        """追加元素后更新索引"""
+        if element.tag == self.tag:
+            self._add(element)
+
+    def replace(self, old: etree._Element, new: etree._Element) -> None:
+        """替换元素后更新索引"""
+        if old.tag == self.tag:
+            items = self._elements.get(old.get(self.attr), [])
+            for i, item in enumerate(items):
+                if item is old:
+                    if new.tag == self.tag and new.get(self.attr) == old.get(self.attr):
+                        # 标识不变时原位替换，保持文档顺序
+                        items[i] = new
+                        return
+                    del items[i]
+                    break
+        self.add(new)
+
+    def _add(self, element: etree._Element) -> None:
+        value = element.get(self.attr)
+        if value is not None:
+            self._elements.setdefault(value, []).append(element)
+
+
+class IndexStore:
+    """
+    一棵解析树上的所有标识索引
+
+    以 (父容器, 标签, 匹配属性) 为键懒加载 IdentifierIndex，
+    启用文档缓存时随缓存条目一起复用。
+    """
+
+    def __init__(self):
+        self._indexes: Dict[Tuple[etree._Element, str, str], IdentifierIndex] = {}
+        self._detected_attrs: Dict[Tuple[etree._Element, str], str] = {}
+
+    def index_for(
+        self,
+        parent: etree._Element,
+        tag: str,
+        matcher_attr: Optional[str]
+    ) -> Optional[IdentifierIndex]:
+        """
+        获取（必要时构建）索引
+
+        Args:
+            parent: 父容器元素
+            tag: 子元素标签名
+            matcher_attr: 匹配属性名，为 None 时自动检测
+
+        Returns:
+            IdentifierIndex，无法确定匹配属性时返回 None
+        """
+        attr = matcher_attr or self._detect_attr(parent, tag)
+        if not attr:
+            return None
+
+        key = (parent, tag, attr)
+        index = self._indexes.get(key)
+        if index is None:
+            index = IdentifierIndex(parent, tag, attr)
+            self._indexes[key] = index
+        return index
+
+    def on_append(self, parent: etree._Element, element: etree._Element) -> None:
+        """父容器追加元素后同步所有相关索引"""
+        for (p, _, _), index in self._indexes.items():
+            if p is parent:
+                index.add(element)
+
+    def on_replace(
+        self,
+        parent: etree._Element,
+        old: etree._Element,
+        new: etree._Element
+    ) -> None:
+        """父容器替换元素后同步所有相关索引"""
+        for (p, _, _), index in self._indexes.items():
+            if p is parent:
+                index.replace(old, new)
+
+    def clear(self) -> None:
+        """清空所有索引（树被任意修改后调用）"""
+        self._indexes.clear()
+        self._detected_attrs.clear()
+
+    def _detect_attr(self, parent: etree._Element, tag: str) -> Optional[str]:
+        key = (parent, tag)
+        attr = self._detected_attrs.get(key)
+        if attr:
+            return attr
+
+        # 自动检测匹配属性：取第一个带有 id/name/key 的子元素
+        for child in parent.iterchildren(tag):
+            for candidate in DEFAULT_IDENTIFIER_ATTRS:
+                if child.get(candidate):
+                    self._detected_attrs[key] = candidate
+                    return candidate
+        return None
@@ -0,0 +1,116 @@
+"""跨进程文件锁"""
+
+import os
+import time
+from typing import Optional
+
+from .exceptions import XmlLockError
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    基于锁文件的跨进程建议锁
+
+    锁加在目标文件旁的 `<文件名>.lock` 上，而不是目标文件本身：
+    原子写入会用 os.replace 替换目标文件（inode 改变），直接锁目标文件无法互斥。
+    POSIX 使用 fcntl.flock，Windows 使用 msvcrt.locking。
+    flock 以打开的文件描述为单位，同一进程内不同线程各自持有的 FileLock 同样互斥。
+
+    示例用法:
+        with FileLock("app.orm.xml", timeout=10):
+            ...  # 读取 - 修改 - 写回
+    """
+
+    def __init__(
+        self,
+        path: str,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.05
+    ):
+        """
+        初始化文件锁
+
+        Args:
+            path: 需要保护的目标文件路径
+            timeout: 获取锁的超时时间（秒），None 表示一直等待
+            poll_interval: 非阻塞轮询间隔（秒）
+        """
+        self.path = os.path.abspath(path)
+        self.lock_path = f"{self.path}.lock"
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    @property
+    def locked(self) -> bool:
+        """当前对象是否持有锁"""
+        return self._fd is not None
+
+    def acquire(self) -> None:
+        """
+        获取锁
+
+        Raises:
+            XmlLockError: 超时未获取到锁
+        """
+        if self._fd is not None:
+            raise XmlLockError(f"文件锁不可重入: {self.lock_path}")
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            if self.timeout is None and fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                self._acquire_polling(fd)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def release(self) -> None:
+        """释放锁"""
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def _acquire_polling(self, fd: int) -> None:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            if self._try_lock(fd):
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                raise XmlLockError(f"获取文件锁超时（{self.timeout}s）: {self.lock_path}")
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def _try_lock(fd: int) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
@@ -1,14 +1,25 @@
 """XML 合并器"""
 
+import itertools
 import logging
-from typing import Optional, Callable, List
+import os
+import threading
+from contextlib import nullcontext
+from typing import Optional, Callable, List, Dict, Tuple
 from pathlib import Path
 from pydantic import BaseModel
 from lxml import etree
 
 from .parser import XmlParser
 from .formatter import XmlFormatter
-from .exceptions import XmlMergeError, XmlFileNotFoundError
+from .cache import DocumentCache, FileIdentity
+from .index import IndexStore, DEFAULT_IDENTIFIER_ATTRS
+from .lock import FileLock
+from .splice import ContainerLayout
+from .fingerprint import canonical_fingerprint
+from .patch import PatchReport, patch_element
+from .xpath import XPathCache
+from .exceptions import XmlMergeError, XmlFileNotFoundError, XmlDuplicateIdentifierError
 from .settings import MergeOptions
 
 
@@ -19,12 +30,94 @@ class MergeResult(BaseModel):
     """合并结果"""
     identifier: str
     action: str  # created/updated/skipped
+    # patch 策略下增量中各子元素的处理情况（相对路径，如 columns/column[@name='id']）
+    added: List[str] = []
+    updated: List[str] = []
+    untouched: List[str] = []
+
+    @classmethod
+    def from_patch(cls, identifier: str, action: str, report: PatchReport) -> "MergeResult":
+        """由 patch 结果构建"""
+        return cls(
+            identifier=identifier,
+            action=action,
+            added=report.added,
+            updated=report.updated,
+            untouched=report.untouched
+        )
+
+
+class _PendingMerge:
+    """一次合并请求（组提交中的一个排队项）"""
+
+    __slots__ = ("elements", "options", "results", "error", "done")
+
+    def __init__(self, elements: List[Tuple[etree._Element, str]], options: MergeOptions):
+        self.elements = elements
+        self.options = options
+        self.results: List[MergeResult] = []
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class _CommitQueue:
+    """同一目标文件的组提交队列（进程内共享）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending: List[_PendingMerge] = []
+        self.leader_active = False
+
+
+_commit_queues: Dict[str, _CommitQueue] = {}
+_commit_queues_lock = threading.Lock()
+
+
+def _commit_queue(path: Path) -> _CommitQueue:
+    key = os.path.abspath(path)
+    with _commit_queues_lock:
+        queue = _commit_queues.get(key)
+        if queue is None:
+            queue = _commit_queues[key] = _CommitQueue()
+        return queue
+
+
+_tree_locks: Dict[str, threading.RLock] = {}
+_tree_locks_lock = threading.Lock()
+
+
+def _tree_lock(path: Path) -> threading.RLock:
+    """
+    同一目标文件的树锁（进程内共享）
+
+    启用文档缓存时同一文件的各实例共用一棵解析树，合并/替换会原地修改它，
+    而 lxml 不支持一个线程读取树的同时另一个线程修改；修改和查找都在此锁内进行。
+    """
+    key = os.path.abspath(path)
+    with _tree_locks_lock:
+        lock = _tree_locks.get(key)
+        if lock is None:
+            lock = _tree_locks[key] = threading.RLock()
+        return lock
 
 
 class XmlMerger:
     """XML 元素合并器"""
 
-    def __init__(self, xml_path: str, encoding: str = "utf-8", namespaces: Optional[List[str]] = None):
+    def __init__(
+        self,
+        xml_path: str,
+        encoding: str = "utf-8",
+        namespaces: Optional[List[str]] = None,
+        cache: Optional[DocumentCache] = None,
+        formatter: Optional[XmlFormatter] = None,
+        file_lock: bool = True,
+        lock_timeout: Optional[float] = None,
+        group_commit: bool = False,
+        incremental_write: bool = False,
+        xpath_cache: Optional[XPathCache] = None,
+        parser: Optional[XmlParser] = None
+    ):
         """
         初始化合并器
 
@@ -32,11 +125,29 @@ class XmlMerger:
             xml_path: XML 文件路径
             encoding: 文件编码
             namespaces: 支持的命名空间前缀列表
+            cache: 文档缓存（可选），启用后复用已解析的目标文件
+            formatter: 写回文件使用的格式化器（可选），默认按 encoding 创建
+            file_lock: 读取 - 修改 - 写回期间是否持有跨进程文件锁
+            lock_timeout: 获取文件锁的超时时间（秒），None 表示一直等待
+            group_commit: 是否启用组提交（并发合并合并为一次解析/写入）
+            incremental_write: 是否启用增量写入（只把替换/追加的元素拼接进文件，
+                              偏移索引随文档缓存保存，建议与 cache 一起使用）
+            xpath_cache: 路径表达式缓存，默认使用进程级共享缓存
+            parser: 解析器（可选），传入时忽略 namespaces/xpath_cache，与调用方共用
         """
         self.xml_path = Path(xml_path)
+        # 修改缓存树（合并、替换）与在树上查找、序列化时持有
+        self.tree_lock = _tree_lock(self.xml_path)
         self.encoding = encoding
-        self.parser = XmlParser(encoding=encoding, namespaces=namespaces)
-        self.formatter = XmlFormatter(encoding=encoding)
+        if parser is None:
+            parser = XmlParser(encoding=encoding, namespaces=namespaces, xpath_cache=xpath_cache)
+        self.parser = parser
+        self.formatter = formatter or XmlFormatter(encoding=encoding)
+        self.cache = cache
+        self.file_lock = file_lock
+        self.lock_timeout = lock_timeout
+        self.group_commit = group_commit
+        self.incremental_write = incremental_write
 
     def merge_element(
         self,
@@ -53,6 +164,30 @@ class XmlMerger:
         Returns:
             MergeResult: 合并结果
 
+        Raises:
+            XmlFileNotFoundError: 文件不存在
+            XmlMergeError: 合并失败
+        """
+        return self.merge_batch([element_xml], options)[0]
+
+    def merge_batch(
+        self,
+        element_xmls: List[str],
+        options: MergeOptions
+    ) -> List[MergeResult]:
+        """
+        批量合并多个 XML 元素到目标文件（只解析一次、写入一次）
+
+        所有片段会先全部解析并校验标识，任意一个失败则不修改文件；
+        随后按顺序依次合并，后面的片段可以更新前面刚创建的元素。
+
+        Args:
+            element_xmls: 元素 XML 片段列表
+            options: 合并选项
+
+        Returns:
+            List[MergeResult]: 与输入顺序一致的合并结果
+
         Raises:
             XmlFileNotFoundError: 文件不存在
             XmlMergeError: 合并失败
@@ -61,56 +196,366 @@ class XmlMerger:
             raise XmlFileNotFoundError(f"文件不存在: {self.xml_path}")
 
         # 1. 解析元素 - 直接返回根元素（XML 片段的第一个元素）
-        element = self.parser.parse_fragment(element_xml)
+        elements = []
+        for element_xml in element_xmls:
+            element = self.parser.parse_fragment(element_xml)
+
+            # 获取元素标识
+            identifier = self._get_element_identifier(element, options.element_matcher)
+            if not identifier:
+                raise XmlMergeError("无法获取元素标识，请检查 element_matcher 配置")
+            elements.append((element, identifier))
+
+        if not elements:
+            return []
+
+        request = _PendingMerge(elements, options)
+        if self.group_commit:
+            self._group_commit(request)
+        else:
+            self._commit([request])
 
-        # 获取元素标识
-        identifier = self._get_element_identifier(element, options.element_matcher)
-        if not identifier:
-            raise XmlMergeError("无法获取元素标识，请检查 element_matcher 配置")
+        if request.error is not None:
+            raise request.error
+        return request.results
 
-        # 2. 解析目标文件
-        tree = self.parser.parse_file(str(self.xml_path))
-        root = self.parser.get_root(tree)
+    def _group_commit(self, request: "_PendingMerge") -> None:
+        """
+        组提交：写入进行中到达的合并请求排队，由当前写入者在下一轮统一提交
+
+        第一个到达的线程成为写入者，循环取出队列中的全部请求，
+        每一轮只解析、写入一次；其余线程等待自己的请求完成。
+        strip_ns_on_children 作用于整次写回，取值不同的相邻请求按到达顺序分开提交。
+        """
+        queue = _commit_queue(self.xml_path)
+        with queue.lock:
+            queue.pending.append(request)
+            leader = not queue.leader_active
+            queue.leader_active = True
+
+        if not leader:
+            request.done.wait()
+            return
+
+        while True:
+            with queue.lock:
+                batch, queue.pending = queue.pending, []
+                if not batch:
+                    queue.leader_active = False
+                    return
+            for _, run in itertools.groupby(batch, key=lambda r: r.options.strip_ns_on_children):
+                self._commit(list(run))
+
+    def _commit(self, requests: List["_PendingMerge"]) -> None:
+        """
+        在文件锁内对一组请求执行一次 读取 - 合并 - 写回
+
+        某个请求合并失败时只标记该请求失败，丢弃已修改的树后重新提交其余请求。
+        同一组请求的 strip_ns_on_children 必须相同（由 _group_commit 保证）。
+        """
+        remaining = list(requests)
+        try:
+            with self._file_lock(), self.tree_lock:
+                while remaining:
+                    # 2. 解析目标文件
+                    tree, state = self._load_document()
+                    root = self.parser.get_root(tree)
+                    indexes = state.setdefault("indexes", IndexStore())
+                    parents = state.setdefault("parents", {})
+                    fingerprints = state.setdefault("fingerprints", {})
+
+                    current = None
+                    changed: List[Tuple[etree._Element, etree._Element, str]] = []
+                    try:
+                        for current in remaining:
+                            current.results = self._apply_request(
+                                root, current, indexes, changed, parents, fingerprints
+                            )
+                        current = None
+
+                        # 全部跳过（内容与现有元素一致）时不序列化、不写文件
+                        if not changed:
+                            break
+
+                        # 6. 写回文件（优先增量拼接，不满足条件时整树写回）
+                        strip_child_ns = remaining[0].options.strip_ns_on_children
+                        if not self._splice_write(tree, state, changed, strip_child_ns):
+                            self._write_tree(
+                                tree,
+                                strip_child_ns=strip_child_ns,
+                                state=state,
+                                inserted=[element for _, element, _ in changed]
+                            )
+                        break
+                    except Exception as e:
+                        # 缓存中的树可能已被修改，丢弃以免与磁盘内容不一致
+                        self._discard_cached()
+                        if current is None or len(remaining) == 1:
+                            raise
+                        current.error = e
+                        remaining.remove(current)
+        except Exception as e:
+            for request in remaining:
+                request.error = e
+        finally:
+            for request in requests:
+                request.done.set()
+
+    def _apply_request(
+        self,
+        root: etree._Element,
+        request: "_PendingMerge",
+        indexes: IndexStore,
+        changed: Optional[list] = None,
+        parents: Optional[dict] = None,
+        fingerprints: Optional[dict] = None
+    ) -> List[MergeResult]:
+        options = request.options
 
         # 3. 查找父容器
-        parent = self.parser.find_element(root, options.parent_xpath)
+        # `.//entities` 这类后代路径每次都要遍历整棵树；合并只修改父容器的子节点，
+        # 不会改变文档中第一个匹配的位置，因此按路径记住已找到的父容器
+        parent = parents.get(options.parent_xpath) if parents is not None else None
         if parent is None:
-            raise XmlMergeError(f"未找到父容器: {options.parent_xpath}")
+            parent = self.parser.find_element(root, options.parent_xpath)
+            if parent is None:
+                raise XmlMergeError(f"未找到父容器: {options.parent_xpath}")
+            if parents is not None:
+                parents[options.parent_xpath] = parent
+
+        results = []
+        for element, identifier in request.elements:
+            result, applied = self._apply(parent, element, identifier, options, indexes, fingerprints)
+            if changed is not None and result.action != "skipped":
+                changed.append((parent, applied, result.action))
+            results.append(result)
+        return results
+
+    def _file_lock(self):
+        if not self.file_lock:
+            return nullcontext()
+        return FileLock(str(self.xml_path), timeout=self.lock_timeout)
+
+    def _apply(
+        self,
+        parent: etree._Element,
+        element: etree._Element,
+        identifier: str,
+        options: MergeOptions,
+        indexes: IndexStore,
+        fingerprints: Optional[dict] = None
+    ) -> Tuple[MergeResult, etree._Element]:
+        """
+        将元素按合并策略应用到父容器
 
+        replace_or_append 策略下，待合并元素与现有元素的规范化指纹相同时不做修改，
+        返回 skipped。现有元素的指纹按 (父容器路径, 标识) 缓存在 fingerprints 中，
+        同一元素只计算一次。
+
+        patch 策略下把待合并元素作为增量原地合并进现有元素（见 patch_element），
+        没有任何修改时返回 skipped。
+
+        Args:
+            parent: 父容器
+            element: 待合并元素
+            identifier: 元素标识
+            options: 合并选项
+            indexes: 当前解析树的标识索引
+            fingerprints: 当前解析树的元素指纹缓存（可选）
+
+        Returns:
+            (合并结果, 父容器中被修改或追加的元素)
+
+        Raises:
+            XmlDuplicateIdentifierError: 需要替换的标识在容器中不唯一
+        """
         # 4. 查找现有元素
-        existing = self._find_element_by_identifier(
-            parent,
-            element.tag,
-            identifier,
-            options.element_matcher
-        )
+        index = indexes.index_for(parent, element.tag, options.element_matcher)
+        matches = index.get(identifier) if index is not None else []
+
+        if len(matches) > 1 and options.merge_strategy != "always_append":
+            raise XmlDuplicateIdentifierError(
+                f"元素标识不唯一: {index.attr}=\"{identifier}\" 在 {options.parent_xpath} 中出现 {len(matches)} 次"
+            )
+        existing = matches[0] if matches else None
 
         # 5. 合并或追加
-        if existing is not None:
-            if options.merge_strategy == "always_append":
-                parent.append(element)
-                action = "created"
-            elif options.merge_strategy == "force_replace":
-                if existing is not None:
-                    parent.replace(existing, element)
+        if existing is not None and options.merge_strategy == "patch":
+            report = patch_element(existing, element)
+            if not report.changed:
+                return MergeResult.from_patch(identifier, "skipped", report), existing
+            # 现有元素已原地修改，标识不变，索引无需更新
+            if fingerprints is not None:
+                fingerprints.pop((options.parent_xpath, identifier), None)
+            return MergeResult.from_patch(identifier, "updated", report), existing
+
+        if existing is not None and options.merge_strategy != "always_append":
+            key = (options.parent_xpath, identifier)
+            fingerprint = None
+            if options.merge_strategy == "replace_or_append":
+                # 内容未变化时跳过
+                fingerprint = canonical_fingerprint(element)
+                cached = fingerprints.get(key) if fingerprints is not None else None
+                if cached is not None and cached[0] is existing:
+                    existing_fingerprint = cached[1]
+                else:
+                    existing_fingerprint = canonical_fingerprint(existing)
+                if fingerprints is not None:
+                    fingerprints[key] = (existing, existing_fingerprint)
+                if fingerprint == existing_fingerprint:
+                    return MergeResult(identifier=identifier, action="skipped"), existing
+
+            # replace_or_append / force_replace
+            parent.replace(existing, element)
+            indexes.on_replace(parent, existing, element)
+            if fingerprints is not None:
+                if fingerprint is None:
+                    fingerprints.pop(key, None)
                 else:
-                    parent.append(element)
-                action = "updated"
-            else:  # replace_or_append
-                parent.replace(existing, element)
-                action = "updated"
+                    fingerprints[key] = (element, fingerprint)
+            action = "updated"
         else:
             parent.append(element)
+            indexes.on_append(parent, element)
             action = "created"
 
-        # 6. 写回文件
-        self.formatter.write_tree(
+        return MergeResult(identifier=identifier, action=action), element
+
+    def _splice_write(
+        self,
+        tree: etree._ElementTree,
+        state: dict,
+        changed: List[Tuple[etree._Element, etree._Element, str]],
+        strip_child_ns: bool
+    ) -> bool:
+        """
+        增量写入：只把本次替换/追加的元素拼接进文件
+
+        父容器子节点的字节偏移保存在派生数据的 "layout" 中，缺失或已过期时
+        从磁盘文件重新扫描一次。
+
+        Args:
+            tree: 已完成合并的 ElementTree
+            state: 该解析树的派生数据
+            changed: 本次合并的 (父容器, 元素, 动作) 列表
+            strip_child_ns: 是否移除子元素的命名空间声明
+
+        Returns:
+            是否已写入；未启用、涉及多个父容器、引入了新的命名空间或偏移索引
+            无法建立时返回 False，由调用方整树写回
+        """
+        if not self.incremental_write or not changed:
+            return False
+
+        parent = changed[0][0]
+        if any(p is not parent for p, _, _ in changed):
+            return False
+
+        # 新的命名空间需要提升到根元素，只能整树写回
+        parent_ns = set(parent.nsmap.items())
+        root_ns = set(tree.getroot().nsmap.items())
+        for _, element, _ in changed:
+            if not set(element.nsmap.items()) <= parent_ns:
+                return False
+            if strip_child_ns and any(
+                not set(e.nsmap.items()) <= root_ns for e in element.iter(etree.Element)
+            ):
+                return False
+
+        # 文件中的子节点数 = 合并后的子节点数 - 本次追加数
+        count = len(parent) - sum(1 for _, _, action in changed if action == "created")
+        identity = FileIdentity.of(self.xml_path)
+        layout = state.pop("layout", None)
+        if (
+            layout is None
+            or layout.parent is not parent
+            or layout.identity != identity
+            or len(layout.starts) != count
+        ):
+            with open(self.xml_path, "rb") as f:
+                data = f.read()
+            layout = ContainerLayout.scan(data, parent, identity, count)
+            if layout is None:
+                return False
+
+        edits = layout.splice(
+            [element for _, element, _ in changed],
+            self.formatter.serialize_child_bytes
+        )
+        self.formatter.splice_file(str(self.xml_path), edits)
+        if not strip_child_ns:
+            # 新元素可能带有自己的命名空间声明，下次整树写回需要重新全树提升
+            state["namespaces_hoisted"] = False
+
+        layout.identity = FileIdentity.of(self.xml_path)
+        state["layout"] = layout
+        if self.cache is not None:
+            self.cache.put(self.xml_path, tree, layout.identity, keep_state=True)
+        return True
+
+    def _load_tree(self) -> etree._ElementTree:
+        """
+        加载目标文件的解析树（启用缓存时优先复用）
+
+        Returns:
+            ElementTree 对象
+        """
+        return self._load_document()[0]
+
+    def _load_document(self) -> tuple[etree._ElementTree, dict]:
+        """
+        加载目标文件的解析树及其派生数据
+
+        Returns:
+            (ElementTree, 派生数据字典)；未启用缓存时派生数据只在本次调用内有效
+        """
+        if self.cache is None:
+            return self.parser.parse_file(str(self.xml_path)), {}
+
+        tree = self.cache.get(self.xml_path)
+        if tree is not None:
+            return tree, self.cache.state(self.xml_path)
+
+        # 解析前先取文件身份，解析期间文件若被修改，下次读取会自动失效
+        identity = FileIdentity.of(self.xml_path)
+        tree = self.parser.parse_file(str(self.xml_path))
+        if identity is not None:
+            self.cache.put(self.xml_path, tree, identity)
+        return tree, self.cache.state(self.xml_path)
+
+    def _write_tree(
+        self,
+        tree: etree._ElementTree,
+        strip_child_ns: bool = True,
+        state: Optional[dict] = None,
+        inserted: Optional[List[etree._Element]] = None
+    ) -> None:
+        """
+        写回目标文件，并刷新缓存
+
+        Args:
+            tree: ElementTree 对象
+            strip_child_ns: 是否移除子元素的命名空间声明
+            state: 该解析树的派生数据，记录整棵树是否已经完成命名空间提升
+            inserted: 本次新插入的元素；树已提升过时只对这些子树做命名空间提升
+        """
+        hoisted = state is not None and state.get("namespaces_hoisted", False)
+        written = self.formatter.write_tree(
             tree,
             str(self.xml_path),
-            strip_child_ns=options.strip_ns_on_children
+            strip_child_ns=strip_child_ns,
+            inserted=inserted if hoisted else None
         )
+        if state is not None:
+            state["namespaces_hoisted"] = strip_child_ns
+        if self.cache is not None:
+            self.cache.put(self.xml_path, written, keep_state=True)
+            # 整树写回后字节偏移全部改变
+            self.cache.state(self.xml_path).pop("layout", None)
 
-        return MergeResult(identifier=identifier, action=action)
+    def _discard_cached(self) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(self.xml_path)
 
     def _get_element_identifier(
         self,
@@ -131,54 +576,13 @@ class XmlMerger:
             return element.get(matcher_attr)
 
         # 默认使用 id, name, key 属性
-        for attr in ['id', 'name', 'key']:
+        for attr in DEFAULT_IDENTIFIER_ATTRS:
             value = element.get(attr)
             if value:
                 return value
 
         return None
 
-    def _find_element_by_identifier(
-        self,
-        parent: etree._Element,
-        tag_name: str,
-        identifier: str,
-        matcher_attr: Optional[str]
-    ) -> Optional[etree._Element]:
-        """
-        在父元素中查找指定标识的元素
-
-        Args:
-            parent: 父元素
-            tag_name: 标签名
-            identifier: 标识值
-            matcher_attr: 匹配属性名
-
-        Returns:
-            找到的元素，未找到返回 None
-        """
-        if matcher_attr:
-            attr_name = matcher_attr
-        else:
-            # 自动检测匹配属性
-            attr_name = None
-            for child in parent.findall(tag_name):
-                for attr in ['id', 'name', 'key']:
-                    if child.get(attr):
-                        attr_name = attr
-                        break
-                if attr_name:
-                    break
-
-        if not attr_name:
-            return None
-
-        for child in parent.findall(tag_name):
-            if child.get(attr_name) == identifier:
-                return child
-
-        return None
-
     def find_element(
         self,
         xpath: str,
@@ -187,6 +591,9 @@ class XmlMerger:
         """
         在文件中查找元素
 
+        查找在树锁内进行；启用缓存时返回的元素属于共享的缓存树，调用方在其他线程
+        可能合并的情况下继续读取它时，需要自行持有 tree_lock。
+
         Args:
             xpath: XPath 表达式
             namespace_map: 命名空间映射
@@ -194,9 +601,10 @@ class XmlMerger:
         Returns:
             找到的元素，未找到返回 None
         """
-        tree = self.parser.parse_file(str(self.xml_path))
-        root = self.parser.get_root(tree)
-        return self.parser.find_element(root, xpath, namespace_map)
+        with self.tree_lock:
+            tree = self._load_tree()
+            root = self.parser.get_root(tree)
+            return self.parser.find_element(root, xpath, namespace_map)
 
     def replace_element(
         self,
@@ -215,17 +623,26 @@ class XmlMerger:
         Returns:
             是否成功替换
         """
-        tree = self.parser.parse_file(str(self.xml_path))
-        root = self.parser.get_root(tree)
-        old_element = self.parser.find_element(root, xpath, namespace_map)
-
-        if old_element is None:
-            return False
-
-        parent = old_element.getparent()
-        if parent is None:
-            return False
-
-        parent.replace(old_element, new_element)
-        self.formatter.write_tree(tree, str(self.xml_path))
-        return True
+        with self._file_lock(), self.tree_lock:
+            tree, state = self._load_document()
+            root = self.parser.get_root(tree)
+            old_element = self.parser.find_element(root, xpath, namespace_map)
+
+            if old_element is None:
+                return False
+
+            parent = old_element.getparent()
+            if parent is None:
+                return False
+
+            try:
+                parent.replace(old_element, new_element)
+                # 任意位置的替换无法精确维护索引、已找到的父容器和元素指纹，直接丢弃
+                state.pop("indexes", None)
+                state.pop("parents", None)
+                state.pop("fingerprints", None)
+                self._write_tree(tree, state=state, inserted=[new_element])
+            except Exception:
+                self._discard_cached()
+                raise
+            return True
@@ -1,9 +1,25 @@
 """XML 命名空间处理器"""
 
-from typing import List, Set, Optional
+import re
+from typing import List, Set, Optional, Tuple
 from lxml import etree
 
 
+# 片段扫描的记号：代码块标记、注释、CDATA、处理指令/声明、开始或结束标签
+# 标签的属性部分允许引号内出现 `>`；文本内容不会被当作标签或属性。
+# 使用占有量词，未闭合的标签不会引起回溯爆炸
+_FRAGMENT_TOKEN = re.compile(
+    r"(?P<fence>```(?:xml)?)"
+    r"|<!--.*?-->"
+    r"|<!\[CDATA\[.*?\]\]>"
+    r"|<[?!][^>]*+>"
+    r"|</?(?P<tag>[^\s/>]++)(?P<attrs>(?:[^>\"']++|\"[^\"]*+\"|'[^']*+')*+)>",
+    re.DOTALL
+)
+# 标签内的属性名（跳过引号内的属性值）
+_ATTRIBUTE_NAME = re.compile(r"([^\s=/]++)\s*=\s*(?:\"[^\"]*+\"|'[^']*+')")
+
+
 class NamespaceHandler:
     """XML 命名空间处理"""
 
@@ -29,11 +45,52 @@ class NamespaceHandler:
         Returns:
             使用的命名空间前缀集合
         """
-        used_namespaces = set()
-        for prefix in self.prefixes:
-            if f'{prefix}:' in xml:
-                used_namespaces.add(prefix)
-        return used_namespaces
+        return self.scan_fragment(xml)[1]
+
+    def scan_fragment(self, xml: str) -> Tuple[str, Set[str]]:
+        """
+        单次扫描 XML 片段：去掉代码块标记，同时收集使用的命名空间前缀
+
+        只统计标签名和属性名中出现的 `prefix:`，文本内容、注释、CDATA 和属性值
+        中的冒号不计入。无论配置了多少前缀，片段都只扫描一遍。
+
+        Args:
+            xml: XML 片段（可能包含 ``` 代码块标记）
+
+        Returns:
+            (清理后的片段, 使用的命名空间前缀集合)
+        """
+        prefixes = set(self.prefixes)
+        used = set()
+        # 代码块标记之间的片段
+        parts = []
+        start = 0
+
+        for match in _FRAGMENT_TOKEN.finditer(xml):
+            if match.group("fence") is not None:
+                parts.append(xml[start:match.start()])
+                start = match.end()
+                continue
+
+            tag = match.group("tag")
+            if tag is None:
+                continue
+            prefix, sep, _ = tag.partition(":")
+            if sep and prefix in prefixes:
+                used.add(prefix)
+            attrs = match.group("attrs")
+            if ":" in attrs:
+                for name in _ATTRIBUTE_NAME.findall(attrs):
+                    prefix, sep, _ = name.partition(":")
+                    if sep and prefix in prefixes:
+                        used.add(prefix)
+
+        if parts:
+            parts.append(xml[start:])
+            cleaned = "".join(parts).strip()
+        else:
+            cleaned = xml.strip()
+        return cleaned, used
 
     @staticmethod
     def build_namespace_declarations(prefixes: Set[str]) -> List[str]:
@@ -61,11 +118,22 @@ class NamespaceHandler:
         Returns:
             (包装后的 XML, 命名空间映射字典)
         """
-        cleaned = xml.replace("```xml", "").replace("```", "").strip()
+        # 去掉代码块标记并检测实际使用的命名空间（单次扫描）
+        cleaned, used_namespaces = self.scan_fragment(xml)
+        return self.build_namespace_wrapper(cleaned, used_namespaces)
 
-        # 检测实际使用的命名空间
-        used_namespaces = self.detect_used_namespaces(cleaned)
+    @staticmethod
+    def build_namespace_wrapper(cleaned: str, used_namespaces: Set[str]) -> tuple[str, dict]:
+        """
+        用已检测出的前缀为清理后的片段构建命名空间包装
 
+        Args:
+            cleaned: 已去掉代码块标记的 XML 片段
+            used_namespaces: 使用的命名空间前缀集合
+
+        Returns:
+            (包装后的 XML, 命名空间映射字典)
+        """
         # 构建命名空间映射
         ns_map = {}
         for prefix in used_namespaces:
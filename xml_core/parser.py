@@ -1,42 +1,119 @@
 """XML 解析器"""
 
 import logging
+import mmap
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Optional, List
+from typing import Iterator, Optional, List
 from lxml import etree
 
 from .namespace import NamespaceHandler
+from .pool import get_parser
+from .xpath import XPathCache, shared_xpath_cache
 from .exceptions import XmlParseError, XmlFileNotFoundError
 
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MMAP_CHUNK_SIZE = 1024 * 1024
+
+
+class ParseStats:
+    """文件解析统计（读取字节数、解析耗时），可在多个线程间共享"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files = 0
+        self.mmap_files = 0
+        self.bytes_read = 0
+        self.parse_seconds = 0.0
+        self.last: Optional[dict] = None
+
+    def record(self, path: str, bytes_read: int, seconds: float, method: str) -> None:
+        """
+        记录一次文件解析
+
+        Args:
+            path: 文件路径
+            bytes_read: 读取的字节数
+            seconds: 解析耗时（秒）
+            method: 读取方式（file/mmap）
+        """
+        with self._lock:
+            self.files += 1
+            if method == "mmap":
+                self.mmap_files += 1
+            self.bytes_read += bytes_read
+            self.parse_seconds += seconds
+            self.last = {
+                "path": path,
+                "method": method,
+                "bytes_read": bytes_read,
+                "parse_ms": round(seconds * 1000, 3),
+            }
+
+    def snapshot(self) -> dict:
+        """
+        获取统计快照
+
+        Returns:
+            包含解析文件数、读取字节数、累计耗时和最近一次解析的字典
+        """
+        with self._lock:
+            return {
+                "files": self.files,
+                "mmap_files": self.mmap_files,
+                "bytes_read": self.bytes_read,
+                "parse_ms": round(self.parse_seconds * 1000, 3),
+                "last": dict(self.last) if self.last else None,
+            }
+
 
 class XmlParser:
     """XML 解析器"""
 
-    def __init__(self, encoding: str = "utf-8", namespaces: Optional[List[str]] = None):
+    def __init__(
+        self,
+        encoding: str = "utf-8",
+        namespaces: Optional[List[str]] = None,
+        xpath_cache: Optional[XPathCache] = None,
+        use_mmap: bool = False,
+        mmap_chunk_size: int = DEFAULT_MMAP_CHUNK_SIZE
+    ):
         """
         初始化解析器
 
         Args:
             encoding: 文件编码
             namespaces: 支持的命名空间前缀列表
+            xpath_cache: 路径表达式缓存，默认使用进程级共享缓存
+            use_mmap: parse_file 是否通过 mmap 分块喂给 lxml 的增量解析器
+            mmap_chunk_size: mmap 模式下每次喂给解析器的字节数
         """
         self.encoding = encoding
         self.ns_handler = NamespaceHandler(prefixes=namespaces)
+        self.xpath_cache = xpath_cache if xpath_cache is not None else shared_xpath_cache()
+        self.use_mmap = use_mmap
+        self.mmap_chunk_size = mmap_chunk_size
+        self.stats = ParseStats()
 
     def parse_file(
         self,
         file_path: str,
-        auto_fix_namespaces: bool = True
+        auto_fix_namespaces: bool = True,
+        use_mmap: Optional[bool] = None
     ) -> etree._ElementTree:
         """
         解析 XML 文件
 
+        读取字节数和解析耗时记录在 self.stats 中。
+
         Args:
             file_path: XML 文件路径
             auto_fix_namespaces: 是否自动尝试修复命名空间（使用 recover 模式）
+            use_mmap: 是否通过 mmap 读取（None 时使用初始化参数）
 
         Returns:
             ElementTree 对象
@@ -51,18 +128,65 @@ class XmlParser:
 
         # 使用 recover=True 来处理可能缺失命名空间的文件
         # 这比正则替换更安全，lxml 会尽力解析
-        parser = etree.XMLParser(
+        parser = get_parser(
             remove_blank_text=False,
             remove_comments=False,
             recover=auto_fix_namespaces  # 启用恢复模式
         )
 
+        if use_mmap is None:
+            use_mmap = self.use_mmap
+
+        start = time.perf_counter()
         try:
-            tree = etree.parse(file_path, parser)
-            return tree
+            if use_mmap:
+                tree, bytes_read = self._parse_mmap(path, parser)
+            else:
+                tree = etree.parse(file_path, parser)
+                bytes_read = path.stat().st_size
         except Exception as e:
             raise XmlParseError(f"解析文件失败: {e}")
 
+        elapsed = time.perf_counter() - start
+        method = "mmap" if use_mmap else "file"
+        self.stats.record(str(file_path), bytes_read, elapsed, method)
+        logger.debug(f"解析文件 {file_path}: {bytes_read} 字节, {elapsed * 1000:.1f} ms ({method})")
+        return tree
+
+    def _parse_mmap(self, path: Path, parser: etree.XMLParser) -> tuple[etree._ElementTree, int]:
+        """
+        将文件映射到内存，按块喂给 lxml 的增量解析器
+
+        整个文件不会先读成一个 Python bytes 对象，每次只复制 mmap_chunk_size 字节。
+
+        Args:
+            path: 文件路径
+            parser: lxml 解析器
+
+        Returns:
+            (ElementTree, 读取的字节数)
+        """
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                # 空文件无法映射，交给 lxml 报告错误
+                return etree.parse(f, parser), 0
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                chunk = self.mmap_chunk_size
+                try:
+                    for offset in range(0, size, chunk):
+                        parser.feed(mapped[offset:offset + chunk])
+                    root = parser.close()
+                except Exception:
+                    # 复位线程内复用的解析器，避免残留的增量解析状态影响下一次解析
+                    try:
+                        parser.close()
+                    except Exception:
+                        pass
+                    raise
+        return root.getroottree(), size
+
     def parse_fragment(
         self,
         xml: str,
@@ -83,60 +207,78 @@ class XmlParser:
         Raises:
             XmlParseError: 解析失败
         """
-        # 清理代码块标记
-        cleaned = xml.replace("```xml", "").replace("```", "").strip()
+        return next(self.parse_fragments(xml, target_tag, auto_namespaces))
+
+    def parse_fragments(
+        self,
+        xml: str,
+        target_tag: str = None,
+        auto_namespaces: bool = True
+    ) -> Iterator[etree._Element]:
+        """
+        解析 XML 片段，依次返回所有匹配的元素（片段只解析一次）
+
+        Args:
+            xml: XML 片段字符串（可包含多个元素或多个代码块）
+            target_tag: 目标标签名（如果为 None，返回所有顶层元素）
+            auto_namespaces: 是否自动处理命名空间
+
+        Yields:
+            Element 对象（按文档顺序）
+
+        Raises:
+            XmlParseError: 解析失败或没有匹配的元素
+        """
+        # 清理代码块标记，同时检测使用的命名空间前缀（单次扫描）
+        cleaned, used_namespaces = self.ns_handler.scan_fragment(xml)
 
         if auto_namespaces:
-            wrapper, ns_map = self.ns_handler.prepare_namespace_wrapper(cleaned)
+            wrapper, ns_map = self.ns_handler.build_namespace_wrapper(cleaned, used_namespaces)
         else:
             wrapper = f'<root>{cleaned}</root>'
             ns_map = {}
 
-        parser = etree.XMLParser(remove_blank_text=False)
+        parser = get_parser(remove_blank_text=False)
 
         try:
             root = etree.fromstring(wrapper.encode(self.encoding), parser)
 
             if target_tag:
+                path = f".//{target_tag}"
                 # 带命名空间的查找
                 if ns_map:
                     # 使用命名空间映射查找
-                    element = root.find(f".//{target_tag}", namespaces=ns_map)
-                    if element is None:
+                    elements = self.xpath_cache.compile(path, ns_map).findall(root)
+                    if not elements:
                         # 如果没找到，尝试不带命名空间的查找
-                        element = root.find(f".//{target_tag}")
+                        elements = self.xpath_cache.compile(path).findall(root)
                 else:
-                    element = root.find(f".//{target_tag}")
+                    elements = self.xpath_cache.compile(path).findall(root)
 
-                if element is None:
+                if not elements:
                     raise XmlParseError(f"未找到目标标签: {target_tag}")
-                return element
-
-            # 如果没有指定 target_tag，返回第一个子元素
-            # 使用 list(root) 获取所有子节点
-            all_children = list(root)
-
-            # 过滤出实际的元素（跳过纯文本节点）
-            children = []
-            for child in all_children:
-                # 使用 etree.iselement 来判断是否为 Element
-                if etree.iselement(child):
-                    children.append(child)
-
-            if len(children) == 0:
-                # 调试：输出 root 的信息
-                logger.error(f"Root 没有子元素. Root tag: {root.tag}, 所有子节点数: {len(all_children)}")
-                # 输出所有子节点的信息
-                for i, child in enumerate(all_children):
-                    logger.error(f"  子节点 {i}: type={type(child)}, tag={getattr(child, 'tag', 'N/A')}")
-                raise XmlParseError("XML 片段没有子元素")
-
-            return children[0]
+            else:
+                # 没有指定 target_tag 时返回所有顶层元素
+                # 使用 list(root) 获取所有子节点
+                all_children = list(root)
+
+                # 过滤出实际的元素（跳过注释、处理指令等节点）
+                elements = [child for child in all_children if isinstance(child.tag, str)]
+
+                if not elements:
+                    # 调试：输出 root 的信息
+                    logger.error(f"Root 没有子元素. Root tag: {root.tag}, 所有子节点数: {len(all_children)}")
+                    # 输出所有子节点的信息
+                    for i, child in enumerate(all_children):
+                        logger.error(f"  子节点 {i}: type={type(child)}, tag={getattr(child, 'tag', 'N/A')}")
+                    raise XmlParseError("XML 片段没有子元素")
 
         except Exception as e:
             logger.error(f"XML 解析失败: {e}\nXML 内容: {cleaned[:500]}")
             raise XmlParseError(f"XML 解析失败: {e}")
 
+        yield from elements
+
     def parse_element_with_config(
         self,
         xml: str,
@@ -194,7 +336,7 @@ class XmlParser:
             找到的元素，未找到返回 None
         """
         ns_map = namespace_map or NamespaceHandler.get_default_namespace_map()
-        return root.find(xpath, ns_map)
+        return self.xpath_cache.compile(xpath, ns_map).find(root)
 
     def find_elements(
         self,
@@ -214,4 +356,4 @@ class XmlParser:
             元素列表
         """
         ns_map = namespace_map or NamespaceHandler.get_default_namespace_map()
-        return root.findall(xpath, ns_map)
+        return self.xpath_cache.compile(xpath, ns_map).findall(root)
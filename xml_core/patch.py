@@ -0,0 +1,170 @@
+"""按子元素、按属性的增量合并（patch 策略）"""
+
+import copy
+from typing import Dict, List, Optional, Tuple
+from lxml import etree
+
+from .index import DEFAULT_IDENTIFIER_ATTRS
+
+
+class PatchReport:
+    """一次 patch 的结果：增量中各子元素的处理情况（相对路径）"""
+
+    __slots__ = ("added", "updated", "untouched", "attributes")
+
+    def __init__(self):
+        self.added: List[str] = []
+        self.updated: List[str] = []
+        self.untouched: List[str] = []
+        # 合并元素自身被修改的属性数（含文本）
+        self.attributes = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.attributes)
+
+
+def patch_element(target: etree._Element, delta: etree._Element) -> PatchReport:
+    """
+    把增量元素 delta 合并进 target（原地修改 target）
+
+    规则：
+    - 属性逐个覆盖，delta 中没有出现的属性保持不变（不删除）；
+    - 非空白文本不同时覆盖；
+    - 子元素带 id/name/key 属性时按 (标签, 标识) 匹配，否则按标签在同名无标识
+      子元素中依次匹配；匹配到则递归合并，未匹配到则追加副本；
+    - delta 中没有出现的子元素保持不变。
+
+    结果只列出 delta 中出现的子元素：带标识的子元素和不含子元素的无标识子元素
+    按相对路径（如 `columns/column[@name='id']`）计入 added/updated/untouched，
+    其余无标识子元素（如 `<columns>`）只作为容器向下匹配。耗时与增量大小及
+    被匹配容器的直接子元素数成正比，与整个文档无关。
+
+    Args:
+        target: 现有元素
+        delta: 增量元素
+
+    Returns:
+        PatchReport: 合并结果
+    """
+    report = PatchReport()
+    report.attributes = _patch_own(target, delta)
+    _patch_children(target, delta, "", report)
+    return report
+
+
+def _patch_own(target: etree._Element, delta: etree._Element) -> int:
+    """覆盖属性和文本，返回修改的项数"""
+    changes = 0
+    for name, value in delta.attrib.items():
+        if target.get(name) != value:
+            target.set(name, value)
+            changes += 1
+    text = delta.text
+    if text is not None and text.strip() and (target.text or "").strip() != text.strip():
+        target.text = text
+        changes += 1
+    return changes
+
+
+def _patch_children(target: etree._Element, delta: etree._Element, prefix: str, report: PatchReport) -> bool:
+    """递归合并子元素，返回 target 的子树是否被修改"""
+    keyed: Optional[Dict[Tuple[str, str, str], etree._Element]] = None
+    unkeyed: Optional[Dict[str, List[etree._Element]]] = None
+    changed = False
+
+    for child in delta:
+        if not isinstance(child.tag, str):
+            continue
+        key = _child_key(child)
+
+        # 按需建立 target 直接子元素的查找表（每个容器只扫描一次）
+        if key is not None:
+            if keyed is None:
+                keyed = {}
+                for existing in target:
+                    existing_key = _child_key(existing) if isinstance(existing.tag, str) else None
+                    if existing_key is not None:
+                        keyed.setdefault((existing.tag,) + existing_key, existing)
+            match = keyed.get((child.tag,) + key)
+        else:
+            if unkeyed is None:
+                unkeyed = {}
+                for existing in target:
+                    if isinstance(existing.tag, str) and _child_key(existing) is None:
+                        unkeyed.setdefault(existing.tag, []).append(existing)
+            candidates = unkeyed.get(child.tag)
+            match = candidates.pop(0) if candidates else None
+
+        path = prefix + _step(child, key)
+        if match is None:
+            _append_child(target, copy.deepcopy(child))
+            report.added.append(path)
+            changed = True
+        elif key is not None or not _has_element_children(child):
+            # 带标识或不含子元素：作为一项记录，其内部的明细不单独列出
+            modified = _patch_own(match, child) > 0
+            modified = _patch_children(match, child, path + "/", PatchReport()) or modified
+            (report.updated if modified else report.untouched).append(path)
+            changed = changed or modified
+        else:
+            # 无标识的容器：向下匹配，由其子元素记录结果
+            modified = _patch_own(match, child) > 0
+            if modified:
+                report.updated.append(path)
+            changed = _patch_children(match, child, path + "/", report) or modified or changed
+
+    return changed
+
+
+def _child_key(element: etree._Element) -> Optional[Tuple[str, str]]:
+    """子元素的标识（属性名, 值），没有标识属性时返回 None"""
+    for attr in DEFAULT_IDENTIFIER_ATTRS:
+        value = element.get(attr)
+        if value:
+            return attr, value
+    return None
+
+
+def _has_element_children(element: etree._Element) -> bool:
+    return any(isinstance(child.tag, str) for child in element)
+
+
+def _step(element: etree._Element, key: Optional[Tuple[str, str]]) -> str:
+    """元素在路径中的一步，如 column[@name='id']"""
+    qname = etree.QName(element)
+    tag = f"{element.prefix}:{qname.localname}" if element.prefix else qname.localname
+    if key is None:
+        return tag
+    attr, value = key
+    return f"{tag}[@{attr}='{value}']"
+
+
+def _append_child(container: etree._Element, child: etree._Element) -> None:
+    """
+    追加子元素，并沿用现有兄弟元素的缩进
+
+    容器已有子元素时，新元素接管最后一个子元素的 tail（容器结束标签前的缩进），
+    最后一个子元素改用兄弟元素之间的缩进，新元素的子树按同样的缩进单位重排。
+    """
+    child.tail = None
+    if len(container) == 0:
+        container.append(child)
+        return
+
+    last = container[-1]
+    sibling_ws = container[-2].tail if len(container) > 1 else container.text
+    closing_ws = last.tail
+    container.append(child)
+    if sibling_ws is None or sibling_ws.strip() or closing_ws is None or closing_ws.strip():
+        return
+
+    last.tail = sibling_ws
+    child.tail = closing_ws
+
+    sibling_indent = sibling_ws.lstrip("\r\n")
+    closing_indent = closing_ws.lstrip("\r\n")
+    unit = sibling_indent[len(closing_indent):]
+    if unit and sibling_indent.startswith(closing_indent) and len(sibling_indent) % len(unit) == 0:
+        etree.indent(child, space=unit, level=len(sibling_indent) // len(unit))
+        child.tail = closing_ws
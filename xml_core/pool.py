@@ -0,0 +1,42 @@
+"""lxml 解析器池"""
+
+import threading
+from lxml import etree
+
+
+_local = threading.local()
+
+
+def get_parser(
+    recover: bool = False,
+    remove_blank_text: bool = False,
+    remove_comments: bool = False
+) -> etree.XMLParser:
+    """
+    获取当前线程内按选项复用的 etree.XMLParser
+
+    lxml 的解析器可以顺序复用，但不能被多个线程同时使用，
+    因此每个线程、每组选项各保留一个实例。
+
+    Args:
+        recover: 是否启用恢复模式
+        remove_blank_text: 是否去掉可忽略的空白文本
+        remove_comments: 是否去掉注释
+
+    Returns:
+        XMLParser 实例
+    """
+    parsers = getattr(_local, "parsers", None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+
+    key = (recover, remove_blank_text, remove_comments)
+    parser = parsers.get(key)
+    if parser is None:
+        parser = etree.XMLParser(
+            recover=recover,
+            remove_blank_text=remove_blank_text,
+            remove_comments=remove_comments
+        )
+        parsers[key] = parser
+    return parser
@@ -0,0 +1,143 @@
+"""查询结果缓存"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Hashable, Optional, Tuple
+
+from .cache import FileIdentity, PathLike
+
+
+class _QueryEntry:
+    """缓存条目：查询结果及其对应的版本号和文件身份"""
+
+    __slots__ = ("version", "identity", "result")
+
+    def __init__(self, version: int, identity: FileIdentity, result: Optional[str]):
+        self.version = version
+        self.identity = identity
+        self.result = result
+
+
+class QueryCache:
+    """
+    单个文件的查询结果缓存（路径表达式 + 命名空间映射 → 序列化结果）
+
+    条目在以下情况失效：
+    - 通过同一实例写入文件后调用 invalidate()（内部版本号加一，旧条目全部过期）；
+    - 文件被外部修改（读取时比较 mtime/size/inode）。
+
+    命中只需一次 stat 和一次字典查找，不解析文件也不序列化元素。
+    """
+
+    def __init__(self, path: PathLike, max_entries: int = 256):
+        """
+        初始化缓存
+
+        Args:
+            path: 被查询的文件路径
+            max_entries: 最多缓存的查询数
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], _QueryEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, xpath: str, namespace_map: Optional[dict] = None) -> Optional[Tuple[Optional[str]]]:
+        """
+        只查缓存，不计算
+
+        Args:
+            xpath: 路径表达式
+            namespace_map: 命名空间映射
+
+        Returns:
+            命中时返回 (结果,)（结果可能为 None，表示元素不存在）；未命中返回 None，不计入未命中次数
+        """
+        key = self._key(xpath, namespace_map)
+        with self._lock:
+            entry = self._valid_entry(key, FileIdentity.of(self.path))
+            if entry is None:
+                return None
+            self.hits += 1
+            return (entry.result,)
+
+    def get_or_compute(
+        self,
+        xpath: str,
+        namespace_map: Optional[dict],
+        compute: Callable[[], Optional[str]]
+    ) -> Optional[str]:
+        """
+        获取查询结果，未命中或已失效时调用 compute 计算并缓存
+
+        Args:
+            xpath: 路径表达式
+            namespace_map: 命名空间映射
+            compute: 计算序列化结果的函数（未找到元素时返回 None）
+
+        Returns:
+            序列化结果，未找到返回 None
+        """
+        key = self._key(xpath, namespace_map)
+        identity = FileIdentity.of(self.path)
+        with self._lock:
+            version = self.version
+            entry = self._valid_entry(key, identity)
+            if entry is not None:
+                self.hits += 1
+                return entry.result
+            self.misses += 1
+
+        # 先取文件身份和版本号再计算：计算期间文件被修改时，条目在下次读取时即失效
+        result = compute()
+        if identity is None or self.max_entries <= 0:
+            return result
+        with self._lock:
+            if version == self.version:
+                self._entries[key] = _QueryEntry(version, identity, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _key(xpath: str, namespace_map: Optional[dict]) -> Tuple[str, Hashable]:
+        return xpath, frozenset(namespace_map.items()) if namespace_map else None
+
+    def _valid_entry(self, key: Tuple[str, Hashable], identity: Optional[FileIdentity]) -> Optional[_QueryEntry]:
+        """查找仍然有效的条目（调用方持有锁）"""
+        entry = self._entries.get(key)
+        if entry is None or entry.version != self.version or entry.identity != identity:
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def invalidate(self) -> None:
+        """写入文件后调用：版本号加一，丢弃全部条目"""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        获取缓存统计
+
+        Returns:
+            包含条目数、命中/未命中次数、命中率和当前版本号的字典
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "version": self.version,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
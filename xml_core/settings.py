@@ -15,6 +15,40 @@ class XmlCoreSettings(BaseModel):
     pretty_print: bool = Field(default=True, description="是否美化输出")
     xml_declaration: bool = Field(default=True, description="是否包含 XML 声明")
 
+    # 写入配置
+    atomic_write: bool = Field(
+        default=True,
+        description="是否原子写入（同目录临时文件 + os.replace）"
+    )
+    fsync: bool = Field(
+        default=False,
+        description="原子写入时是否 fsync 落盘"
+    )
+    incremental_write: bool = Field(
+        default=False,
+        description="是否增量写入：按父容器子节点的字节偏移只拼接替换/追加的元素"
+    )
+
+    # 读取配置
+    use_mmap: bool = Field(
+        default=False,
+        description="解析目标文件时是否通过 mmap 分块喂给 lxml 的增量解析器"
+    )
+
+    # 并发配置
+    file_lock: bool = Field(
+        default=True,
+        description="读取 - 修改 - 写回期间是否持有跨进程文件锁（<文件名>.lock）"
+    )
+    lock_timeout: Optional[float] = Field(
+        default=None,
+        description="获取文件锁的超时时间（秒），None 表示一直等待"
+    )
+    group_commit: bool = Field(
+        default=False,
+        description="是否启用组提交：写入进行中到达的合并排队，下一轮统一解析/写入"
+    )
+
     # 命名空间配置
     auto_detect_namespaces: bool = Field(
         default=True,
@@ -40,7 +74,7 @@ class MergeOptions(BaseModel):
     )
     merge_strategy: str = Field(
         default="replace_or_append",
-        description="合并策略: replace_or_append, always_append, force_replace"
+        description="合并策略: replace_or_append, always_append, force_replace, patch"
     )
     strip_ns_on_children: bool = Field(
         default=True,
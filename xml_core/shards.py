@@ -0,0 +1,531 @@
+"""分片存储：父容器中的每个元素单独保存为一个文件，由清单组装"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from lxml import etree
+
+from .cache import FileIdentity
+from .fingerprint import canonical_fingerprint
+from .formatter import XmlFormatter, _LEADING_NS_DECLS, _NS_DECL
+from .index import DEFAULT_IDENTIFIER_ATTRS
+from .lock import FileLock
+from .merger import MergeResult
+from .parser import XmlParser
+from .patch import patch_element
+from .pool import get_parser
+from .settings import MergeOptions
+from .exceptions import XmlDuplicateIdentifierError, XmlFileNotFoundError, XmlMergeError
+
+
+logger = logging.getLogger(__name__)
+
+SKELETON_NAME = "_skeleton.xml"
+MANIFEST_NAME = "manifest.jsonl"
+STATE_NAME = "state.json"
+SHARDS_DIR = "shards"
+
+# 骨架中父容器内的占位注释，物化时在此处依次写入各分片
+SHARD_MARKER = "xml_core:shards"
+_MARKER_BYTES = f"<!--{SHARD_MARKER}-->".encode()
+
+_UNSAFE_FILENAME = re.compile(r"[^\w.-]+")
+
+# 分片文件中元素之前的空白、注释和处理指令
+_LEADING_MISC = re.compile(rb"(?:\s+|<!--.*?-->|<\?.*?\?>)*", re.S)
+
+
+def shard_filename(identifier: str) -> str:
+    """
+    由元素标识生成分片文件名（可读部分 + 标识摘要，避免大小写/特殊字符冲突）
+
+    Args:
+        identifier: 元素标识
+
+    Returns:
+        文件名
+    """
+    readable = _UNSAFE_FILENAME.sub("_", identifier).strip("._")[:80] or "element"
+    digest = hashlib.sha1(identifier.encode("utf-8")).hexdigest()[:10]
+    return f"{readable}-{digest}.xml"
+
+
+class ShardedXmlStore:
+    """
+    分片存储
+
+    目标文档父容器（如 `.//entities`）中的每个元素保存为单独的文件，合并时只
+    写入对应的小文件；需要完整文档的消费者（如导出 Excel）调用 materialize()
+    把骨架和全部分片按清单顺序流式写回目标文件，分片自上次物化后没有变化时跳过。
+
+    目录结构:
+        <shard_dir>/
+            _skeleton.xml      去掉父容器子元素的目标文档，父容器内是占位注释
+            manifest.jsonl     每行 {"id": 标识, "file": 分片文件名}，新增元素时追加一行
+            state.json         父容器路径、分片修订号、上次物化的修订号和目标文件身份
+            shards/*.xml       每个元素一个文件（自带使用的命名空间声明，可单独解析；
+                               元素之前的注释/处理指令一并保存在该文件中）
+
+    首次合并时从目标文件拆分出分片（见 split）。
+    """
+
+    def __init__(
+        self,
+        shard_dir: str,
+        target_path: str,
+        parser: Optional[XmlParser] = None,
+        formatter: Optional[XmlFormatter] = None,
+        lock_timeout: Optional[float] = None
+    ):
+        """
+        初始化分片存储
+
+        Args:
+            shard_dir: 分片目录
+            target_path: 物化输出的完整 XML 文件路径
+            parser: 解析器（可选）
+            formatter: 格式化器（可选），决定编码和是否原子写入
+            lock_timeout: 获取清单文件锁的超时时间（秒），None 表示一直等待
+        """
+        self.shard_dir = Path(shard_dir)
+        self.target_path = Path(target_path)
+        self.parser = parser or XmlParser()
+        self.formatter = formatter or XmlFormatter()
+        self.lock_timeout = lock_timeout
+
+        self.skeleton_path = self.shard_dir / SKELETON_NAME
+        self.manifest_path = self.shard_dir / MANIFEST_NAME
+        self.state_path = self.shard_dir / STATE_NAME
+        self.shards_path = self.shard_dir / SHARDS_DIR
+
+        # 清单的内存副本（标识 -> 分片文件名，保持清单顺序），按清单文件身份失效
+        self._manifest: Dict[str, str] = {}
+        self._manifest_identity: Optional[FileIdentity] = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        """分片目录是否已经建立"""
+        return self.state_path.exists()
+
+    def _file_lock(self) -> FileLock:
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        return FileLock(str(self.manifest_path), timeout=self.lock_timeout)
+
+    def split(self, parent_xpath: str, element_matcher: Optional[str] = None) -> int:
+        """
+        从目标文件拆分出骨架和分片（已建立时不做任何事）
+
+        Args:
+            parent_xpath: 父容器 XPath
+            element_matcher: 元素匹配属性名，None 时依次尝试 id/name/key
+
+        Returns:
+            拆分出的分片数
+
+        Raises:
+            XmlFileNotFoundError: 目标文件不存在
+            XmlMergeError: 未找到父容器或元素缺少标识
+            XmlDuplicateIdentifierError: 元素标识不唯一
+        """
+        with self._lock, self._file_lock():
+            if self.initialized:
+                return 0
+            return self._split(parent_xpath, element_matcher)
+
+    def _split(self, parent_xpath: str, element_matcher: Optional[str]) -> int:
+        if not self.target_path.exists():
+            raise XmlFileNotFoundError(f"文件不存在: {self.target_path}")
+
+        tree = self.parser.parse_file(str(self.target_path))
+        root = tree.getroot()
+        container = self.parser.find_element(root, parent_xpath)
+        if container is None:
+            raise XmlMergeError(f"未找到父容器: {parent_xpath}")
+
+        encoding = self.formatter.encoding
+        self.shards_path.mkdir(parents=True, exist_ok=True)
+        manifest_lines = []
+        seen = set()
+        children = []
+        # 元素之前的注释/处理指令随该元素写入同一个分片，最后一个元素之后的留在骨架中
+        leading: List[etree._Element] = []
+        for node in list(container):
+            if not isinstance(node.tag, str):
+                leading.append(node)
+                continue
+            identifier = _identifier(node, element_matcher)
+            if not identifier:
+                raise XmlMergeError(f"元素缺少标识，无法拆分: {node.tag}")
+            if identifier in seen:
+                raise XmlDuplicateIdentifierError(f"元素标识不唯一，无法拆分: {identifier}")
+            seen.add(identifier)
+
+            # 子元素单独序列化时会带上作用域内的全部命名空间声明，可以单独解析
+            filename = shard_filename(identifier)
+            data = b"".join(etree.tostring(n, encoding=encoding) for n in leading)
+            data += etree.tostring(node, encoding=encoding, with_tail=False)
+            self.formatter.write_bytes(data, str(self.shards_path / filename))
+            manifest_lines.append(_manifest_line(identifier, filename))
+            for n in leading:
+                container.remove(n)
+            leading = []
+            children.append(node)
+
+        # 骨架：保留父容器的首个缩进和结束前的空白，子元素替换为占位注释
+        tail = children[-1].tail if children else None
+        for child in children:
+            container.remove(child)
+        marker = etree.Comment(SHARD_MARKER)
+        marker.tail = tail
+        container.insert(0, marker)
+        self.formatter.write_bytes(
+            etree.tostring(tree, encoding=encoding, xml_declaration=True),
+            str(self.skeleton_path)
+        )
+
+        self.formatter.write_bytes("".join(manifest_lines).encode("utf-8"), str(self.manifest_path))
+        self._manifest_identity = None
+        self._save_state({
+            "parent_xpath": parent_xpath,
+            # 子元素的缩进（父容器开始标签后的空白）及层级，新分片按此缩进
+            "indent": container.text if container.text and not container.text.strip() else "",
+            "level": sum(1 for _ in container.iterancestors()) + 1,
+            "revision": 1,
+            "materialized_revision": 1,
+            "target_identity": list(FileIdentity.of(self.target_path) or ()),
+        })
+        logger.info(f"已拆分 {self.target_path} -> {self.shard_dir}: {len(children)} 个分片")
+        return len(children)
+
+    def merge_batch(self, element_xmls: List[str], options: MergeOptions) -> List[MergeResult]:
+        """
+        合并元素：每个元素只写入自己的分片文件
+
+        所有片段先全部解析并校验标识，任意一个失败则不修改任何文件。
+        replace_or_append 下内容与现有分片一致、patch 下没有任何修改时返回 skipped。
+
+        Args:
+            element_xmls: 元素 XML 片段列表
+            options: 合并选项
+
+        Returns:
+            与输入顺序一致的合并结果
+
+        Raises:
+            XmlMergeError: 标识缺失、父容器与拆分时不同或使用 always_append
+        """
+        if options.merge_strategy == "always_append":
+            raise XmlMergeError("分片存储按标识保存元素，不支持 always_append")
+
+        elements = []
+        for element_xml in element_xmls:
+            element = self.parser.parse_fragment(element_xml)
+            identifier = _identifier(element, options.element_matcher)
+            if not identifier:
+                raise XmlMergeError("无法获取元素标识，请检查 element_matcher 配置")
+            elements.append((element, identifier))
+
+        with self._lock, self._file_lock():
+            if not self.initialized:
+                self._split(options.parent_xpath, options.element_matcher)
+            state = self._load_state()
+            if state["parent_xpath"] != options.parent_xpath:
+                raise XmlMergeError(
+                    f"分片存储的父容器为 {state['parent_xpath']}，不能合并到 {options.parent_xpath}"
+                )
+            manifest = self._load_manifest()
+
+            results = []
+            new_lines = []
+            for element, identifier in elements:
+                filename = manifest.get(identifier)
+                report = None
+                if filename is not None and options.merge_strategy == "patch":
+                    existing = self._read_shard(filename)
+                    if existing is not None:
+                        report = patch_element(existing, element)
+                        if not report.changed:
+                            results.append(MergeResult.from_patch(identifier, "skipped", report))
+                            continue
+                        element = existing
+                elif filename is not None and options.merge_strategy == "replace_or_append":
+                    existing = self._read_shard(filename)
+                    if existing is not None and (
+                        canonical_fingerprint(existing) == canonical_fingerprint(element)
+                    ):
+                        results.append(MergeResult(identifier=identifier, action="skipped"))
+                        continue
+
+                self._hoist_to_skeleton(element)
+                _indent_like_siblings(element, state)
+                if filename is None:
+                    filename = manifest[identifier] = shard_filename(identifier)
+                    new_lines.append(_manifest_line(identifier, filename))
+                    action = "created"
+                else:
+                    action = "updated"
+                self.shards_path.mkdir(parents=True, exist_ok=True)
+                self.formatter.write_bytes(
+                    self._shard_lead(filename) + self.formatter.format_element_bytes(element),
+                    str(self.shards_path / filename)
+                )
+                if report is not None:
+                    results.append(MergeResult.from_patch(identifier, action, report))
+                else:
+                    results.append(MergeResult(identifier=identifier, action=action))
+
+            if new_lines:
+                with open(self.manifest_path, "ab") as f:
+                    f.write("".join(new_lines).encode("utf-8"))
+                self._manifest_identity = FileIdentity.of(self.manifest_path)
+            if any(r.action != "skipped" for r in results):
+                state["revision"] += 1
+                self._save_state(state)
+            return results
+
+    def materialize(self, force: bool = False) -> bool:
+        """
+        把骨架和全部分片按清单顺序流式写回目标文件
+
+        分片自上次物化后没有变化、且目标文件未被外部修改时跳过。
+
+        Args:
+            force: 是否强制重新生成
+
+        Returns:
+            是否写入了目标文件（未建立分片目录或无需更新时返回 False）
+        """
+        with self._lock, self._file_lock():
+            if not self.initialized:
+                return False
+            state = self._load_state()
+            identity = FileIdentity.of(self.target_path)
+            if (
+                not force
+                and state["materialized_revision"] == state["revision"]
+                and identity is not None
+                and list(identity) == state.get("target_identity")
+            ):
+                return False
+
+            manifest = self._load_manifest()
+            self.formatter.write_chunks(self._iter_document(manifest), str(self.target_path))
+
+            state["materialized_revision"] = state["revision"]
+            state["target_identity"] = list(FileIdentity.of(self.target_path) or ())
+            self._save_state(state)
+            logger.info(f"已物化 {self.target_path}: {len(manifest)} 个分片")
+            return True
+
+    def replace_element(
+        self,
+        xpath: str,
+        new_element: etree._Element,
+        namespace_map: Optional[dict] = None
+    ) -> bool:
+        """
+        替换父容器内的元素（或其后代），只重写所在的分片
+
+        在内存中组装完整文档定位目标元素，再把目标所在的父容器子元素写回它的分片。
+
+        Args:
+            xpath: 目标元素 XPath
+            new_element: 新元素
+            namespace_map: 命名空间映射
+
+        Returns:
+            是否成功替换（未找到目标元素时返回 False）
+
+        Raises:
+            XmlMergeError: 分片目录未建立、目标不在父容器内或替换后元素标识发生变化
+        """
+        with self._lock, self._file_lock():
+            if not self.initialized:
+                raise XmlMergeError(f"分片目录未建立: {self.shard_dir}")
+            state = self._load_state()
+            manifest = self._load_manifest()
+
+            parser = get_parser(remove_blank_text=False, remove_comments=False)
+            root = etree.fromstring(b"".join(self._iter_document(manifest)), parser)
+            target = self.parser.find_element(root, xpath, namespace_map)
+            if target is None:
+                return False
+            container = self.parser.find_element(root, state["parent_xpath"])
+
+            # 目标所在的父容器子元素；清单顺序与父容器中元素的顺序一致
+            top = target
+            while top is not None and top.getparent() is not container:
+                top = top.getparent()
+            if top is None or container is None:
+                raise XmlMergeError(f"分片存储只能替换 {state['parent_xpath']} 内的元素: {xpath}")
+            position = sum(1 for node in top.itersiblings(preceding=True) if isinstance(node.tag, str))
+            identifier, filename = list(manifest.items())[position]
+
+            target.getparent().replace(target, new_element)
+            if target is top:
+                top = new_element
+                if identifier not in (new_element.get(attr) for attr in DEFAULT_IDENTIFIER_ATTRS):
+                    raise XmlMergeError(f"替换后元素标识发生变化，请使用合并: {identifier}")
+
+            self._hoist_to_skeleton(top)
+            self.formatter.write_bytes(
+                self._shard_lead(filename) + self.formatter.format_element_bytes(top),
+                str(self.shards_path / filename)
+            )
+            state["revision"] += 1
+            self._save_state(state)
+            return True
+
+    def identifiers(self) -> List[str]:
+        """
+        按清单顺序返回全部元素标识
+
+        Returns:
+            标识列表
+        """
+        with self._lock:
+            return list(self._load_manifest())
+
+    def read_element(self, identifier: str) -> Optional[etree._Element]:
+        """
+        读取单个元素的分片
+
+        Args:
+            identifier: 元素标识
+
+        Returns:
+            元素，不存在返回 None
+        """
+        with self._lock:
+            filename = self._load_manifest().get(identifier)
+        return self._read_shard(filename) if filename is not None else None
+
+    def _iter_document(self, manifest: Dict[str, str]) -> Iterator[bytes]:
+        """逐块产生完整文档：骨架前半部分、各分片、骨架后半部分"""
+        skeleton = self.skeleton_path.read_bytes()
+        prefix, sep, suffix = skeleton.partition(_MARKER_BYTES)
+        if not sep:
+            raise XmlMergeError(f"骨架文件缺少占位注释: {self.skeleton_path}")
+
+        root_ns = set(etree.fromstring(skeleton).nsmap.items())
+        # 父容器开始标签之后的空白即子元素之间的缩进
+        separator = prefix[prefix.rfind(b">") + 1:]
+
+        yield prefix
+        for i, filename in enumerate(manifest.values()):
+            if i:
+                yield separator
+            data = (self.shards_path / filename).read_bytes().rstrip()
+            yield _strip_root_declarations(data, root_ns)
+        yield suffix
+
+    def _shard_lead(self, filename: str) -> bytes:
+        """分片中元素之前的注释/处理指令（更新元素时保留）"""
+        try:
+            data = (self.shards_path / filename).read_bytes()
+        except FileNotFoundError:
+            return b""
+        return data[:_LEADING_MISC.match(data).end()]
+
+    def _read_shard(self, filename: str) -> Optional[etree._Element]:
+        path = self.shards_path / filename
+        if not path.exists():
+            return None
+        return self.parser.parse_file(str(path)).getroot()
+
+    def _hoist_to_skeleton(self, element: etree._Element) -> None:
+        """元素使用了骨架根节点没有声明的前缀时，把声明加到骨架根节点"""
+        skeleton = self.parser.parse_file(str(self.skeleton_path))
+        root = skeleton.getroot()
+        new_ns = {
+            prefix: uri
+            for node in element.iter(etree.Element)
+            for prefix, uri in node.nsmap.items()
+            if prefix is not None and prefix not in root.nsmap
+        }
+        if not new_ns:
+            return
+        # 骨架中没有元素使用这些前缀（cleanup_namespaces 会把它们清理掉），
+        # 因此用带新声明的根节点替换原根节点
+        new_root = etree.Element(root.tag, attrib=dict(root.attrib), nsmap={**root.nsmap, **new_ns})
+        new_root.text = root.text
+        new_root.extend(list(root))
+        skeleton._setroot(new_root)
+        self.formatter.write_bytes(
+            etree.tostring(skeleton, encoding=self.formatter.encoding, xml_declaration=True),
+            str(self.skeleton_path)
+        )
+
+    def _load_manifest(self) -> Dict[str, str]:
+        identity = FileIdentity.of(self.manifest_path)
+        if identity is not None and identity == self._manifest_identity:
+            return self._manifest
+
+        manifest: Dict[str, str] = {}
+        if identity is not None:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        manifest[entry["id"]] = entry["file"]
+        self._manifest = manifest
+        self._manifest_identity = identity
+        return manifest
+
+    def _load_state(self) -> dict:
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self, state: dict) -> None:
+        self.formatter.write_bytes(
+            json.dumps(state, ensure_ascii=False).encode("utf-8"),
+            str(self.state_path)
+        )
+
+
+def _identifier(element: etree._Element, matcher_attr: Optional[str]) -> Optional[str]:
+    """获取元素标识（规则与 XmlMerger 相同）"""
+    if matcher_attr:
+        return element.get(matcher_attr)
+    for attr in DEFAULT_IDENTIFIER_ATTRS:
+        value = element.get(attr)
+        if value:
+            return value
+    return None
+
+
+def _indent_like_siblings(element: etree._Element, state: dict) -> None:
+    """按拆分时记录的缩进重排新分片，使物化后的文件与原有元素对齐"""
+    spaces = state.get("indent", "").lstrip("\r\n")
+    level = state.get("level", 0)
+    if not spaces or level <= 0 or len(spaces) % level:
+        return
+    etree.indent(element, space=spaces[:len(spaces) // level], level=level)
+
+
+def _manifest_line(identifier: str, filename: str) -> str:
+    return json.dumps({"id": identifier, "file": filename}, ensure_ascii=False) + "\n"
+
+
+def _strip_root_declarations(data: bytes, root_ns: set) -> bytes:
+    """去掉分片开始标签上与骨架根节点相同的命名空间声明"""
+    lead = _LEADING_MISC.match(data).end()
+    if lead:
+        return data[:lead] + _strip_root_declarations(data[lead:], root_ns)
+    match = _LEADING_NS_DECLS.match(data)
+    if match is None:
+        return data
+
+    kept = []
+    for decl in _NS_DECL.finditer(data, len(match.group(1)), match.end()):
+        prefix = decl.group(1).decode() if decl.group(1) is not None else None
+        uri = decl.group(0).split(b"=", 1)[1][1:-1].decode()
+        if (prefix, uri) not in root_ns:
+            kept.append(decl.group(0))
+    return match.group(1) + b"".join(kept) + data[match.end():]
@@ -0,0 +1,185 @@
+"""增量写入：父容器子节点的字节偏移"""
+
+import logging
+import xml.parsers.expat
+from typing import Callable, List, Optional, Tuple
+from lxml import etree
+
+from .cache import FileIdentity
+
+
+logger = logging.getLogger(__name__)
+
+# 一个拼接片段：用 data 替换文件中 [start, end) 的字节
+Edit = Tuple[int, int, bytes]
+
+
+def _node_path(element: etree._Element) -> List[int]:
+    """元素从根元素开始的子节点下标路径（下标计入注释和处理指令，与 parent[i] 一致）"""
+    path = []
+    while True:
+        parent = element.getparent()
+        if parent is None:
+            break
+        path.append(parent.index(element))
+        element = parent
+    path.reverse()
+    return path
+
+
+class ContainerLayout:
+    """
+    父容器直接子节点在文件中的字节偏移
+
+    starts[i] 是容器第 i 个子节点（元素、注释或处理指令，与 lxml 的 parent[i]
+    一一对应）的起始偏移。子节点的区间为 [starts[i], starts[i + 1])，包含其 tail；
+    最后一个子节点的区间止于 close，即容器结束标签 `</...>` 的起始偏移。
+    这样替换一个子节点只需把它的区间换成 tostring(新元素, with_tail=True)，
+    追加子节点只需在 close 处插入，结果与整树序列化一致。
+    """
+
+    __slots__ = ("parent", "starts", "close", "identity")
+
+    def __init__(
+        self,
+        parent: etree._Element,
+        starts: List[int],
+        close: int,
+        identity: Optional[FileIdentity]
+    ):
+        self.parent = parent
+        self.starts = starts
+        self.close = close
+        # 偏移对应的文件身份，文件被其他写入者修改后偏移失效
+        self.identity = identity
+
+    @classmethod
+    def scan(
+        cls,
+        data: bytes,
+        parent: etree._Element,
+        identity: Optional[FileIdentity] = None,
+        count: Optional[int] = None
+    ) -> Optional["ContainerLayout"]:
+        """
+        用 expat 扫描文件内容，记录父容器各子节点的起始偏移
+
+        父容器按它在解析树中的子节点下标路径定位，不依赖标签名和命名空间前缀。
+
+        Args:
+            data: 文件内容（与 parent 所在的解析树对应）
+            parent: 父容器元素
+            identity: data 对应的文件身份
+            count: 文件中容器应有的子节点数，默认为 len(parent)
+                  （容器在扫描前已追加了子节点时需要传入）
+
+        Returns:
+            ContainerLayout；文件无法被 expat 解析（如编码不受支持）、
+            容器是自闭合标签或子节点数与预期不一致时返回 None
+        """
+        target = _node_path(parent)
+        parser = xml.parsers.expat.ParserCreate()
+
+        # 当前元素路径（子节点下标）与每一层已出现的子节点数
+        path: List[int] = []
+        counts: List[int] = [0]
+        starts: List[int] = []
+        close: List[int] = []
+        # 根元素之外的节点（XML 声明后的注释等）不属于任何容器
+        depth = [0]
+
+        def child_node() -> None:
+            if path == target:
+                starts.append(parser.CurrentByteIndex)
+            counts[-1] += 1
+
+        def start_element(name, attrs) -> None:
+            if depth[0] > 0:
+                child_node()
+                path.append(counts[-1] - 1)
+            depth[0] += 1
+            counts.append(0)
+
+        def end_element(name) -> None:
+            if path == target and not close:
+                close.append(parser.CurrentByteIndex)
+            depth[0] -= 1
+            counts.pop()
+            if path:
+                path.pop()
+
+        def other_node(*args) -> None:
+            if depth[0] > 0:
+                child_node()
+
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.CommentHandler = other_node
+        parser.ProcessingInstructionHandler = other_node
+
+        try:
+            parser.Parse(data, True)
+        except (xml.parsers.expat.ExpatError, ValueError, LookupError) as e:
+            logger.debug(f"无法建立字节偏移索引: {e}")
+            return None
+
+        # 自闭合容器 `<entities/>` 没有结束标签可供插入
+        if not close or not data.startswith(b"</", close[0]):
+            return None
+        if len(starts) != (len(parent) if count is None else count):
+            return None
+        return cls(parent, starts, close[0], identity)
+
+    def splice(
+        self,
+        changed: List[etree._Element],
+        serialize: Callable[[etree._Element], bytes]
+    ) -> List[Edit]:
+        """
+        计算拼接片段，并把偏移更新为拼接后的位置
+
+        调用时父容器已经完成合并：被替换的子节点位于原下标，
+        追加的子节点位于索引记录的子节点之后。
+
+        Args:
+            changed: 本次替换或追加的元素
+            serialize: 序列化单个子节点（包含 tail）的函数
+
+        Returns:
+            按偏移升序排列的拼接片段
+        """
+        parent = self.parent
+        count = len(self.starts)
+
+        positions = set()
+        for element in changed:
+            if element.getparent() is parent:
+                position = parent.index(element)
+                if position < count:
+                    positions.add(position)
+        positions = sorted(positions)
+
+        edits: List[Edit] = []
+        for position in positions:
+            end = self.starts[position + 1] if position + 1 < count else self.close
+            edits.append((self.starts[position], end, serialize(parent[position])))
+
+        # 依次平移每个被替换子节点之后（直到下一个被替换子节点）的起始偏移
+        shift = 0
+        for k, position in enumerate(positions):
+            start, end, data = edits[k]
+            shift += len(data) - (end - start)
+            stop = positions[k + 1] + 1 if k + 1 < len(positions) else count
+            for i in range(position + 1, stop):
+                self.starts[i] += shift
+
+        offset = self.close + shift
+        appended = [serialize(element) for element in parent[count:]]
+        for data in appended:
+            self.starts.append(offset)
+            offset += len(data)
+        if appended:
+            edits.append((self.close, self.close, b"".join(appended)))
+        self.close = offset
+
+        return edits
@@ -0,0 +1,235 @@
+"""XML 流式读取器"""
+
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+from lxml import etree
+
+from .namespace import NamespaceHandler
+from .exceptions import XmlParseError, XmlFileNotFoundError
+
+
+# 简单路径的一个步骤：(是否后代轴, 标签名)
+_Step = Tuple[bool, str]
+
+_UNSUPPORTED_PATH = re.compile(r"[\[\]@*()|=]")
+
+
+def compile_simple_path(xpath: str) -> List[_Step]:
+    """
+    将简单的相对路径编译为步骤列表
+
+    支持 `.//entities`、`./orm/entities`、`entities/entity` 等只由标签名和
+    `/`、`//` 组成的相对路径（与 root.find 一样以根元素为上下文）。
+
+    Args:
+        xpath: 路径表达式
+
+    Returns:
+        步骤列表
+
+    Raises:
+        XmlParseError: 路径包含谓词、通配符等流式读取不支持的语法
+    """
+    path = xpath.strip()
+    if not path or path.startswith("/") or _UNSUPPORTED_PATH.search(path):
+        raise XmlParseError(f"流式读取仅支持简单的相对路径: {xpath}")
+
+    if path.startswith("./"):
+        path = path[1:]
+    elif path == ".":
+        return []
+    else:
+        path = "/" + path
+
+    steps = []
+    for part in re.split(r"(//|/)", path)[1:]:
+        if part in ("/", "//"):
+            descendant = part == "//"
+            continue
+        if not part or part == ".":
+            raise XmlParseError(f"流式读取仅支持简单的相对路径: {xpath}")
+        steps.append((descendant, part))
+    return steps
+
+
+def _match_path(steps: List[_Step], tags: List[str]) -> bool:
+    """判断根元素下的标签路径 tags 是否匹配 steps（最后一步必须落在最后一个标签上）"""
+    def match(si: int, ti: int) -> bool:
+        if si == len(steps):
+            return ti == len(tags)
+        descendant, tag = steps[si]
+        if descendant:
+            return any(
+                tags[j] == tag and match(si + 1, j + 1)
+                for j in range(ti, len(tags))
+            )
+        return ti < len(tags) and tags[ti] == tag and match(si + 1, ti + 1)
+
+    return match(0, 0)
+
+
+class XmlStreamReader:
+    """
+    基于 etree.iterparse 的流式读取器
+
+    逐个产出父容器下的目标元素，并在处理后清理已经读过的兄弟节点，
+    内存占用与文件大小无关（只与单个元素大小有关）。适用于只读的遍历与查找。
+    """
+
+    def __init__(self, recover: bool = True):
+        """
+        初始化流式读取器
+
+        Args:
+            recover: 是否使用 recover 模式（与 XmlParser.parse_file 一致）
+        """
+        self.recover = recover
+
+    def iter_elements(
+        self,
+        file_path: str,
+        parent_xpath: str,
+        tag: str,
+        namespace_map: Optional[dict] = None
+    ) -> Iterator[etree._Element]:
+        """
+        流式遍历父容器下的直接子元素
+
+        产出的元素只在下一次迭代前有效（之后会被清理），需要保留时请自行 deepcopy。
+
+        Args:
+            file_path: XML 文件路径
+            parent_xpath: 父容器路径（简单相对路径，如 `.//entities`）
+            tag: 子元素标签名，可带命名空间前缀
+            namespace_map: 命名空间映射，未提供的前缀依次从文档声明和默认映射中解析
+
+        Yields:
+            匹配的子元素
+
+        Raises:
+            XmlFileNotFoundError: 文件不存在
+            XmlParseError: 路径不受支持或解析失败
+        """
+        steps = compile_simple_path(parent_xpath)
+        # 文档根元素上声明的命名空间
+        doc_ns: Dict[str, str] = {}
+
+        try:
+            source = open(file_path, "rb")
+        except FileNotFoundError:
+            raise XmlFileNotFoundError(f"文件不存在: {file_path}")
+
+        with source:
+            context = etree.iterparse(
+                source,
+                events=("start", "end", "start-ns"),
+                recover=self.recover,
+                remove_blank_text=False
+            )
+
+            resolved_steps: Optional[List[_Step]] = None
+            resolved_tag: Optional[str] = None
+            # 根元素下的当前标签路径
+            tags: List[str] = []
+            # 当前所在的父容器深度（-1 表示不在父容器内）
+            parent_depth = -1
+            # 当前所在的目标元素深度（-1 表示不在目标元素内）
+            target_depth = -1
+            depth = -1
+
+            try:
+                for event, item in context:
+                    if event == "start-ns":
+                        prefix, uri = item
+                        if prefix and depth < 0:
+                            doc_ns[prefix] = uri
+                        continue
+
+                    if event == "start":
+                        depth += 1
+                        if depth == 0:
+                            # 根元素的命名空间声明已读取，解析路径中的前缀
+                            ns_map = NamespaceHandler.get_default_namespace_map()
+                            ns_map.update(doc_ns)
+                            ns_map.update(namespace_map or {})
+                            resolved_steps = [
+                                (descendant, self._resolve(name, ns_map)) for descendant, name in steps
+                            ]
+                            resolved_tag = self._resolve(tag, ns_map)
+                            if not resolved_steps:
+                                parent_depth = 0
+                            continue
+
+                        tags.append(item.tag)
+                        if parent_depth < 0 and _match_path(resolved_steps, tags):
+                            parent_depth = depth
+                        elif (
+                            target_depth < 0
+                            and parent_depth >= 0
+                            and depth == parent_depth + 1
+                            and item.tag == resolved_tag
+                        ):
+                            target_depth = depth
+                        continue
+
+                    # end 事件
+                    if depth == target_depth:
+                        yield item
+                        target_depth = -1
+                    if depth == parent_depth:
+                        parent_depth = -1
+                    if target_depth < 0 and depth > 0:
+                        self._release(item)
+                    if depth > 0:
+                        tags.pop()
+                    depth -= 1
+            except etree.XMLSyntaxError as e:
+                raise XmlParseError(f"解析文件失败: {e}")
+
+    def find_by_identifier(
+        self,
+        file_path: str,
+        parent_xpath: str,
+        tag: str,
+        identifier: str,
+        matcher_attr: str = "name",
+        namespace_map: Optional[dict] = None
+    ) -> Optional[etree._Element]:
+        """
+        流式查找父容器下指定标识的元素，找到后立即停止读取
+
+        Args:
+            file_path: XML 文件路径
+            parent_xpath: 父容器路径
+            tag: 子元素标签名
+            identifier: 标识值
+            matcher_attr: 匹配属性名
+            namespace_map: 命名空间映射
+
+        Returns:
+            找到的元素，未找到返回 None
+        """
+        for element in self.iter_elements(file_path, parent_xpath, tag, namespace_map):
+            if element.get(matcher_attr) == identifier:
+                return element
+        return None
+
+    @staticmethod
+    def _resolve(name: str, ns_map: Dict[str, str]) -> str:
+        """将 `prefix:local` 解析为 `{uri}local`"""
+        if name.startswith("{") or ":" not in name:
+            return name
+        prefix, local = name.split(":", 1)
+        uri = ns_map.get(prefix)
+        if uri is None:
+            raise XmlParseError(f"未知的命名空间前缀: {prefix}")
+        return f"{{{uri}}}{local}"
+
+    @staticmethod
+    def _release(element: etree._Element) -> None:
+        """清理已处理完的元素及其之前的兄弟节点"""
+        element.clear(keep_tail=True)
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
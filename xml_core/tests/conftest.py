@@ -0,0 +1,25 @@
+"""xml_core 测试共用的 fixture"""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def temp_orm_file(tmp_path):
+    """创建临时 ORM 文件（空的 entities 容器）"""
+    temp_file = tmp_path / "app.orm.xml"
+    shutil.copy(FIXTURES_DIR / "sample_orm.xml", temp_file)
+    return temp_file
+
+
+@pytest.fixture
+def temp_orm_file_with_entity(tmp_path):
+    """创建包含一个 entity 的临时 ORM 文件"""
+    temp_file = tmp_path / "app.orm.xml"
+    shutil.copy(FIXTURES_DIR / "sample_orm_with_entity.xml", temp_file)
+    return temp_file
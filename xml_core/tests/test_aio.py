@@ -0,0 +1,93 @@
+"""异步封装测试用例"""
+
+import asyncio
+import time
+
+import pytest
+from lxml import etree
+
+from xml_core import AsyncXmlCore, DocumentCache, XmlCore
+from xml_core.benchmarks.corpus import entity_xml, write_corpus
+
+
+@pytest.fixture
+def large_orm_file(tmp_path):
+    """创建包含 20000 个实体的 ORM 文件"""
+    return write_corpus(tmp_path / "app.orm.xml", 20000)
+
+
+async def _max_tick_gap(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """周期性休眠，返回两次唤醒之间的最大间隔（秒）"""
+    max_gap = 0.0
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        max_gap = max(max_gap, now - last)
+        last = now
+    return max_gap
+
+
+class TestAsyncXmlCore:
+    """测试 AsyncXmlCore"""
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive(self, large_orm_file):
+        """测试大文件合并期间事件循环仍能及时调度其他协程"""
+        core = AsyncXmlCore(XmlCore(str(large_orm_file)))
+        stop = asyncio.Event()
+        ticker = asyncio.create_task(_max_tick_gap(stop))
+
+        start = time.perf_counter()
+        result = await core.merge_entity(entity_xml("Async", indent=""))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        max_gap = await ticker
+
+        assert result.action == "created"
+        # 同步执行时整个合并期间事件循环都无法调度，间隔至少等于合并耗时；
+        # 放到线程池后只剩 lxml 持有 GIL 的单次调用（序列化等）会造成短暂停顿
+        assert max_gap < elapsed / 4
+
+    @pytest.mark.asyncio
+    async def test_writes_keep_call_order(self, tmp_path):
+        """测试同一文件的并发写入按调用顺序执行"""
+        orm_file = write_corpus(tmp_path / "app.orm.xml", 10)
+        core = AsyncXmlCore(XmlCore(str(orm_file)))
+
+        updates = [
+            entity_xml("E1", indent="").replace('displayName="实体E1"', f'displayName="v{i}"')
+            for i in range(8)
+        ]
+        results = await asyncio.gather(*(core.merge_entity(xml) for xml in updates))
+
+        assert [r.action for r in results] == ["updated"] * 8
+        entity = etree.parse(str(orm_file)).getroot().find(".//entity[@name='bench.dao.entity.E1']")
+        assert entity.get("displayName") == "v7"
+
+    @pytest.mark.asyncio
+    async def test_shared_wraps_shared_core(self, tmp_path):
+        """测试 shared() 复用同一文件的 XmlCore 实例"""
+        orm_file = write_corpus(tmp_path / "app.orm.xml", 1)
+        try:
+            first = AsyncXmlCore.shared(str(orm_file))
+            second = AsyncXmlCore.shared(str(orm_file))
+            assert first.core is second.core
+            assert (await first.merge_entity(entity_xml("E0", indent=""))).action == "skipped"
+        finally:
+            XmlCore.clear_shared()
+
+    @pytest.mark.asyncio
+    async def test_query_miss_waits_for_merge(self, tmp_path):
+        """测试查询未命中时排在进行中的合并之后，并看到合并结果"""
+        orm_file = write_corpus(tmp_path / "app.orm.xml", 10)
+        core = AsyncXmlCore(XmlCore(str(orm_file), cache=DocumentCache()))
+        xpath = ".//entity[@name='bench.dao.entity.E1']"
+        update = entity_xml("E1", indent="").replace('displayName="实体E1"', 'displayName="merged"')
+
+        merge = asyncio.ensure_future(core.merge_entity(update))
+        await asyncio.sleep(0)
+        query = await core.query_element(xpath)
+        await merge
+
+        assert 'displayName="merged"' in query
@@ -0,0 +1,37 @@
+"""基准套件冒烟测试"""
+
+import json
+
+from lxml import etree
+
+from xml_core.benchmarks import suite
+from xml_core.benchmarks.corpus import COLUMNS, write_corpus
+
+
+class TestBenchmarkSuite:
+    """测试基准套件可以运行并输出完整结果"""
+
+    def test_corpus_shape(self, tmp_path):
+        """测试合成语料结构与 ORM 模板一致"""
+        corpus = write_corpus(tmp_path / "app.orm.xml", 3)
+        root = etree.parse(str(corpus)).getroot()
+
+        entities = root.find("entities")
+        assert len(entities) == 3
+        assert len(entities[0].find("columns")) == len(COLUMNS)
+        assert set(root.nsmap) == {"ext", "i18n-en", "ui", "x"}
+
+    def test_report_json(self, tmp_path):
+        """测试结果 JSON 包含每个操作的 p50/p95 和峰值内存"""
+        output = tmp_path / "bench.json"
+        suite.main(["--sizes", "10", "--repeat", "2", "--output", str(output)])
+
+        report = json.loads(output.read_text(encoding="utf-8"))
+        result = report["results"]["10"]
+        assert report["meta"]["repeat"] == 2
+        assert set(result["operations"]) == set(suite.OPERATIONS)
+        for stats in result["operations"].values():
+            assert stats["n"] == 2
+            assert stats["p50_ms"] <= stats["p95_ms"]
+        assert "peak_rss_kb" in result
+
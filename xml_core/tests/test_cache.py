@@ -0,0 +1,75 @@
+"""文档缓存测试用例"""
+
+import os
+import shutil
+
+from lxml import etree
+
+from xml_core import XmlCore
+from xml_core.cache import DocumentCache
+
+
+def _entity(name: str) -> str:
+    return f'<entity name="{name}" tableName="t_{name.lower()}"><columns/></entity>'
+
+
+class TestDocumentCache:
+    """测试文档缓存"""
+
+    def test_merge_reuses_cached_tree(self, temp_orm_file):
+        """测试连续合并复用缓存的解析树"""
+        cache = DocumentCache()
+        core = XmlCore(str(temp_orm_file), cache=cache)
+
+        core.merge_entity(_entity("A"))
+        core.merge_entity(_entity("B"))
+        core.merge_entity(_entity("A"))
+
+        stats = cache.stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 2
+
+        entities = etree.parse(str(temp_orm_file)).getroot().find(".//entities")
+        assert [e.get("name") for e in entities.findall("entity")] == ["A", "B"]
+
+    def test_external_change_invalidates(self, temp_orm_file):
+        """测试文件被外部修改后缓存失效"""
+        cache = DocumentCache()
+        core = XmlCore(str(temp_orm_file), cache=cache)
+        core.merge_entity(_entity("A"))
+
+        # 模拟其他进程重写文件
+        content = temp_orm_file.read_text(encoding="utf-8")
+        temp_orm_file.write_text(content.replace('name="A"', 'name="Z"'), encoding="utf-8")
+        st = os.stat(temp_orm_file)
+        os.utime(temp_orm_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+        assert cache.get(temp_orm_file) is None
+        assert core.find_element('.//entity').get("name") == "Z"
+
+    def test_evict_by_entry_count(self, temp_orm_file):
+        """测试按条目数淘汰最久未使用的文档"""
+        cache = DocumentCache(max_entries=2)
+        paths = []
+        for i in range(3):
+            path = temp_orm_file.with_name(f"app{i}.orm.xml")
+            shutil.copy(temp_orm_file, path)
+            paths.append(path)
+            cache.put(path, etree.parse(str(path)))
+
+        assert len(cache) == 2
+        assert paths[0] not in cache
+        assert paths[2] in cache
+        assert cache.stats()["evictions"] == 1
+
+    def test_evict_by_bytes(self, temp_orm_file):
+        """测试按近似字节数淘汰"""
+        size = os.path.getsize(temp_orm_file)
+        cache = DocumentCache(max_bytes=size * 2)
+        for i in range(3):
+            path = temp_orm_file.with_name(f"app{i}.orm.xml")
+            shutil.copy(temp_orm_file, path)
+            cache.put(path, etree.parse(str(path)))
+
+        assert len(cache) == 2
+        assert cache.stats()["bytes"] <= size * 2
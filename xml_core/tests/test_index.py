@@ -0,0 +1,75 @@
+"""元素标识索引测试用例"""
+
+
+import pytest
+from lxml import etree
+
+from xml_core import XmlCore, DocumentCache, XmlDuplicateIdentifierError
+from xml_core.index import IdentifierIndex, IndexStore
+
+
+class TestIdentifierIndex:
+    """测试标识索引"""
+
+    def test_lookup_and_duplicates(self):
+        """测试索引查找与重复标识报告"""
+        parent = etree.fromstring(
+            '<entities><entity name="A"/><entity name="B"/><entity name="A"/><other name="C"/></entities>'
+        )
+        index = IdentifierIndex(parent, "entity", "name")
+
+        assert index.get("B")[0].get("name") == "B"
+        assert index.get("C") == []
+        assert index.duplicates == {"A": 2}
+
+    def test_store_tracks_append_and_replace(self):
+        """测试索引随追加/替换增量更新"""
+        parent = etree.fromstring('<entities><entity name="A" v="1"/></entities>')
+        store = IndexStore()
+        index = store.index_for(parent, "entity", None)
+        assert index.attr == "name"
+
+        new_a = etree.Element("entity", name="A", v="2")
+        old_a = index.get("A")[0]
+        parent.replace(old_a, new_a)
+        store.on_replace(parent, old_a, new_a)
+
+        b = etree.SubElement(parent, "entity", name="B")
+        store.on_append(parent, b)
+
+        assert store.index_for(parent, "entity", None) is index
+        assert index.get("A")[0].get("v") == "2"
+        assert index.get("B") == [b]
+
+
+class TestMergeWithIndex:
+    """测试合并时使用索引"""
+
+    def test_duplicate_identifier_is_reported(self, temp_orm_file):
+        """测试替换重复标识时报错且不修改文件"""
+        core = XmlCore(str(temp_orm_file))
+        core.merge_element('<entity name="A"/>', ".//entities", "name", merge_strategy="always_append")
+        core.merge_element('<entity name="A"/>', ".//entities", "name", merge_strategy="always_append")
+        before = temp_orm_file.read_bytes()
+
+        with pytest.raises(XmlDuplicateIdentifierError):
+            core.merge_entity('<entity name="A" tableName="t_a"/>')
+
+        assert temp_orm_file.read_bytes() == before
+
+    def test_index_reused_with_cache(self, temp_orm_file):
+        """测试启用缓存时索引只构建一次"""
+        cache = DocumentCache()
+        core = XmlCore(str(temp_orm_file), cache=cache)
+
+        core.merge_entities([f'<entity name="E{i}"/>' for i in range(5)])
+        store = cache.state(temp_orm_file)["indexes"]
+        entities = core.find_element(".//entities")
+        index = store.index_for(entities, "entity", "name")
+
+        result = core.merge_entity('<entity name="E3" tableName="t_e3"/>')
+
+        assert result.action == "updated"
+        assert cache.state(temp_orm_file)["indexes"] is store
+        assert store.index_for(entities, "entity", "name") is index
+        assert index.get("E3")[0].get("tableName") == "t_e3"
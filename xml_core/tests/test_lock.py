@@ -0,0 +1,134 @@
+"""文件锁与组提交测试用例"""
+
+import multiprocessing
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from xml_core import XmlCore, FileLock, XmlLockError
+
+
+def _entity_names(path: Path) -> set:
+    entities = etree.parse(str(path)).getroot().find(".//entities")
+    return {e.get("name") for e in entities.findall("entity")}
+
+
+def _merge_worker(path: str, worker: int, count: int) -> None:
+    core = XmlCore(path)
+    for i in range(count):
+        core.merge_entity(f'<entity name="W{worker}_{i}"/>')
+
+
+class TestFileLock:
+    """测试跨进程文件锁"""
+
+    def test_lock_timeout(self, temp_orm_file):
+        """测试锁被占用时超时报错"""
+        with FileLock(str(temp_orm_file)):
+            with pytest.raises(XmlLockError):
+                FileLock(str(temp_orm_file), timeout=0.1).acquire()
+
+        # 释放后可以再次获取
+        with FileLock(str(temp_orm_file), timeout=0.1) as lock:
+            assert lock.locked
+
+    def test_concurrent_processes_do_not_lose_updates(self, temp_orm_file):
+        """测试多进程并发合并不丢失更新"""
+        ctx = multiprocessing.get_context("spawn")
+        processes = [
+            ctx.Process(target=_merge_worker, args=(str(temp_orm_file), worker, 10))
+            for worker in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=60)
+            assert process.exitcode == 0
+
+        expected = {f"W{worker}_{i}" for worker in range(4) for i in range(10)}
+        assert _entity_names(temp_orm_file) == expected
+
+
+class TestGroupCommit:
+    """测试组提交"""
+
+    def test_concurrent_merges_share_writes(self, temp_orm_file):
+        """测试写入进行中到达的合并在下一轮统一提交"""
+        core = XmlCore(str(temp_orm_file), group_commit=True)
+
+        writes = []
+        original_write = core.merger.formatter.write_tree
+
+        def slow_write(*args, **kwargs):
+            writes.append(1)
+            time.sleep(0.05)
+            return original_write(*args, **kwargs)
+
+        core.merger.formatter.write_tree = slow_write
+
+        results = {}
+
+        def merge(i):
+            results[i] = core.merge_entity(f'<entity name="G{i}"/>')
+
+        threads = [threading.Thread(target=merge, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert {r.identifier for r in results.values()} == {f"G{i}" for i in range(20)}
+        assert all(r.action == "created" for r in results.values())
+        assert _entity_names(temp_orm_file) == {f"G{i}" for i in range(20)}
+        assert len(writes) < 20
+
+    def test_failed_request_does_not_affect_others(self, temp_orm_file):
+        """测试组内单个请求失败只影响该请求"""
+        core = XmlCore(str(temp_orm_file), group_commit=True)
+        core.merge_element('<entity name="D"/>', ".//entities", "name", merge_strategy="always_append")
+        core.merge_element('<entity name="D"/>', ".//entities", "name", merge_strategy="always_append")
+
+        from xml_core.merger import _PendingMerge
+        from xml_core.settings import MergeOptions
+
+        options = MergeOptions(parent_xpath=".//entities", element_matcher="name")
+        parser = core.merger.parser
+        ok = _PendingMerge([(parser.parse_fragment('<entity name="OK"/>'), "OK")], options)
+        dup = _PendingMerge([(parser.parse_fragment('<entity name="D"/>'), "D")], options)
+        core.merger._commit([dup, ok])
+
+        assert dup.error is not None
+        assert ok.error is None
+        assert ok.results[0].action == "created"
+        assert "OK" in _entity_names(temp_orm_file)
+
+    def test_strip_ns_option_not_shared_across_requests(self, temp_orm_file):
+        """测试组内各请求的 strip_ns_on_children 互不影响（取值不同的请求分开写回）"""
+        from xml_core.merger import _PendingMerge, _commit_queue
+        from xml_core.settings import MergeOptions
+
+        core = XmlCore(str(temp_orm_file), group_commit=True)
+        merger = core.merger
+        writes = []
+        original_write = merger._write_tree
+
+        def record_write(tree, strip_child_ns=True, **kwargs):
+            writes.append((sorted(e.get("name") for e in kwargs["inserted"]), strip_child_ns))
+            return original_write(tree, strip_child_ns=strip_child_ns, **kwargs)
+
+        merger._write_tree = record_write
+
+        options = MergeOptions(parent_xpath=".//entities", element_matcher="name", strip_ns_on_children=False)
+        kept = merger.parser.parse_fragment('<entity name="P" ext:label="p" xmlns:ext="urn:ext"/>')
+        queued = _PendingMerge([(kept, "P")], options)
+        # 排在写入者自己的请求之前，两者在同一轮取出
+        _commit_queue(merger.xml_path).pending.append(queued)
+        core.merge_element('<entity name="L"/>', ".//entities", "name")
+
+        assert queued.error is None
+        assert queued.results[0].action == "created"
+        assert writes == [(["P"], False), (["L"], True)]
+        assert _entity_names(temp_orm_file) == {"P", "L"}
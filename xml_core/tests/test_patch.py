@@ -0,0 +1,135 @@
+"""patch 合并策略测试用例"""
+
+import shutil
+from pathlib import Path
+
+from lxml import etree
+
+from xml_core import XmlCore
+from xml_core.cache import DocumentCache
+from xml_core.patch import patch_element
+
+
+PRODUCT = "labor.tracking.dao.entity.LtProduct"
+
+DELTA_XML = f'''<entity name="{PRODUCT}" displayName="商品档案">
+    <columns>
+        <column name="productName" precision="500"/>
+        <column name="id" code="ID"/>
+        <column name="price" code="PRICE" propId="6" stdSqlType="DECIMAL" stdDataType="double" displayName="价格"/>
+    </columns>
+</entity>'''
+
+
+def _patch(core: XmlCore, xml: str):
+    return core.merge_element(xml, parent_xpath=".//entities", element_matcher="name", merge_strategy="patch")
+
+
+def _columns(path: Path) -> dict:
+    root = etree.parse(str(path)).getroot()
+    return {c.get("name"): c for c in root.iter("column")}
+
+
+class TestPatchElement:
+    """测试元素级增量合并"""
+
+    def test_attributes_and_keyed_children(self):
+        """测试属性逐个覆盖，子元素按标识匹配，未出现的内容保持不变"""
+        target = etree.fromstring(
+            '<entity name="A" tableName="a"><columns>'
+            '<column name="id" code="ID"/><column name="title" code="TITLE"/>'
+            '</columns><comment>旧</comment></entity>'
+        )
+        delta = etree.fromstring(
+            '<entity name="A" displayName="甲"><columns>'
+            '<column name="title" code="NAME"/><column name="id" code="ID"/><column name="memo"/>'
+            '</columns><comment>新</comment></entity>'
+        )
+
+        report = patch_element(target, delta)
+
+        assert report.added == ["columns/column[@name='memo']"]
+        assert report.updated == ["columns/column[@name='title']", "comment"]
+        assert report.untouched == ["columns/column[@name='id']"]
+        assert target.get("tableName") == "a"
+        assert target.get("displayName") == "甲"
+        assert [c.get("name") for c in target.find("columns")] == ["id", "title", "memo"]
+        assert target.find("comment").text == "新"
+
+    def test_no_change(self):
+        """测试增量与现有内容一致时不修改"""
+        target = etree.fromstring('<entity name="A"><columns><column name="id" code="ID"/></columns></entity>')
+        delta = etree.fromstring('<entity name="A"><columns><column name="id"/></columns></entity>')
+
+        report = patch_element(target, delta)
+
+        assert not report.changed
+        assert report.untouched == ["columns/column[@name='id']"]
+
+
+class TestPatchStrategy:
+    """测试 merge_strategy="patch\""""
+
+    def test_patch_merges_columns(self, temp_orm_file_with_entity):
+        """测试只发送变化的列即可更新实体"""
+        core = XmlCore(str(temp_orm_file_with_entity))
+
+        result = _patch(core, DELTA_XML)
+
+        assert result.action == "updated"
+        assert result.added == ["columns/column[@name='price']"]
+        assert result.updated == ["columns/column[@name='productName']"]
+        assert result.untouched == ["columns/column[@name='id']"]
+
+        columns = _columns(temp_orm_file_with_entity)
+        assert list(columns) == ["id", "productName", "addTime", "updateTime", "deleted", "price"]
+        assert columns["productName"].get("precision") == "500"
+        assert columns["productName"].get("displayName") == "商品名称"
+        entity = etree.parse(str(temp_orm_file_with_entity)).getroot().find(".//entity")
+        assert entity.get("displayName") == "商品档案"
+        assert entity.findtext("comment") == "商品信息"
+        # 新列沿用兄弟元素的缩进
+        assert '\n                <column name="price"' in temp_orm_file_with_entity.read_text(encoding="utf-8")
+
+    def test_patch_without_changes_skipped(self, temp_orm_file_with_entity):
+        """测试没有修改时返回 skipped 且不写文件"""
+        core = XmlCore(str(temp_orm_file_with_entity))
+        before = temp_orm_file_with_entity.read_bytes()
+
+        result = _patch(core, f'<entity name="{PRODUCT}"><columns><column name="id" code="ID"/></columns></entity>')
+
+        assert result.action == "skipped"
+        assert result.untouched == ["columns/column[@name='id']"]
+        assert temp_orm_file_with_entity.read_bytes() == before
+
+    def test_patch_missing_element_created(self, temp_orm_file_with_entity):
+        """测试目标中不存在的元素按整体追加"""
+        core = XmlCore(str(temp_orm_file_with_entity))
+
+        result = _patch(core, '<entity name="New"><columns/></entity>')
+
+        assert result.action == "created"
+        assert result.added == []
+
+    def test_patch_incremental_write_matches_full_write(self, temp_orm_file_with_entity):
+        """测试增量写入与整树写回的结果一致"""
+        full_file = temp_orm_file_with_entity.with_name("full.orm.xml")
+        shutil.copy(temp_orm_file_with_entity, full_file)
+
+        _patch(XmlCore(str(temp_orm_file_with_entity), cache=DocumentCache(), incremental_write=True), DELTA_XML)
+        _patch(XmlCore(str(full_file)), DELTA_XML)
+
+        assert etree.tostring(etree.parse(str(temp_orm_file_with_entity)), method="c14n2") == etree.tostring(
+            etree.parse(str(full_file)), method="c14n2"
+        )
+
+    def test_patch_sharded(self, temp_orm_file_with_entity):
+        """测试分片存储下只修改对应分片"""
+        core = XmlCore(str(temp_orm_file_with_entity), shard_dir=str(temp_orm_file_with_entity.with_suffix(".shards")))
+
+        result = _patch(core, DELTA_XML)
+        core.materialize()
+
+        assert result.action == "updated"
+        assert result.added == ["columns/column[@name='price']"]
+        assert _columns(temp_orm_file_with_entity)["productName"].get("precision") == "500"
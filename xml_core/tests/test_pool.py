@@ -0,0 +1,75 @@
+"""解析器池与共享实例测试用例"""
+
+import threading
+
+import pytest
+
+from xml_core import XmlCore, get_parser, shared_document_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_shared_cores():
+    """每个测试结束后清空共享的 XmlCore 实例"""
+    yield
+    XmlCore.clear_shared()
+
+
+class TestParserPool:
+    """测试线程内复用的解析器"""
+
+    def test_same_options_reuse_parser(self):
+        """测试同一线程内相同选项返回同一个解析器"""
+        assert get_parser() is get_parser()
+        assert get_parser(recover=True) is not get_parser()
+        assert get_parser(remove_blank_text=True) is get_parser(remove_blank_text=True)
+
+    def test_threads_get_own_parser(self):
+        """测试不同线程各自持有解析器"""
+        parsers = []
+        thread = threading.Thread(target=lambda: parsers.append(get_parser()))
+        thread.start()
+        thread.join()
+
+        assert parsers[0] is not get_parser()
+
+    def test_core_components_share_parser(self, temp_orm_file):
+        """测试 XmlCore 与合并器共用同一个 XmlParser"""
+        core = XmlCore(str(temp_orm_file))
+
+        assert core.merger.parser is core.parser
+        assert core.ns_handler is core.parser.ns_handler
+
+
+class TestSharedCore:
+    """测试进程内共享的 XmlCore 实例"""
+
+    def test_same_file_returns_same_instance(self, temp_orm_file):
+        """测试同一文件返回同一个实例"""
+        cache = shared_document_cache()
+        first = XmlCore.shared(str(temp_orm_file), cache=cache)
+        second = XmlCore.shared(str(temp_orm_file.parent / "." / temp_orm_file.name), cache=cache)
+
+        assert first is second
+        assert XmlCore.shared(str(temp_orm_file), encoding="gbk", cache=cache) is not first
+
+    def test_different_options_rejected(self, temp_orm_file):
+        """测试以不同选项获取同一文件的共享实例时报错，而不是返回配置不同的实例"""
+        cache = shared_document_cache()
+        XmlCore.shared(str(temp_orm_file), cache=cache, group_commit=True)
+
+        with pytest.raises(ValueError):
+            XmlCore.shared(str(temp_orm_file), cache=cache)
+        with pytest.raises(ValueError):
+            XmlCore.shared(str(temp_orm_file), cache=cache, group_commit=False)
+
+    def test_shared_instance_merges(self, temp_orm_file):
+        """测试共享实例可连续合并"""
+        core = XmlCore.shared(str(temp_orm_file))
+
+        core.merge_entity('<entity name="Shared1"/>')
+        result = XmlCore.shared(str(temp_orm_file)).merge_entity('<entity name="Shared2"/>')
+
+        assert result.action == "created"
+        content = temp_orm_file.read_text(encoding="utf-8")
+        assert 'name="Shared1"' in content
+        assert 'name="Shared2"' in content
@@ -0,0 +1,121 @@
+"""查询结果缓存测试用例"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from xml_core import AsyncXmlCore, XmlCore
+from xml_core.cache import DocumentCache
+
+
+PRODUCT_XPATH = ".//entities/entity[@name='labor.tracking.dao.entity.LtProduct']"
+
+
+class TestQueryCache:
+    """测试 XmlCore.query_element 的结果缓存"""
+
+    def test_hit_returns_serialized_element(self, temp_orm_file_with_entity):
+        """测试重复查询命中缓存且不再解析文件"""
+        core = XmlCore(str(temp_orm_file_with_entity))
+
+        first = core.query_element(PRODUCT_XPATH)
+        parses = core.parse_stats()["files"]
+        second = core.query_element(PRODUCT_XPATH)
+
+        assert first == second
+        assert first.startswith("<entity")
+        assert core.parse_stats()["files"] == parses
+        stats = core.query_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
+        assert stats["entries"] == 1
+
+    def test_missing_element_cached(self, temp_orm_file_with_entity):
+        """测试未找到的结果同样缓存"""
+        core = XmlCore(str(temp_orm_file_with_entity))
+
+        assert core.query_element(".//entities/entity[@name='Nope']") is None
+        assert core.query_element(".//entities/entity[@name='Nope']") is None
+        assert core.query_stats()["hits"] == 1
+
+    def test_invalidated_by_merge(self, temp_orm_file_with_entity):
+        """测试合并后查询结果失效，内容未变化的合并不影响缓存"""
+        core = XmlCore(str(temp_orm_file_with_entity), cache=DocumentCache())
+        core.query_element(PRODUCT_XPATH)
+
+        unchanged = core.query_element(PRODUCT_XPATH)
+        assert core.merge_entity(unchanged).action == "skipped"
+        assert core.query_element(PRODUCT_XPATH) == unchanged
+        assert core.query_stats()["hits"] == 2
+
+        core.merge_entity(unchanged.replace('displayName="商品"', 'displayName="商品档案"'))
+        assert 'displayName="商品档案"' in core.query_element(PRODUCT_XPATH)
+
+    def test_invalidated_by_replace_element(self, temp_orm_file_with_entity):
+        """测试 replace_element 后查询结果失效"""
+        core = XmlCore(str(temp_orm_file_with_entity))
+        core.query_element(PRODUCT_XPATH)
+
+        new_element = core.parser.parse_fragment('<entity name="labor.tracking.dao.entity.LtProduct" tableName="t"/>')
+        assert core.replace_element(PRODUCT_XPATH, new_element) is True
+
+        assert 'tableName="t"' in core.query_element(PRODUCT_XPATH)
+
+    def test_invalidated_by_external_change(self, temp_orm_file_with_entity):
+        """测试文件被外部修改后查询结果失效"""
+        core = XmlCore(str(temp_orm_file_with_entity))
+        assert 'displayName="商品"' in core.query_element(PRODUCT_XPATH)
+
+        content = temp_orm_file_with_entity.read_text(encoding="utf-8")
+        content = content.replace('displayName="商品"', 'displayName="货品"')
+        temp_orm_file_with_entity.write_text(content, encoding="utf-8")
+        # 保证 mtime 变化（部分文件系统的时间精度较低）
+        later = time.time() + 5
+        os.utime(temp_orm_file_with_entity, (later, later))
+
+        assert 'displayName="货品"' in core.query_element(PRODUCT_XPATH)
+        assert core.query_stats()["hits"] == 0
+
+    def test_disabled(self, temp_orm_file_with_entity):
+        """测试 query_cache_size=0 时不缓存"""
+        core = XmlCore(str(temp_orm_file_with_entity), query_cache_size=0)
+
+        core.query_element(PRODUCT_XPATH)
+        core.query_element(PRODUCT_XPATH)
+
+        assert core.query_stats() == {"entries": 0, "hits": 0, "misses": 2, "hit_ratio": 0.0, "version": 0}
+
+    def test_lookup_excludes_concurrent_merge(self, temp_orm_file_with_entity):
+        """测试查找持有树锁时，共用缓存树的合并要等待查找结束"""
+        cache = DocumentCache()
+        reader = XmlCore(str(temp_orm_file_with_entity), cache=cache)
+        writer = XmlCore(str(temp_orm_file_with_entity), cache=cache)
+        reader.query_element(PRODUCT_XPATH)
+
+        done = threading.Event()
+        thread = threading.Thread(
+            target=lambda: (writer.merge_entity('<entity name="Concurrent"/>'), done.set())
+        )
+        with reader.merger.tree_lock:
+            thread.start()
+            assert not done.wait(0.2)
+        thread.join(5)
+
+        assert done.is_set()
+        assert reader.query_element(".//entity[@name='Concurrent']") is not None
+
+    @pytest.mark.asyncio
+    async def test_async_hit_skips_executor(self, temp_orm_file_with_entity):
+        """测试异步查询命中缓存时不经过线程池"""
+        core = AsyncXmlCore(XmlCore(str(temp_orm_file_with_entity)))
+        first = await core.query_element(PRODUCT_XPATH)
+
+        class FailingExecutor:
+            def submit(self, *args, **kwargs):
+                raise AssertionError("缓存命中时不应提交到线程池")
+
+        core.executor = FailingExecutor()
+        assert await core.query_element(PRODUCT_XPATH) == first
@@ -0,0 +1,180 @@
+"""分片存储测试用例"""
+
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from xml_core import XmlCore
+from xml_core.exceptions import XmlMergeError
+
+
+ORDER_XML = '<entity name="labor.tracking.dao.entity.LtOrder" tableName="lt_order"><columns/></entity>'
+
+
+@pytest.fixture
+def workspace(temp_orm_file_with_entity):
+    """包含一个 entity 的 ORM 文件及分片目录"""
+    return temp_orm_file_with_entity, temp_orm_file_with_entity.parent / "app.orm.shards"
+
+
+def _entity_names(path: Path) -> list:
+    return [e.get("name") for e in etree.parse(str(path)).getroot().iter("entity")]
+
+
+class TestShardedXmlStore:
+    """测试分片存储"""
+
+    def test_merge_writes_shard_only_until_materialize(self, workspace):
+        """测试合并只写分片，物化后目标文件包含全部实体"""
+        orm_file, shard_dir = workspace
+        before = orm_file.read_bytes()
+        core = XmlCore(str(orm_file), shard_dir=str(shard_dir))
+
+        result = core.merge_entity(ORDER_XML)
+
+        assert result.action == "created"
+        assert orm_file.read_bytes() == before
+        assert len(list((shard_dir / "shards").iterdir())) == 2
+
+        assert core.materialize() is True
+        assert _entity_names(orm_file) == [
+            "labor.tracking.dao.entity.LtProduct",
+            "labor.tracking.dao.entity.LtOrder",
+        ]
+        # 分片自带的命名空间声明与根节点相同时不重复输出
+        assert orm_file.read_text(encoding="utf-8").count("xmlns:x=") == 1
+        # 新分片按原有兄弟元素的缩进输出
+        assert '\n        <entity name="labor.tracking.dao.entity.LtOrder"' in orm_file.read_text(encoding="utf-8")
+
+    def test_materialize_skipped_without_changes(self, workspace):
+        """测试分片没有变化时跳过物化，目标文件被外部修改后重新生成"""
+        orm_file, shard_dir = workspace
+        core = XmlCore(str(orm_file), shard_dir=str(shard_dir))
+        core.merge_entity(ORDER_XML)
+
+        assert core.materialize() is True
+        assert core.materialize() is False
+
+        # 内容相同的合并不改变修订号
+        assert core.merge_entity(ORDER_XML).action == "skipped"
+        assert core.materialize() is False
+
+        orm_file.write_text("<orm/>", encoding="utf-8")
+        assert core.materialize() is True
+        assert len(_entity_names(orm_file)) == 2
+
+    def test_update_touches_one_shard(self, workspace):
+        """测试更新只重写对应实体的分片"""
+        orm_file, shard_dir = workspace
+        core = XmlCore(str(orm_file), shard_dir=str(shard_dir))
+        core.merge_entity(ORDER_XML)
+        shards = {p.name: p.stat().st_mtime_ns for p in (shard_dir / "shards").iterdir()}
+
+        updated = ORDER_XML.replace('tableName="lt_order"', 'tableName="lt_order_v2"')
+        assert core.merge_entity(updated).action == "updated"
+
+        changed = [
+            p.name for p in (shard_dir / "shards").iterdir()
+            if p.stat().st_mtime_ns != shards[p.name]
+        ]
+        assert len(changed) == 1
+        assert core.shards.read_element("labor.tracking.dao.entity.LtOrder").get("tableName") == "lt_order_v2"
+
+    def test_new_namespace_hoisted_to_skeleton(self, workspace):
+        """测试分片使用新前缀时声明提升到根节点"""
+        orm_file, shard_dir = workspace
+        core = XmlCore(str(orm_file), shard_dir=str(shard_dir))
+        core.merge_entity('<entity name="A" ext:dict="d"/>')
+        core.materialize()
+
+        root = etree.parse(str(orm_file)).getroot()
+        assert root.nsmap["ext"] == "ext"
+        assert root.find(".//entity[@name='A']").get("{ext}dict") == "d"
+        content = orm_file.read_text(encoding="utf-8")
+        assert content.count('xmlns:ext="ext"') == 1
+
+    def test_rejects_other_parent(self, workspace):
+        """测试合并到拆分时以外的父容器时报错"""
+        orm_file, shard_dir = workspace
+        core = XmlCore(str(orm_file), shard_dir=str(shard_dir))
+        core.merge_entity(ORDER_XML)
+
+        with pytest.raises(XmlMergeError):
+            core.merge_element('<x name="B"/>', parent_xpath=".//other", element_matcher="name")
+
+    def test_comments_preserved(self, workspace):
+        """测试容器内的注释随后面的元素进入分片，物化后保留；更新元素时注释不丢失"""
+        orm_file, shard_dir = workspace
+        content = orm_file.read_text(encoding="utf-8")
+        content = content.replace(
+            "    <entities>\n",
+            "    <entities>\n        <!-- core entities -->\n", 1
+        ).replace(
+            "        </entity>\n    </entities>",
+            '        </entity>\n        <!-- B is legacy -->\n        <entity name="B"/>\n'
+            "        <!-- end -->\n    </entities>", 1
+        )
+        orm_file.write_text(content, encoding="utf-8")
+        core = XmlCore(str(orm_file), shard_dir=str(shard_dir))
+
+        core.merge_entity(ORDER_XML)
+        core.merge_entity('<entity name="B" tableName="b"/>')
+        core.materialize()
+
+        output = orm_file.read_text(encoding="utf-8")
+        assert "<!-- core entities -->" in output
+        assert '<!-- B is legacy -->\n        <entity name="B" tableName="b"/>' in output
+        assert output.index("LtOrder") < output.index("<!-- end -->")
+        assert _entity_names(orm_file) == [
+            "labor.tracking.dao.entity.LtProduct",
+            "B",
+            "labor.tracking.dao.entity.LtOrder",
+        ]
+
+    def test_replace_then_materialize(self, workspace):
+        """测试分片存储下 replace_element 只重写所在分片，物化后保留修改"""
+        orm_file, shard_dir = workspace
+        core = XmlCore(str(orm_file), shard_dir=str(shard_dir))
+        core.merge_entity(ORDER_XML)
+
+        column = etree.fromstring('<column name="id" code="ORDER_ID"/>')
+        replaced = core.replace_element(
+            ".//entity[@name='labor.tracking.dao.entity.LtProduct']/columns/column[@name='id']", column
+        )
+
+        assert replaced is True
+        order = core.shards.read_element("labor.tracking.dao.entity.LtOrder")
+        assert order.get("tableName") == "lt_order"
+        core.materialize()
+        root = etree.parse(str(orm_file)).getroot()
+        product = root.find(".//entity[@name='labor.tracking.dao.entity.LtProduct']")
+        assert product.find("columns/column[@name='id']").get("code") == "ORDER_ID"
+        assert len(product.find("columns")) == 5
+        assert _entity_names(orm_file)[-1] == "labor.tracking.dao.entity.LtOrder"
+
+    def test_replace_rejects_identifier_change(self, workspace):
+        """测试替换整个分片元素时标识不能改变，父容器外的元素不能替换"""
+        orm_file, shard_dir = workspace
+        core = XmlCore(str(orm_file), shard_dir=str(shard_dir))
+        core.merge_entity(ORDER_XML)
+
+        with pytest.raises(XmlMergeError):
+            core.replace_element(
+                ".//entity[@name='labor.tracking.dao.entity.LtOrder']", etree.fromstring('<entity name="X"/>')
+            )
+        with pytest.raises(XmlMergeError):
+            core.replace_element(".//entities", etree.fromstring("<entities/>"))
+        assert core.replace_element(".//entity[@name='missing']", etree.fromstring('<entity name="missing"/>')) is False
+
+    def test_lookup_sees_unmaterialized_merges(self, workspace):
+        """测试 find_element/query_element 不需要手动物化即可看到最新合并"""
+        orm_file, shard_dir = workspace
+        core = XmlCore(str(orm_file), shard_dir=str(shard_dir))
+        xpath = ".//entity[@name='labor.tracking.dao.entity.LtOrder']"
+        assert core.query_element(xpath) is None
+
+        core.merge_entity(ORDER_XML)
+
+        assert core.find_element(xpath).get("tableName") == "lt_order"
+        assert 'tableName="lt_order"' in core.query_element(xpath)
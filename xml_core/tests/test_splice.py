@@ -0,0 +1,100 @@
+"""增量写入测试用例"""
+
+import shutil
+
+import pytest
+from lxml import etree
+
+from xml_core import XmlCore
+from xml_core.cache import DocumentCache
+
+
+def _entity(name: str, comment: str = "") -> str:
+    return (
+        f'<entity name="{name}" tableName="t_{name.lower()}" x:abstract="false" comment="{comment}">\n'
+        f'  <columns>\n'
+        f'    <column name="id" code="ID" primary="true"/>\n'
+        f'  </columns>\n'
+        f'</entity>'
+    )
+
+
+def _run(core: XmlCore) -> None:
+    core.merge_entity(_entity("A"))
+    core.merge_entity(_entity("B"))
+    core.merge_entity(_entity("C"))
+    core.merge_entity(_entity("B", "更新"))
+    core.merge_entities([_entity("A", "批量"), _entity("D"), _entity("D", "再次")])
+
+
+class TestIncrementalWrite:
+    """测试字节区间拼接写入"""
+
+    @pytest.mark.parametrize("atomic_write", [True, False])
+    def test_same_bytes_as_full_write(self, temp_orm_file, atomic_write):
+        """测试增量写入与整树写回得到完全相同的文件"""
+        full = temp_orm_file
+        incremental = temp_orm_file.with_name("incremental.orm.xml")
+        shutil.copy(full, incremental)
+
+        _run(XmlCore(str(full), cache=DocumentCache(), atomic_write=atomic_write))
+        _run(XmlCore(
+            str(incremental),
+            cache=DocumentCache(),
+            atomic_write=atomic_write,
+            incremental_write=True
+        ))
+
+        assert incremental.read_bytes() == full.read_bytes()
+
+    def test_update_does_not_serialize_document(self, temp_orm_file):
+        """测试偏移索引建立后，更新与追加不再序列化整棵树"""
+        path = temp_orm_file
+        core = XmlCore(str(path), cache=DocumentCache(), incremental_write=True)
+        core.merge_entity(_entity("A"))
+        core.merge_entity(_entity("B"))
+
+        def fail(*args, **kwargs):
+            raise AssertionError("不应整树序列化")
+
+        core.formatter.serialize_bytes = fail
+        assert core.merge_entity(_entity("A", "更新")).action == "updated"
+        assert core.merge_entity(_entity("C")).action == "created"
+
+        entities = etree.parse(str(path)).getroot().find(".//entities")
+        assert [e.get("name") for e in entities] == ["A", "B", "C"]
+        assert entities[0].get("comment") == "更新"
+
+    def test_new_namespace_falls_back_to_full_write(self, temp_orm_file):
+        """测试引入新的命名空间时回退为整树写回（命名空间提升到根元素）"""
+        path = temp_orm_file
+        core = XmlCore(str(path), cache=DocumentCache(), incremental_write=True)
+        core.merge_entity(_entity("A"))
+
+        core.merge_entity(
+            '<entity name="E" tableName="t_e" ext:label="e" xmlns:ext="urn:ext"/>'
+        )
+
+        root = etree.parse(str(path)).getroot()
+        assert root.nsmap["ext"] == "urn:ext"
+        assert path.read_text(encoding="utf-8").count("xmlns:ext") == 1
+
+    def test_external_change_rebuilds_offsets(self, temp_orm_file):
+        """测试文件被外部修改后重新建立偏移索引"""
+        path = temp_orm_file
+        core = XmlCore(str(path), cache=DocumentCache(), incremental_write=True)
+        core.merge_entity(_entity("A"))
+        core.merge_entity(_entity("B"))
+
+        # 其他进程在 A 之前插入注释并改写了 A
+        content = path.read_text(encoding="utf-8")
+        content = content.replace('<entity name="A"', '<!-- 外部修改 -->\n    <entity name="A" extra="1"', 1)
+        path.write_text(content, encoding="utf-8")
+
+        core.merge_entity(_entity("B", "更新"))
+        core.merge_entity(_entity("C"))
+
+        entities = etree.parse(str(path)).getroot().find(".//entities")
+        assert [e.get("name") for e in entities.iterchildren("entity")] == ["A", "B", "C"]
+        assert entities.find("entity[@name='A']").get("extra") == "1"
+        assert entities.find("entity[@name='B']").get("comment") == "更新"
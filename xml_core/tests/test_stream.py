@@ -0,0 +1,78 @@
+"""流式读取测试用例"""
+
+import pytest
+
+from xml_core import XmlCore, XmlParseError
+from xml_core.stream import XmlStreamReader, compile_simple_path
+
+
+@pytest.fixture
+def large_orm_file(tmp_path):
+    """创建包含多个 entity 的临时 ORM 文件"""
+    temp_file = tmp_path / "app.orm.xml"
+    entities = "\n".join(
+        f'    <entity name="E{i}" tableName="t_{i}"><columns><column name="id"/></columns></entity>'
+        for i in range(200)
+    )
+    temp_file.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<orm xmlns:x="/nop/schema/xdsl.xdef" x:schema="/nop/schema/orm/orm.xdef">\n'
+        f'  <x:gen-extends/>\n  <entities>\n{entities}\n  </entities>\n</orm>\n',
+        encoding="utf-8"
+    )
+    return temp_file
+
+
+class TestSimplePath:
+    """测试简单路径编译"""
+
+    def test_compile(self):
+        """测试支持的路径形式"""
+        assert compile_simple_path(".//entities") == [(True, "entities")]
+        assert compile_simple_path("./a/b") == [(False, "a"), (False, "b")]
+        assert compile_simple_path("a//b") == [(False, "a"), (True, "b")]
+
+    def test_unsupported(self):
+        """测试带谓词的路径会被拒绝"""
+        with pytest.raises(XmlParseError):
+            compile_simple_path(".//entity[@name='a']")
+
+
+class TestXmlStreamReader:
+    """测试流式读取器"""
+
+    def test_iter_elements_in_order(self, large_orm_file):
+        """测试按文档顺序产出所有子元素，且已处理的兄弟节点被清理"""
+        core = XmlCore(str(large_orm_file))
+
+        names = []
+        for element in core.iter_elements(".//entities", "entity"):
+            names.append(element.get("name"))
+            # 之前的兄弟节点已被删除，最多只保留上一个已清空的元素
+            previous = element.getprevious()
+            assert previous is None or (len(previous) == 0 and previous.getprevious() is None)
+            assert element.find("columns/column").get("name") == "id"
+
+        assert names == [f"E{i}" for i in range(200)]
+
+    def test_find_stops_early(self, large_orm_file):
+        """测试查找到目标后立即停止读取"""
+        reader = XmlStreamReader()
+        seen = []
+        iterator = reader.iter_elements(str(large_orm_file), ".//entities", "entity")
+        for element in iterator:
+            seen.append(element.get("name"))
+            if element.get("name") == "E5":
+                break
+        assert len(seen) == 6
+
+        found = XmlCore(str(large_orm_file)).find_by_identifier(".//entities", "entity", "E150")
+        assert found is not None
+        assert found.get("tableName") == "t_150"
+        assert XmlCore(str(large_orm_file)).find_by_identifier(".//entities", "entity", "missing") is None
+
+    def test_namespaced_tag(self, large_orm_file):
+        """测试带命名空间前缀的标签"""
+        core = XmlCore(str(large_orm_file))
+        found = list(core.iter_elements(".", "x:gen-extends"))
+        assert len(found) == 1
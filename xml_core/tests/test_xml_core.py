@@ -1,5 +1,7 @@
 """xml_core 包测试用例"""
 
+import os
+import stat
 import pytest
 import tempfile
 import shutil
@@ -10,6 +12,9 @@ from xml_core import XmlCore
 from xml_core.namespace import NamespaceHandler
 from xml_core.parser import XmlParser
 from xml_core.formatter import XmlFormatter
+from xml_core.exceptions import XmlParseError
+from xml_core.cache import DocumentCache
+from xml_core.fingerprint import canonical_fingerprint
 
 
 # 获取 fixtures 目录路径
@@ -50,6 +55,31 @@ class TestNamespaceHandler:
         assert 'custom' in result
         assert 'biz' not in result
 
+    def test_detect_ignores_text_and_values(self):
+        """测试只统计标签名和属性名中的前缀"""
+        handler = NamespaceHandler()
+        xml = (
+            '<entity biz:a="ext:q > ui:r" name="x">说明 xs:foo'
+            '<!-- orm:c --><x:gen/><![CDATA[ i18n-en:z ]]></entity>'
+        )
+        assert handler.detect_used_namespaces(xml) == {'biz', 'x'}
+
+    def test_scan_fragment_strips_code_fences(self):
+        """测试单次扫描同时去掉代码块标记"""
+        handler = NamespaceHandler()
+        cleaned, used = handler.scan_fragment('```xml\n<entity ext:dict="t"/>\n```')
+
+        assert cleaned == '<entity ext:dict="t"/>'
+        assert used == {'ext'}
+
+    def test_scan_fragment_unclosed_tag(self):
+        """测试未闭合的标签不会导致扫描变慢"""
+        handler = NamespaceHandler()
+        cleaned, used = handler.scan_fragment('<entity ' + 'a' * 100000)
+
+        assert used == set()
+        assert cleaned.startswith('<entity')
+
 
 class TestXmlParser:
     """测试 XML 解析器"""
@@ -78,6 +108,66 @@ class TestXmlParser:
         assert element is not None
         assert element.get("name") == "test"
 
+    def test_parse_fragments_multiple_code_blocks(self):
+        """测试一次解析返回多个代码块中的全部目标元素"""
+        parser = XmlParser()
+        xml = (
+            '说明文字\n```xml\n<entity name="A" biz:type="t"/>\n```\n'
+            '以及关联表：\n```xml\n<!-- 子表 -->\n<entity name="B"><columns/></entity>\n```'
+        )
+
+        elements = list(parser.parse_fragments(xml, target_tag="entity"))
+        assert [e.get("name") for e in elements] == ["A", "B"]
+
+        top_level = list(parser.parse_fragments(xml))
+        assert [e.get("name") for e in top_level] == ["A", "B"]
+
+    def test_parse_fragments_no_match(self):
+        """测试没有匹配元素时抛出解析异常"""
+        parser = XmlParser()
+        with pytest.raises(XmlParseError):
+            list(parser.parse_fragments("<other/>", target_tag="entity"))
+
+    def test_parse_file_mmap(self):
+        """测试 mmap 分块解析与直接解析结果一致，并记录读取字节数"""
+        source = FIXTURES_DIR / "sample_orm_with_entity.xml"
+        parser = XmlParser(use_mmap=True, mmap_chunk_size=64)
+
+        tree = parser.parse_file(str(source))
+
+        expected = etree.tostring(XmlParser().parse_file(str(source)))
+        assert etree.tostring(tree) == expected
+        stats = parser.stats.snapshot()
+        assert stats["files"] == stats["mmap_files"] == 1
+        assert stats["bytes_read"] == source.stat().st_size
+        assert stats["last"]["method"] == "mmap"
+
+    def test_parse_file_mmap_error_resets_parser(self, tmp_path):
+        """测试 mmap 解析失败后线程内复用的解析器仍可继续使用"""
+        broken = tmp_path / "broken.xml"
+        broken.write_bytes(b"<orm><entities></orm>")
+        parser = XmlParser(use_mmap=True)
+
+        with pytest.raises(XmlParseError):
+            parser.parse_file(str(broken), auto_fix_namespaces=False)
+
+        tree = parser.parse_file(str(FIXTURES_DIR / "sample_orm.xml"), auto_fix_namespaces=False)
+        assert tree.getroot().tag == "orm"
+
+    def test_mmap_with_document_cache(self, tmp_path):
+        """测试 mmap 模式与文档缓存配合：缓存命中时不再解析文件"""
+        orm_file = tmp_path / "app.orm.xml"
+        shutil.copy(FIXTURES_DIR / "sample_orm.xml", orm_file)
+        core = XmlCore(str(orm_file), cache=DocumentCache(), use_mmap=True)
+
+        core.merge_entity('<entity name="A"/>')
+        core.merge_entity('<entity name="B"/>')
+
+        assert core.parse_stats()["files"] == 1
+        assert core.parse_stats()["mmap_files"] == 1
+        names = [e.get("name") for e in etree.parse(str(orm_file)).getroot().iter("entity")]
+        assert names == ["A", "B"]
+
 
 class TestXmlCore:
     """测试 XmlCore 主类"""
@@ -218,6 +308,103 @@ class TestXmlCore:
         for attr in entity.attrib:
             assert not attr.startswith('xmlns:')
 
+    def test_merge_elements_batch(self, temp_orm_file, entity_xml_content, entity_xml_updated_content):
+        """测试批量合并：一次解析、一次写入，结果与输入顺序一致"""
+        core = XmlCore(str(temp_orm_file))
+
+        writes = []
+        original_write = core.merger.formatter.write_tree
+
+        def counting_write(*args, **kwargs):
+            writes.append(args[1])
+            return original_write(*args, **kwargs)
+
+        core.merger.formatter.write_tree = counting_write
+
+        order_xml = '<entity name="labor.tracking.dao.entity.LtOrder" tableName="lt_order"><columns/></entity>'
+        results = core.merge_entities([entity_xml_content, order_xml, entity_xml_updated_content])
+
+        assert [(r.identifier, r.action) for r in results] == [
+            ("labor.tracking.dao.entity.LtProduct", "created"),
+            ("labor.tracking.dao.entity.LtOrder", "created"),
+            ("labor.tracking.dao.entity.LtProduct", "updated"),
+        ]
+        assert len(writes) == 1
+
+        entities = etree.parse(temp_orm_file).getroot().find(".//entities")
+        entity_list = entities.findall("entity")
+        assert len(entity_list) == 2
+        assert entity_list[0].get("displayName") == "商品（更新）"
+
+    def test_merge_elements_invalid_fragment_leaves_file(self, temp_orm_file, entity_xml_content):
+        """测试批量合并中任意片段无效时不修改文件"""
+        core = XmlCore(str(temp_orm_file))
+        before = temp_orm_file.read_bytes()
+
+        with pytest.raises(Exception):
+            core.merge_entities([entity_xml_content, '<entity tableName="no_name"/>'])
+
+        assert temp_orm_file.read_bytes() == before
+
+    def test_remerge_identical_entity_skipped(self, temp_orm_file, entity_xml_content):
+        """测试重复合并相同内容时返回 skipped，且不序列化、不写文件"""
+        core = XmlCore(str(temp_orm_file), cache=DocumentCache())
+        assert core.merge_entity(entity_xml_content).action == "created"
+        before = temp_orm_file.read_bytes()
+
+        serialized = []
+        original_serialize = core.merger.formatter.serialize_bytes
+
+        def counting_serialize(*args, **kwargs):
+            serialized.append(args)
+            return original_serialize(*args, **kwargs)
+
+        core.merger.formatter.serialize_bytes = counting_serialize
+
+        # 缩进、属性顺序不同，内容相同
+        reformatted = entity_xml_content.replace("\n", " ")
+        result = core.merge_entity(reformatted)
+
+        assert result.action == "skipped"
+        assert result.identifier == "labor.tracking.dao.entity.LtProduct"
+        assert serialized == []
+        assert temp_orm_file.read_bytes() == before
+
+    def test_existing_fingerprint_cached(self, temp_orm_file, entity_xml_content, monkeypatch):
+        """测试现有元素的指纹只计算一次"""
+        from xml_core import merger as merger_module
+
+        core = XmlCore(str(temp_orm_file), cache=DocumentCache())
+        core.merge_entity(entity_xml_content)
+
+        calls = []
+        original = merger_module.canonical_fingerprint
+
+        def counting_fingerprint(element):
+            calls.append(element)
+            return original(element)
+
+        monkeypatch.setattr(merger_module, "canonical_fingerprint", counting_fingerprint)
+
+        assert core.merge_entity(entity_xml_content).action == "skipped"
+        assert core.merge_entity(entity_xml_content).action == "skipped"
+        # 第一次：待合并元素 + 现有元素；第二次只计算待合并元素
+        assert len(calls) == 3
+
+    def test_force_replace_not_skipped(self, temp_orm_file, entity_xml_content):
+        """测试 force_replace 策略即使内容相同也会更新"""
+        core = XmlCore(str(temp_orm_file))
+        core.merge_entity(entity_xml_content)
+
+        result = core.merge_element(
+            entity_xml_content,
+            parent_xpath=".//entities",
+            element_matcher="name",
+            merge_strategy="force_replace"
+        )
+
+        assert result.action == "updated"
+
     def test_find_element(self, temp_orm_file_with_entity):
         """测试查找元素"""
         core = XmlCore(str(temp_orm_file_with_entity))
@@ -253,6 +440,31 @@ class TestXmlCore:
         assert 'labor.tracking.dao.entity.LtProduct' in formatted
 
 
+class TestFingerprint:
+    """测试元素的规范化指纹"""
+
+    def test_ignores_formatting_and_declaration_placement(self):
+        """测试缩进、属性顺序和命名空间声明位置不影响指纹"""
+        in_file = etree.fromstring(
+            '<orm xmlns:ext="ext" xmlns:x="/nop/schema/xdsl.xdef"><entities>\n'
+            '  <entity name="A" ext:dict="d">\n    <column code="ID" name="id"/>\n  </entity>\n'
+            '</entities></orm>'
+        )[0][0]
+        fragment = etree.fromstring(
+            '<entity xmlns:ext="ext" ext:dict="d" name="A"><column name="id" code="ID"></column></entity>'
+        )
+
+        assert canonical_fingerprint(in_file) == canonical_fingerprint(fragment)
+
+    def test_detects_content_change(self):
+        """测试属性或文本变化时指纹不同"""
+        a = etree.fromstring('<entity name="A"><comment>商品</comment></entity>')
+        b = etree.fromstring('<entity name="A"><comment>商品信息</comment></entity>')
+        c = etree.fromstring('<entity name="A" tableName="t"><comment>商品</comment></entity>')
+
+        assert len({canonical_fingerprint(e) for e in (a, b, c)}) == 3
+
+
 class TestXmlFormatter:
     """测试 XML 格式化器"""
 
@@ -305,6 +517,90 @@ class TestXmlFormatter:
         # entity 标签不应该有 xmlns 属性
         assert 'xmlns:' not in entity_tag
 
+    def test_hoist_only_inserted_subtrees(self):
+        """测试只对新插入的子树做命名空间提升"""
+        root = etree.fromstring(
+            b'<root xmlns:x="x"><entities><old xmlns:biz="biz" biz:a="1"/></entities></root>'
+        )
+        tree = etree.ElementTree(root)
+        entities = root[0]
+
+        inserted = etree.fromstring(b'<entity xmlns:ext="ext" ext:label="e" x:b="1" xmlns:x="x"/>')
+        entities.append(inserted)
+
+        result = XmlFormatter().serialize_bytes(tree, inserted=[inserted]).decode()
+
+        # 新前缀声明到根元素上，根元素对象保持不变
+        assert tree.getroot() is root
+        assert root.nsmap["ext"] == "ext"
+        assert '<entity ext:label="e" x:b="1"/>' in result
+        # 未插入的子树不会被检查
+        assert 'xmlns:biz="biz"' in result
+        assert "biz" not in root.nsmap
+
+    def test_format_element_single_pass(self):
+        """测试格式化元素只保留用到的祖先命名空间声明"""
+        root = etree.fromstring(
+            b'<root xmlns:x="x" xmlns:xpl="xpl">\n  <entity x:a="1"><c/></entity>\n</root>'
+        )
+        formatter = XmlFormatter()
+
+        data = formatter.format_element_bytes(root[0])
+
+        assert data == b'<entity xmlns:x="x" x:a="1">\n  <c/>\n</entity>\n'
+        assert formatter.format_element(root[0]) == data.decode("utf-8")
+
+    def test_format_element_hoists_nested_declarations(self):
+        """测试后代元素带有命名空间声明时提升到元素本身，且不修改原元素"""
+        root = etree.fromstring(
+            b'<root xmlns:x="x"><entity x:a="1"><c xmlns:biz="biz" biz:q="1"/></entity></root>'
+        )
+
+        result = XmlFormatter().format_element(root[0])
+
+        assert result.startswith('<entity xmlns:x="x" xmlns:biz="biz" x:a="1">')
+        assert '<c biz:q="1"/>' in result
+        assert "biz" in root[0][0].nsmap and "biz" not in root[0].nsmap
+
+
+class TestAtomicWrite:
+    """测试原子写入"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        yield Path(temp_dir)
+        shutil.rmtree(temp_dir)
+
+    def test_atomic_write_preserves_mode(self, temp_dir):
+        """测试原子写入保留文件权限且不残留临时文件"""
+        temp_file = temp_dir / "app.orm.xml"
+        shutil.copy(FIXTURES_DIR / "sample_orm.xml", temp_file)
+        os.chmod(temp_file, 0o640)
+
+        core = XmlCore(str(temp_file), fsync=True)
+        core.merge_entity('<entity name="A"/>')
+
+        assert stat.S_IMODE(os.stat(temp_file).st_mode) == 0o640
+        assert not [name for name in os.listdir(temp_dir) if name.endswith(".tmp")]
+        assert etree.parse(str(temp_file)).getroot().find(".//entity").get("name") == "A"
+
+    def test_failed_write_keeps_original(self, temp_dir, monkeypatch):
+        """测试写入失败时原文件保持完整"""
+        temp_file = temp_dir / "app.orm.xml"
+        shutil.copy(FIXTURES_DIR / "sample_orm.xml", temp_file)
+        before = temp_file.read_bytes()
+
+        def broken_replace(src, dst):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(os, "replace", broken_replace)
+        with pytest.raises(OSError):
+            XmlCore(str(temp_file)).merge_entity('<entity name="A"/>')
+
+        assert temp_file.read_bytes() == before
+        assert not [name for name in os.listdir(temp_dir) if name.endswith(".tmp")]
+
 
 class TestIntegration:
     """集成测试"""
@@ -0,0 +1,74 @@
+"""路径表达式缓存测试用例"""
+
+from lxml import etree
+
+from xml_core import XmlCore, XPathCache
+from xml_core.namespace import NamespaceHandler
+
+
+SAMPLE = b'''<orm xmlns:x="/nop/schema/xdsl.xdef">
+    <entities>
+        <entity name="A" x:abstract="true"/>
+        <entity name="B"/>
+    </entities>
+</orm>'''
+
+
+class TestXPathCache:
+    """测试路径表达式缓存"""
+
+    def test_hits_and_misses(self):
+        """测试相同表达式和命名空间映射只编译一次"""
+        cache = XPathCache()
+        ns_map = NamespaceHandler.get_default_namespace_map()
+
+        first = cache.compile(".//entities", ns_map)
+        second = cache.compile(".//entities", dict(ns_map))
+        cache.compile(".//entities")
+
+        assert first is second
+        assert first.is_xpath
+        assert cache.stats() == {"entries": 2, "hits": 1, "misses": 2}
+
+    def test_find_semantics(self):
+        """测试与 Element.find/findall 的结果一致"""
+        root = etree.fromstring(SAMPLE)
+        cache = XPathCache()
+        ns_map = NamespaceHandler.get_default_namespace_map()
+
+        for path in (".//entities", "entities/entity", ".//entity[@name='B']", ".//missing"):
+            compiled = cache.compile(path, ns_map)
+            assert compiled.find(root) is root.find(path, ns_map)
+            assert compiled.findall(root) == root.findall(path, ns_map)
+
+    def test_clark_notation_falls_back_to_element_path(self):
+        """测试 {uri}tag 形式的路径退回 ElementPath"""
+        root = etree.fromstring(b'<root xmlns="urn:a"><item/></root>')
+        compiled = XPathCache().compile("{urn:a}item")
+
+        assert not compiled.is_xpath
+        assert compiled.find(root) is root[0]
+
+    def test_lru_eviction(self):
+        """测试超过上限时淘汰最久未使用的表达式"""
+        cache = XPathCache(max_entries=2)
+        cache.compile("a")
+        cache.compile("b")
+        cache.compile("a")
+        cache.compile("c")
+
+        assert len(cache) == 2
+        cache.compile("a")
+        assert cache.stats()["hits"] == 2
+
+    def test_precompiled_parent_xpath_is_reused(self, temp_orm_file):
+        """测试预编译的父容器路径在合并时命中缓存"""
+        cache = XPathCache()
+        core = XmlCore(str(temp_orm_file), xpath_cache=cache)
+        core.precompile([".//entities"])
+
+        core.merge_entity('<entity name="A"/>')
+
+        stats = core.xpath_stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] >= 1
@@ -0,0 +1,160 @@
+"""编译后的路径表达式缓存"""
+
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+from lxml import etree
+
+
+class CompiledPath:
+    """
+    编译后的路径表达式
+
+    优先编译为 etree.XPath（由 libxml2 直接求值）；使用 `{uri}tag` 形式的标签、
+    默认命名空间或 XPath 无法编译的 ElementPath 语法时，退回到 Element.find。
+    """
+
+    __slots__ = ("expression", "namespaces", "_xpath")
+
+    def __init__(self, expression: str, namespaces: Optional[dict] = None):
+        """
+        编译路径表达式
+
+        Args:
+            expression: 路径表达式（如 `.//entities`、`entity[@name='A']`）
+            namespaces: 命名空间映射
+        """
+        self.expression = expression
+        self.namespaces = dict(namespaces) if namespaces else None
+        self._xpath: Optional[etree.XPath] = None
+
+        if "{" not in expression and not (self.namespaces and None in self.namespaces):
+            try:
+                self._xpath = etree.XPath(expression, namespaces=self.namespaces)
+            except etree.XPathSyntaxError:
+                pass
+
+    @property
+    def is_xpath(self) -> bool:
+        """是否编译为 etree.XPath"""
+        return self._xpath is not None
+
+    def find(self, element: etree._Element) -> Optional[etree._Element]:
+        """
+        查找第一个匹配的元素（语义同 Element.find）
+
+        Args:
+            element: 上下文元素
+
+        Returns:
+            找到的元素，未找到返回 None
+        """
+        if self._xpath is None:
+            return element.find(self.expression, self.namespaces)
+        for item in self._xpath(element):
+            if etree.iselement(item):
+                return item
+        return None
+
+    def findall(self, element: etree._Element) -> List[etree._Element]:
+        """
+        查找全部匹配的元素（语义同 Element.findall）
+
+        Args:
+            element: 上下文元素
+
+        Returns:
+            元素列表（按文档顺序）
+        """
+        if self._xpath is None:
+            return element.findall(self.expression, self.namespaces)
+        return [item for item in self._xpath(element) if etree.iselement(item)]
+
+
+class XPathCache:
+    """
+    路径表达式的 LRU 缓存
+
+    以 (表达式, 命名空间映射) 为键保存 CompiledPath，避免每次查找都重新解析路径。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最多缓存的表达式数
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], CompiledPath]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, expression: str, namespaces: Optional[dict] = None) -> CompiledPath:
+        """
+        获取（必要时编译）路径表达式
+
+        Args:
+            expression: 路径表达式
+            namespaces: 命名空间映射
+
+        Returns:
+            CompiledPath
+        """
+        key = (expression, frozenset(namespaces.items()) if namespaces else None)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        compiled = CompiledPath(expression, namespaces)
+        with self._lock:
+            self._entries[key] = compiled
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        获取缓存统计
+
+        Returns:
+            包含条目数、命中/未命中次数的字典
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_shared_cache: Optional[XPathCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_xpath_cache() -> XPathCache:
+    """
+    获取进程级共享的路径表达式缓存
+
+    Returns:
+        XPathCache 单例
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = XPathCache()
+    return _shared_cache